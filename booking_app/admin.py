@@ -2,7 +2,7 @@ from django.contrib import admin
 from modeltranslation.admin import TranslationAdmin
 from .models import (
     Country, UserProfile, City, Hotel, HotelImage, Service,
-    Room, RoomImage, Review, Booking, Favorite, FavoriteItem
+    Room, RoomImage, RoomRate, StayDiscount, Review, Booking, Favorite, FavoriteItem
 )
 
 class HotelImageInline(admin.TabularInline):
@@ -20,6 +20,16 @@ class ServiceInline(admin.TabularInline):
     extra = 2
 
 
+class RoomRateInline(admin.TabularInline):
+    model = RoomRate
+    extra = 1
+
+
+class StayDiscountInline(admin.TabularInline):
+    model = StayDiscount
+    extra = 1
+
+
 @admin.register(Country)
 class CountryAdmin(TranslationAdmin):
     class Media:
@@ -44,7 +54,11 @@ class CityAdmin(TranslationAdmin):
 
 @admin.register(Hotel)
 class HotelAdmin(TranslationAdmin):
-    inlines = [HotelImageInline, ServiceInline]
+    inlines = [HotelImageInline, ServiceInline, StayDiscountInline]
+    readonly_fields = (
+        'avg_rating', 'review_count',
+        'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5'
+    )
 
     class Media:
         js = (
@@ -57,7 +71,7 @@ class HotelAdmin(TranslationAdmin):
 
 @admin.register(Room)
 class RoomAdmin(TranslationAdmin):
-    inlines = [RoomImageInline]
+    inlines = [RoomImageInline, RoomRateInline]
 
     class Media:
         js = (
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class BookingAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'booking_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from django.db.backends.signals import connection_created
+        from . import checks  # noqa: F401
+        from . import db
+        from .cache import collect_cache_metrics
+        from .metrics import COLLECTORS, instrument_connection, instrument_serializers
+        instrument_serializers()
+        connection_created.connect(instrument_connection, dispatch_uid='booking_app.instrument_connection')
+        db.setup()
+        COLLECTORS.append(db.collect_pool_metrics)
+        COLLECTORS.append(collect_cache_metrics)
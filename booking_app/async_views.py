@@ -0,0 +1,91 @@
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from rest_framework.response import Response
+
+
+class AsyncAPIViewMixin:
+    """async dispatch для DRF-представлений (сам DRF вызывает обработчики синхронно).
+
+    Аутентификация и права выполняются в потоке — JWT/Token читают пользователя из БД;
+    обработчики (get) — корутины и ходят в БД через async ORM.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            # OPTIONS и 405 у DRF синхронные
+            if isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def afilter_queryset(self, queryset):
+        # django-filter валидирует ModelChoiceFilter запросом к БД
+        return await sync_to_async(self.filter_queryset)(queryset)
+
+
+class AsyncListModelMixin(AsyncAPIViewMixin):
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+
+        page = await self.apaginate_queryset(queryset)
+        objects = page if page is not None else [obj async for obj in queryset]
+        if hasattr(self, 'aconditional_response'):
+            # booking_app.conditional: 304 без сериализации
+            return await self.aconditional_response(objects, lambda: self.list_response(objects, page is not None))
+        return self.list_response(objects, page is not None)
+
+    def list_response(self, objects, paginated):
+        serializer = self.get_serializer(objects, many=True)
+        if paginated:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        if hasattr(self.paginator, 'apaginate_queryset'):
+            return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+        return await sync_to_async(self.paginator.paginate_queryset)(queryset, self.request, view=self)
+
+
+class AsyncRetrieveModelMixin(AsyncAPIViewMixin):
+    async def get(self, request, *args, **kwargs):
+        return await self.aretrieve(request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        render = lambda: Response(self.get_serializer(instance).data)
+        if hasattr(self, 'aconditional_response'):
+            return await self.aconditional_response([instance], render)
+        return render()
+
+    async def aget_object(self):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
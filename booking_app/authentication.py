@@ -0,0 +1,95 @@
+import threading
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .cache import reference_cache
+from .models import UserProfile
+
+# поля пользователя, которые подписываются в токен при логине/регистрации
+CLAIM_FIELDS = {'username': 'username', 'role': 'user_role', 'active': 'is_active'}
+
+
+def tokens_for_user(user):
+    refresh = RefreshToken.for_user(user)
+    for claim, field in CLAIM_FIELDS.items():
+        refresh[claim] = getattr(user, field)
+    # пользователь только что прочитан из БД — следующие запросы процесса обойдутся без неё
+    auth_state.remember(user.pk, (user.user_role, user.is_active))
+    return refresh
+
+
+class AuthStateCache:
+    """Актуальные роль/активность пользователя поверх claims уже выданных токенов.
+
+    Локальная запись процесса живёт AUTH_USER_CACHE_TTL; после неё состояние берётся из общего кэша
+    (alias reference, туда пишет сигнал UserProfile), а если записи там нет — из БД: кэш может быть
+    у каждого процесса свой и вытеснять ключи, поэтому его промах не значит «claims актуальны».
+    Так изменение доходит до всех процессов не позже чем через AUTH_USER_CACHE_TTL.
+    """
+
+    def __init__(self):
+        self.local = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(user_id):
+        return f'auth:user:{user_id}'
+
+    def get(self, user_id):
+        entry = self.local.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        state = reference_cache().get(self.key(user_id))
+        if state is None:
+            # удалённый пользователь — неактивен
+            state = UserProfile.objects.filter(pk=user_id).values_list('user_role', 'is_active').first()
+            state = tuple(state) if state else (None, False)
+        self.remember(user_id, state)
+        return state
+
+    def remember(self, user_id, state):
+        with self.lock:
+            self.local[user_id] = (time.monotonic() + settings.AUTH_USER_CACHE_TTL, state)
+
+    def changed(self, user_id, role, is_active):
+        reference_cache().set(
+            self.key(user_id), (role, is_active),
+            timeout=int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()),
+        )
+        self.remember(user_id, (role, is_active))
+
+    def clear(self):
+        with self.lock:
+            self.local.clear()
+
+
+auth_state = AuthStateCache()
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT без запроса к БД на каждый запрос: пользователь собирается из подписанных claims.
+
+    Роль и активность берутся из auth_state (не реже раза в AUTH_USER_CACHE_TTL сверяются с БД).
+    Незагруженные поля UserProfile остаются отложенными и подгружаются при обращении.
+    Токены без claims (выданные до включения) проверяются по БД, как в simplejwt.
+    """
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in CLAIM_FIELDS):
+            return super().get_user(validated_token)
+
+        user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        role, is_active = auth_state.get(user_id)
+        if not is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        values = {'id': user_id, 'username': validated_token['username'], 'user_role': role, 'is_active': is_active}
+        # from_db ждёт значения в порядке полей модели
+        field_names = [f.attname for f in UserProfile._meta.concrete_fields if f.attname in values]
+        return UserProfile.from_db('default', field_names, [values[name] for name in field_names])
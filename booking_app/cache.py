@@ -0,0 +1,106 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.utils.translation import get_language
+from rest_framework.response import Response
+
+REFERENCE_CACHE = 'reference'
+
+
+def reference_cache():
+    return caches[REFERENCE_CACHE]
+
+
+def _incr(key):
+    cache = reference_cache()
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # ключ мог вытесниться между add и incr
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def namespace_version(namespace):
+    return reference_cache().get_or_set(f'ref:{namespace}:version', 1, timeout=None)
+
+
+def invalidate_namespace(namespace):
+    # ключи не перечисляем: новая версия делает все старые записи недостижимыми
+    _incr(f'ref:{namespace}:version')
+
+
+CACHED_NAMESPACES = ('country', 'city', 'pricing')
+
+
+def cache_stats(namespaces=('country', 'city')):
+    cache = reference_cache()
+    return {
+        namespace: {
+            'hits': cache.get(f'ref:{namespace}:hits', 0),
+            'misses': cache.get(f'ref:{namespace}:misses', 0),
+        }
+        for namespace in namespaces
+    }
+
+
+def collect_cache_metrics():
+    # счётчики лежат в самом reference-кэше: при LocMem — у каждого процесса свои
+    lines = []
+    for kind in ('hits', 'misses'):
+        name = f'booking_reference_cache_{kind}_total'
+        lines += [f'# HELP {name} CachedReferenceMixin {kind} per namespace', f'# TYPE {name} counter']
+        lines += [
+            f'{name}{{namespace="{namespace}"}} {stats[kind]}'
+            for namespace, stats in cache_stats(CACHED_NAMESPACES).items()
+        ]
+    return lines
+
+
+class CachedReferenceMixin:
+    """Кэширует сериализованный ответ list/retrieve; права проверяются до обращения к кэшу."""
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_cache_timeout(self):
+        return DEFAULT_TIMEOUT
+
+    def cache_key(self, request, version):
+        return 'ref:{}:{}:{}:{}'.format(self.cache_namespace, version, get_language(), request.build_absolute_uri())
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        namespace = self.cache_namespace
+        key = self.cache_key(request, namespace_version(namespace))
+        cache = reference_cache()
+        data = cache.get(key)
+        if data is not None:
+            _incr(f'ref:{namespace}:hits')
+            return Response(data)
+
+        _incr(f'ref:{namespace}:misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout=self.get_cache_timeout())
+        return response
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        # для async-представлений (booking_app.async_views): handler — корутина
+        namespace = self.cache_namespace
+        key = self.cache_key(request, await sync_to_async(namespace_version)(namespace))
+        cache = reference_cache()
+        data = await cache.aget(key)
+        if data is not None:
+            await sync_to_async(_incr)(f'ref:{namespace}:hits')
+            return Response(data)
+
+        await sync_to_async(_incr)(f'ref:{namespace}:misses')
+        response = await handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            await cache.aset(key, response.data, timeout=self.get_cache_timeout())
+        return response
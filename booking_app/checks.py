@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from .cache import REFERENCE_CACHE
+
+LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+
+@register(Tags.caches, deploy=True)
+def check_reference_cache(app_configs, **kwargs):
+    """manage.py check --deploy: сигналы сбрасывают версии справочников только в кэше своего процесса."""
+    if settings.CACHES[REFERENCE_CACHE]['BACKEND'] not in LOCAL_BACKENDS:
+        return []
+    return [Warning(
+        'reference-кэш локален для процесса: правки стран, городов и цен из одного воркера '
+        'остальные увидят только через REFERENCE_CACHE_TIMEOUT/PRICING_CACHE_TIMEOUT.',
+        hint='Для нескольких воркеров задайте REFERENCE_CACHE_BACKEND/REFERENCE_CACHE_LOCATION (redis, memcached).',
+        id='booking_app.W001',
+    )]
@@ -0,0 +1,86 @@
+import hashlib
+from operator import attrgetter
+
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.translation import get_language
+from rest_framework.response import Response
+
+from .cache import namespace_version
+
+
+class ConditionalGetMixin:
+    """Strong ETag для list/retrieve, посчитанный без сериализации.
+
+    Валидатор — updated_at выбранных объектов (etag_fields: пути через точку, в том числе по
+    select_related), версии справочников из etag_namespaces, язык, формат ответа, URL и состояние
+    пагинации. Совпал If-None-Match — 304 сразу после выборки, сериализатор не создаётся.
+
+    Last-Modified не отдаётся: max(updated_at) не видит удалённых и выпавших со страницы строк,
+    смены count, is_favorite и переименований справочников — If-Modified-Since давал бы устаревший 304.
+    """
+    etag_fields = ('updated_at',)
+    etag_namespaces = ('city', 'country')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        objects = page if page is not None else list(queryset)
+        return self.conditional_response(objects, lambda: self.list_response(objects, page is not None))
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return self.conditional_response([instance], lambda: Response(self.get_serializer(instance).data))
+
+    def list_response(self, objects, paginated):
+        serializer = self.get_serializer(objects, many=True)
+        if paginated:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    def wants_relation(self, path):
+        # FieldsetMixin (booking_app.fieldsets) отвечает False для связей, не загруженных по ?fields/?expand
+        return True
+
+    def etag_extra(self, objects):
+        # данные ответа, которых нет в updated_at (например, is_favorite пользователя)
+        return []
+
+    def get_etag(self, objects):
+        getters = [
+            attrgetter(path) for path in self.etag_fields
+            if '.' not in path or self.wants_relation(path.rsplit('.', 1)[0])
+        ]
+        stamps = [getter(obj) for obj in objects for getter in getters]
+        parts = [
+            get_language(),
+            self.request.accepted_media_type,
+            self.request.get_full_path(),
+            *self.pagination_state(),
+            *(namespace_version(namespace) for namespace in self.etag_namespaces),
+            *(obj.pk for obj in objects),
+            *(stamp.isoformat() for stamp in stamps),
+            *self.etag_extra(objects),
+        ]
+        return '"{}"'.format(hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest())
+
+    def pagination_state(self):
+        # count у LimitOffset, has_next/has_previous у keyset-режима — попадают в ссылки ответа
+        paginator = getattr(self, '_paginator', None)
+        state = getattr(paginator, 'keyset', None) or paginator
+        return [getattr(state, name, None) for name in ('count', 'has_next', 'has_previous')]
+
+    def conditional_response(self, objects, render, etag=None):
+        etag = etag or self.get_etag(objects)
+        not_modified = get_conditional_response(self.request, etag=etag)
+        response = Response(status=not_modified.status_code) if not_modified is not None else render()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            # ответ персональный: клиент хранит его у себя и каждый раз переспрашивает с валидатором
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    async def aconditional_response(self, objects, render):
+        # namespace_version ходит в кэш синхронно
+        etag = await sync_to_async(self.get_etag)(objects)
+        return self.conditional_response(objects, render, etag)
@@ -0,0 +1,57 @@
+import os
+import threading
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# gauge-показатели psycopg_pool.get_stats(); остальные ключи — накопительные счётчики
+POOL_GAUGES = ('pool_min', 'pool_max', 'pool_size', 'pool_available', 'requests_waiting')
+
+# connect() Django: без пула — новое соединение с Postgres, с пулом — выдача соединения из пула
+_connects = {'total': 0}
+_connects_lock = threading.Lock()
+
+
+def count_connect(sender, connection, **kwargs):
+    with _connects_lock:
+        _connects['total'] += 1
+
+
+def existing_pools():
+    for alias in connections:
+        pools = getattr(type(connections[alias]), '_connection_pools', {})
+        if alias in pools:
+            yield alias, pools[alias]
+
+
+def close_before_fork():
+    """Закрывает соединения и пулы в родителе: после fork (gunicorn --preload) у каждого
+    воркера свой пул, а сокеты родителя не используются двумя процессами."""
+    connections.close_all()
+    for alias, _ in list(existing_pools()):
+        connections[alias].close_pool()
+
+
+def collect_pool_metrics():
+    lines = [
+        '# HELP booking_db_connects_total Django connect() calls (new connections or pool checkouts)',
+        '# TYPE booking_db_connects_total counter',
+        f'booking_db_connects_total {_connects["total"]}',
+    ]
+    series = {}
+    for alias, pool in existing_pools():
+        for key, value in pool.get_stats().items():
+            if key in POOL_GAUGES:
+                name, kind = 'booking_db_pool_' + key.removeprefix('pool_'), 'gauge'
+            else:
+                name, kind = f'booking_db_pool_{key}_total', 'counter'
+            series.setdefault((name, kind), []).append(f'{name}{{alias="{alias}"}} {value}')
+    for (name, kind), values in sorted(series.items()):
+        lines += [f'# TYPE {name} {kind}', *values]
+    return lines
+
+
+def setup():
+    connection_created.connect(count_connect, dispatch_uid='booking_db_count_connect')
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(before=close_before_fork)
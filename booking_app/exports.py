@@ -0,0 +1,135 @@
+import csv
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.utils.text import compress_sequence
+from django.utils.translation import get_language
+
+from .models import Booking, Review
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def translated(path):
+    # колонка активного языка; пустая — значение языка по умолчанию
+    lang = (get_language() or settings.MODELTRANSLATION_DEFAULT_LANGUAGE).split('-')[0]
+    default = settings.MODELTRANSLATION_DEFAULT_LANGUAGE
+    if lang not in settings.MODELTRANSLATION_LANGUAGES or lang == default:
+        return F(f'{path}_{default}')
+    return Coalesce(NullIf(F(f'{path}_{lang}'), Value('')), F(f'{path}_{default}'), output_field=CharField())
+
+
+def booking_columns():
+    return {
+        'id': 'id',
+        'hotel_id': 'hotel_id',
+        'hotel_name': translated('hotel__hotel_name'),
+        'room_id': 'room_id',
+        'room_number': 'room__room_number',
+        'room_type': 'room__room_type',
+        'user_id': 'user_id',
+        'username': 'user__username',
+        'check_in': 'check_in',
+        'check_out': 'check_out',
+        'total_price': 'total_price',
+        'status_book': 'status_book',
+        'updated_at': 'updated_at',
+    }
+
+
+def review_columns():
+    return {
+        'id': 'id',
+        'hotel_id': 'hotel_id',
+        'hotel_name': translated('hotel__hotel_name'),
+        'user_id': 'user_id',
+        'username': 'user__username',
+        'stars': 'stars',
+        'description': 'description',
+        'created_date': 'created_date',
+    }
+
+
+EXPORTS = {
+    'bookings': (Booking, booking_columns),
+    'reviews': (Review, review_columns),
+}
+
+
+def export_rows(kind, owner=None, hotel=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """(заголовок, кортежи строк): values_list без моделей и сериализаторов, серверный курсор по chunk_size."""
+    model, columns = EXPORTS[kind]
+    columns = columns()
+    queryset = model.objects.all()
+    if owner is not None:
+        queryset = queryset.filter(hotel__owner=owner)
+    if hotel is not None:
+        queryset = queryset.filter(hotel=hotel)
+    rows = queryset.order_by('id').values_list(*columns.values()).iterator(chunk_size=chunk_size)
+    return list(columns), rows
+
+
+class Echo:
+    # csv.writer пишет в «файл», а строку забираем из возвращаемого значения writerow
+    def write(self, value):
+        return value
+
+
+def csv_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def render_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for chunk in chunked(rows):
+        yield ''.join(writer.writerow([csv_value(value) for value in row]) for row in chunk)
+
+
+def render_ndjson(header, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for chunk in chunked(rows):
+        yield ''.join(encoder.encode(dict(zip(header, row))) + '\n' for row in chunk)
+
+
+RENDERERS = {'csv': render_csv, 'ndjson': render_ndjson}
+
+
+def chunked(rows, size=EXPORT_CHUNK_SIZE):
+    # один кусок ответа на пачку строк, а не на каждую строку
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export_stream(kind, output, gzip=False, **filters):
+    """Итератор байтов выгрузки; в памяти одновременно не больше одной пачки строк."""
+    header, rows = export_rows(kind, **filters)
+    content = (part.encode() for part in RENDERERS[output](header, rows))
+    return compress_sequence(content) if gzip else content
+
+
+async def aiter_sync(iterator):
+    """Асинхронная обёртка потока для ASGI: каждая пачка читается в потоке sync_to_async.
+
+    Иначе StreamingHttpResponse под ASGI собирает синхронный итератор целиком через list().
+    """
+    done = object()
+    try:
+        while (part := await sync_to_async(next)(iterator, done)) is not done:
+            yield part
+    finally:
+        # клиент отключился — закрываем серверный курсор в том же потоке
+        await sync_to_async(iterator.close)()
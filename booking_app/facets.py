@@ -0,0 +1,140 @@
+import hashlib
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Q
+from django_filters.constants import EMPTY_VALUES
+from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
+from rest_framework.response import Response
+
+from .cache import namespace_version, reference_cache
+from .models import Room
+from .serializers import FacetsParamsSerializer
+
+# field — что считаем; filters — фильтры FilterSet, которые относятся к этому фасету и не применяются
+# к его собственным счётчикам; buckets — фиксированные значения {значение: Q}, None — GROUP BY по field
+Facet = namedtuple('Facet', ['field', 'filters', 'buckets'], defaults=[None])
+
+HOTEL_FACETS = {
+    'hotel_star': Facet('hotel_star', ('hotel_star__gt', 'hotel_star__lt'), {i: Q(hotel_star=i) for i in range(1, 6)}),
+    'city': Facet('city', ('city',)),
+    'country': Facet('country', ('country',)),
+}
+
+ROOM_PRICE_BUCKETS = (0, 100, 200, 300, 500, None)
+
+ROOM_FACETS = {
+    'room_type': Facet('room_type', ('room_type',), {value: Q(room_type=value) for value, _ in Room.TYPE_CHOICES}),
+    'room_price': Facet('room_price', ('room_price__gt', 'room_price__lt'), {
+        f'{low}-{high}' if high else f'{low}+': Q(room_price__gte=low, **({'room_price__lt': high} if high else {}))
+        for low, high in zip(ROOM_PRICE_BUCKETS, ROOM_PRICE_BUCKETS[1:])
+    }),
+}
+
+
+def _all(conditions):
+    query = Q()
+    for condition in conditions:
+        query &= condition
+    return query or None
+
+
+def facet_counts(queryset, filterset, facets):
+    """Счётчики всех фасетов одним запросом: COUNT(*) FILTER (WHERE ...) на каждое значение.
+
+    Фильтры вне фасетов идут в общий WHERE. Счётчик фасета учитывает все остальные активные фильтры,
+    кроме своих (4★ (123) при выбранном городе, но без учёта выбранного диапазона звёзд).
+    Фасеты без buckets — колонки GROUP BY; строк столько, сколько их сочетаний (город + страна).
+    """
+    facet_filters = {name for facet in facets.values() for name in facet.filters}
+    conditions = {}
+    for name, value in filterset.form.cleaned_data.items():
+        if value in EMPTY_VALUES:
+            continue
+        declared = filterset.filters[name]
+        if name in facet_filters:
+            conditions[name] = Q(**{f'{declared.field_name}__{declared.lookup_expr}': value})
+        else:
+            queryset = declared.filter(queryset, value)
+
+    aggregates = {'total': Count('pk', filter=_all(conditions.values()))}
+    for facet_name, facet in facets.items():
+        others = [condition for name, condition in conditions.items() if name not in facet.filters]
+        if facet.buckets is None:
+            aggregates[f'facet_{facet_name}'] = Count('pk', filter=_all(others))
+            continue
+        for index, bucket in enumerate(facet.buckets.values()):
+            aggregates[f'facet_{facet_name}_{index}'] = Count('pk', filter=_all([*others, bucket]))
+
+    groups = [facet.field for facet in facets.values() if facet.buckets is None]
+    queryset = queryset.order_by()
+    rows = list(queryset.values(*groups).annotate(**aggregates)) if groups else [queryset.aggregate(**aggregates)]
+
+    result = {}
+    for facet_name, facet in facets.items():
+        if facet.buckets is None:
+            counts = {}
+            for row in rows:
+                if row[facet.field] is not None and row[f'facet_{facet_name}']:
+                    counts[row[facet.field]] = counts.get(row[facet.field], 0) + row[f'facet_{facet_name}']
+            ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        else:
+            ordered = [
+                (value, sum(row[f'facet_{facet_name}_{index}'] for row in rows))
+                for index, value in enumerate(facet.buckets)
+            ]
+        result[facet_name] = [{'value': value, 'count': count} for value, count in ordered]
+    return {'count': sum(row['total'] for row in rows), 'facets': result}
+
+
+class FacetsMixin:
+    """?facets=1 на list-эндпоинте с filterset_class: вместо страницы — счётчики фасетов.
+
+    Ответ кэшируется в reference-кэше по нормализованным значениям фильтров (порядок и запись
+    параметров не важны) и версии facet_namespace, которую сбрасывают сигналы.
+    """
+    facets = {}
+    facet_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        if self.wants_facets(request):
+            return Response(self.get_facets())
+        return super().list(request, *args, **kwargs)
+
+    def wants_facets(self, request):
+        params = FacetsParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data['facets']
+
+    def get_facet_queryset(self):
+        return self.get_queryset()
+
+    def facet_key_extra(self):
+        # параметры вне FilterSet, от которых зависит выборка (например, даты доступности)
+        return []
+
+    def get_facets(self):
+        queryset = self.get_facet_queryset()
+        filterset = DjangoFilterBackend().get_filterset(self.request, queryset, self)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+
+        # ModelChoiceFilter отдаёт объект — в ключ идёт его pk
+        normalized = sorted(
+            (name, str(getattr(value, 'pk', value)))
+            for name, value in filterset.form.cleaned_data.items() if value not in EMPTY_VALUES
+        )
+        digest = hashlib.md5(repr([normalized, self.facet_key_extra()]).encode(), usedforsecurity=False).hexdigest()
+        key = f'facets:{self.facet_namespace}:{namespace_version(self.facet_namespace)}:{digest}'
+        cache = reference_cache()
+        data = cache.get(key)
+        if data is None:
+            data = facet_counts(queryset, filterset, self.facets)
+            cache.set(key, data, timeout=settings.FACETS_CACHE_TIMEOUT)
+        return data
+
+    async def aget_facets(self):
+        # для async-представлений (booking_app.async_views): django-filter и кэш синхронные
+        return await sync_to_async(self.get_facets)()
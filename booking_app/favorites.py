@@ -0,0 +1,52 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import Favorite, FavoriteItem
+
+
+def favorite_hotel_ids(user):
+    return set(FavoriteItem.objects.filter(favorite__user=user).values_list('hotel_id', flat=True))
+
+
+def toggle_favorites(user, add=(), remove=()):
+    """Пакетно добавляет/убирает отели: один DELETE и один INSERT ... ON CONFLICT DO NOTHING."""
+    with transaction.atomic():
+        favorite, _ = Favorite.objects.get_or_create(user=user)
+        if remove:
+            FavoriteItem.objects.filter(favorite=favorite, hotel_id__in=remove).delete()
+        if add:
+            FavoriteItem.objects.bulk_create(
+                [FavoriteItem(favorite=favorite, hotel_id=hotel_id) for hotel_id in sorted(add)],
+                ignore_conflicts=True,
+            )
+    return favorite_hotel_ids(user)
+
+
+class FavoriteHotelsMixin:
+    """is_favorite в ответах об отелях: EXISTS-подзапрос в той же выборке, без отдельных запросов на отель.
+
+    Подзапрос идёт по уникальному индексу (favorite, hotel); при ?fields без is_favorite не добавляется.
+    """
+
+    def with_favorites(self, queryset):
+        user = self.request.user
+        if getattr(self, 'swagger_fake_view', False) or not user.is_authenticated:
+            return queryset
+        if hasattr(self, 'wants_field') and not self.wants_field('is_favorite'):
+            return queryset
+        self.favorites_annotated = True
+        return queryset.annotate(
+            is_favorite=Exists(FavoriteItem.objects.filter(favorite__user_id=user.pk, hotel=OuterRef('pk')))
+        )
+
+    def get_queryset(self):
+        return self.with_favorites(super().get_queryset())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['with_favorites'] = getattr(self, 'favorites_annotated', False)
+        return context
+
+    def etag_extra(self, objects):
+        # избранное не меняет updated_at отеля, но входит в ответ
+        return [*super().etag_extra(objects), *(getattr(obj, 'is_favorite', None) for obj in objects)]
@@ -0,0 +1,112 @@
+from collections import namedtuple
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+# fields — поля верхнего уровня (None — все); expand — вложенные объекты по путям через точку (None — все)
+Fieldset = namedtuple('Fieldset', ['fields', 'expand'])
+
+
+def parse_names(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def serializer_path(serializer):
+    # 'owner', 'room.room_hotel' ...; у корня и у child списка имя пустое
+    parts = []
+    node = serializer
+    while node.parent is not None:
+        if node.field_name:
+            parts.append(node.field_name)
+        node = node.parent
+    return '.'.join(reversed(parts))
+
+
+class SparseFieldsMixin:
+    """Урезает поля сериализатора по context['fieldset'] (см. FieldsetMixin).
+
+    Не раскрытая связь to-one выводится как id (из *_id, без JOIN), to-many — не выводится.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get('fieldset')
+        if fieldset is None:
+            return fields
+
+        path = serializer_path(self)
+        if not path and fieldset.fields is not None:
+            fields = {name: field for name, field in fields.items() if name in fieldset.fields}
+        if fieldset.expand is None:
+            return fields
+
+        trimmed = {}
+        for name, field in fields.items():
+            full_name = f'{path}.{name}' if path else name
+            if not isinstance(field, serializers.BaseSerializer) or full_name in fieldset.expand:
+                trimmed[name] = field
+            elif not isinstance(field, serializers.ListSerializer):
+                trimmed[name] = serializers.PrimaryKeyRelatedField(
+                    read_only=True, **({'source': field.source} if field.source else {})
+                )
+        return trimmed
+
+
+class FieldsetMixin:
+    """?fields=id,hotel_name,city и ?expand=city,owner.country для read-эндпоинтов.
+
+    select_relations / prefetch_relations: путь в ответе -> lookup queryset; связи, которые не попадут
+    в ответ, не join-ятся и не prefetch-атся. Без параметров ответ и выборка прежние.
+    """
+    select_relations = {}
+    prefetch_relations = {}
+
+    def get_fieldset(self):
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = self.parse_fieldset(self.request.query_params)
+        return self._fieldset
+
+    def parse_fieldset(self, params):
+        fields = expand = None
+        if 'fields' in params:
+            fields = parse_names(params['fields'])
+            unknown = fields - set(self.get_serializer_class().Meta.fields)
+            if unknown:
+                raise ValidationError({'fields': f"Неизвестные поля: {', '.join(sorted(unknown))}"})
+        if 'expand' in params:
+            expand = parse_names(params['expand'])
+            relations = {**self.select_relations, **self.prefetch_relations}
+            unknown = expand - set(relations)
+            if unknown:
+                raise ValidationError({'expand': f"Допустимые значения: {', '.join(relations)}"})
+            # room.room_hotel.city раскрывает и room, и room.room_hotel
+            expand |= {path.rsplit('.', i)[0] for path in expand for i in range(1, path.count('.') + 1)}
+        return Fieldset(fields, expand)
+
+    def wants_field(self, name):
+        fields = self.get_fieldset().fields
+        return fields is None or name in fields
+
+    def wants_relation(self, path):
+        fieldset = self.get_fieldset()
+        if fieldset.fields is not None and path.split('.')[0] not in fieldset.fields:
+            return False
+        return fieldset.expand is None or path in fieldset.expand
+
+    def with_relations(self, queryset):
+        select = [lookup for path, lookup in self.select_relations.items() if self.wants_relation(path)]
+        prefetch = [lookup for path, lookup in self.prefetch_relations.items() if self.wants_relation(path)]
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    def get_queryset(self):
+        return self.with_relations(super().get_queryset())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if not getattr(self, 'swagger_fake_view', False):
+            context['fieldset'] = self.get_fieldset()
+        return context
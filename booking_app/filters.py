@@ -1,4 +1,4 @@
-from django_filters import FilterSet
+from django_filters import FilterSet, NumberFilter
 from .models import Hotel, Room
 
 class HotelFilter(FilterSet):
@@ -19,3 +19,20 @@ class RoomFilter(FilterSet):
             'room_status': ['exact'],
             'room_price': ['gt', 'lt'],
         }
+
+
+class RoomAvailabilityFilter(FilterSet):
+    hotel = NumberFilter(field_name='room_hotel')
+    city = NumberFilter(field_name='room_hotel__city')
+    country = NumberFilter(field_name='room_hotel__country')
+    guests = NumberFilter(method='filter_guests')
+
+    class Meta:
+        model = Room
+        fields = {
+            'room_type': ['exact'],
+            'room_price': ['gt', 'lt'],
+        }
+
+    def filter_guests(self, queryset, name, value):
+        return queryset.for_guests(value)
@@ -0,0 +1,67 @@
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+# ячейка сетки 0.1° (~11 км по широте): номер = строка широты * GRID_COLUMNS + столбец долготы,
+# поэтому ячейки одной строки идут подряд и отбор по радиусу — несколько диапазонов B-tree индекса
+CELL_DEGREES = 0.1
+GRID_ROWS = round(180 / CELL_DEGREES)
+GRID_COLUMNS = round(360 / CELL_DEGREES)
+
+
+def _row(lat):
+    return min(int((lat + 90) / CELL_DEGREES), GRID_ROWS - 1)
+
+
+def _column(lon):
+    return int(((lon + 180) % 360) / CELL_DEGREES) % GRID_COLUMNS
+
+
+def geo_cell(lat, lon):
+    if lat is None or lon is None:
+        return None
+    return _row(lat) * GRID_COLUMNS + _column(lon)
+
+
+def cell_ranges(lat, lon, radius_km):
+    """Диапазоны geo_cell, покрывающие круг радиуса radius_km (с запасом до границ ячеек)."""
+    dlat = radius_km / KM_PER_DEGREE
+    lat_min, lat_max = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    widest = math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+    dlon = dlat / widest if widest > 1e-9 else 180.0
+
+    if dlon >= 180:
+        columns = [(0, GRID_COLUMNS - 1)]
+    else:
+        first, last = _column(lon - dlon), _column(lon + dlon)
+        # через антимеридиан — два отрезка
+        columns = [(first, last)] if first <= last else [(0, last), (first, GRID_COLUMNS - 1)]
+
+    ranges = []
+    for row in range(_row(lat_min), _row(lat_max) + 1):
+        for first, last in columns:
+            start, end = row * GRID_COLUMNS + first, row * GRID_COLUMNS + last
+            if ranges and start <= ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+            else:
+                ranges.append((start, end))
+    return ranges
+
+
+def cells_filter(lat, lon, radius_km, field='geo_cell'):
+    query = Q()
+    for start, end in cell_ranges(lat, lon, radius_km):
+        query |= Q(**{f'{field}__range': (start, end)})
+    return query
+
+
+def distance_km(lat, lon, lat_field='latitude', lon_field='longitude'):
+    """Расстояние по гаверсинусу от точки до (lat_field, lon_field); функции Django есть и в Postgres, и в SQLite."""
+    lat_rad, lon_rad = math.radians(lat), math.radians(lon)
+    half_dlat = (Radians(F(lat_field)) - Value(lat_rad)) / 2
+    half_dlon = (Radians(F(lon_field)) - Value(lon_rad)) / 2
+    a = Power(Sin(half_dlat), 2) + Value(math.cos(lat_rad)) * Cos(Radians(F(lat_field))) * Power(Sin(half_dlon), 2)
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a), output_field=FloatField())
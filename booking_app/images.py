@@ -0,0 +1,158 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor, wait
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .models import Country, UserProfile, City, Service, HotelImage, RoomImage
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = {
+    'thumb': 160,
+    'medium': 640,
+    'large': 1280,
+}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+IMAGE_FIELDS = [
+    (Country, 'country_image'),
+    (UserProfile, 'user_image'),
+    (City, 'city_image'),
+    (Service, 'service_logo'),
+    (HotelImage, 'hotel_images'),
+    (RoomImage, 'room_images'),
+]
+
+
+def variant_name(name, variant, ext=None):
+    # hotel_images/tesla.jpg -> variants/hotel_images/tesla_thumb.jpg (.webp)
+    root, original_ext = posixpath.splitext(name)
+    return f'variants/{root}_{variant}{ext or original_ext}'
+
+
+def variant_files(name):
+    # порядок записи generate_variants: последний файл — large .webp
+    for variant in VARIANT_SIZES:
+        yield variant_name(name, variant)
+        yield variant_name(name, variant, '.webp')
+
+
+def variants_exist(name):
+    *_, last = variant_files(name)
+    return default_storage.exists(last)
+
+
+def mark_variants_ready(model, field_name, names):
+    # save() по строкам, а не update(): сигналы сдвигают ETag отелей/броней и версии справочников
+    for obj in model._default_manager.filter(**{f'{field_name}__in': names}, variants_ready=False):
+        obj.variants_ready = True
+        obj.save(update_fields=['variants_ready'])
+
+
+def variant_urls(name, ready, build_url=None):
+    """ready — флаг variants_ready строки: на чтении хранилище не опрашивается."""
+    if not name:
+        return None
+    build_url = build_url or (lambda url: url)
+    if not ready:
+        # варианты ещё генерируются (или исходник не читается) — отдаём оригинал
+        original = build_url(default_storage.url(name))
+        return {variant: {'src': original, 'webp': None} for variant in VARIANT_SIZES}
+    return {
+        variant: {
+            'src': build_url(default_storage.url(variant_name(name, variant))),
+            'webp': build_url(default_storage.url(variant_name(name, variant, '.webp'))),
+        }
+        for variant in VARIANT_SIZES
+    }
+
+
+def _encode(image, fmt, **options):
+    buffer = BytesIO()
+    image.save(buffer, fmt, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_variants(name, force=False):
+    """Создаёт thumb/medium/large в исходном формате и в WebP. Возвращает число записанных файлов."""
+    if not default_storage.exists(name):
+        return 0
+    targets = [variant_name(name, variant, '.webp') for variant in VARIANT_SIZES]
+    if not force and all(default_storage.exists(target) for target in targets):
+        return 0
+
+    with default_storage.open(name, 'rb') as source:
+        original = Image.open(source)
+        fmt = original.format or 'JPEG'
+        original = ImageOps.exif_transpose(original)
+        original.load()
+
+    written = 0
+    for variant, size in VARIANT_SIZES.items():
+        image = original.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        if fmt == 'JPEG':
+            content = _encode(image.convert('RGB'), 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        else:
+            content = _encode(image, fmt)
+        webp = _encode(image, 'WEBP', quality=WEBP_QUALITY, method=4)
+
+        for target, data in ((variant_name(name, variant), content), (variant_name(name, variant, '.webp'), webp)):
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            default_storage.save(target, data)
+            written += 1
+    return written
+
+
+def generate_variants_safe(name, force=False):
+    try:
+        return generate_variants(name, force=force)
+    except Exception:
+        # битый файл не должен ломать сохранение модели или весь backfill
+        logger.exception('Не удалось создать варианты изображения %s', name)
+        return 0
+
+
+# генерация не держит запрос сохранения: Pillow отпускает GIL, хватает потоков процесса
+variant_pool = ThreadPoolExecutor(settings.IMAGE_VARIANT_WORKERS, thread_name_prefix='image-variants')
+pending_variants = set()
+
+
+def build_variants(model, field_name, name):
+    try:
+        generate_variants_safe(name)
+        if variants_exist(name):
+            mark_variants_ready(model, field_name, [name])
+    except Exception:
+        logger.exception('Не удалось отметить варианты изображения %s', name)
+    finally:
+        # соединения потока пула не переживают задачу
+        connections.close_all()
+
+
+def schedule_variants(model, field_name, name):
+    """После коммита ставит генерацию вариантов name в фоновый пул; до готовности variant_urls отдаёт оригинал."""
+    def submit():
+        future = variant_pool.submit(build_variants, model, field_name, name)
+        pending_variants.add(future)
+        future.add_done_callback(pending_variants.discard)
+    transaction.on_commit(submit)
+
+
+def wait_for_variants(timeout=None):
+    wait(list(pending_variants), timeout=timeout)
+
+
+def delete_variants(name):
+    for target in variant_files(name):
+        if default_storage.exists(target):
+            default_storage.delete(target)
@@ -0,0 +1,49 @@
+from django.db.models import QuerySet
+from modeltranslation.translator import NotRegistered, translator
+from modeltranslation.utils import get_language, resolution_order
+
+
+def inactive_translation_fields(model, language=None):
+    """Колонки переводов model, которые дескрипторы modeltranslation не прочитают на языке language.
+
+    Нужны только активный язык и его fallback-и (пустой hotel_name_en читается из hotel_name_ru);
+    исходная колонка (hotel_name) дескриптором не читается вовсе.
+    """
+    try:
+        opts = translator.get_options_for_model(model)
+    except NotRegistered:
+        return []
+    needed = resolution_order(language or get_language(), getattr(opts, 'fallback_languages', None))
+    names = []
+    for field_name, translation_fields in opts.all_fields.items():
+        names.append(field_name)
+        names.extend(field.name for field in translation_fields if field.language not in needed)
+    return names
+
+
+def _select_related_models(model, tree, prefix=''):
+    # query.select_related: {'city': {}, 'owner': {'country': {}}}
+    for name, subtree in tree.items():
+        related = model._meta.get_field(name).related_model
+        yield f'{prefix}{name}__', related
+        yield from _select_related_models(related, subtree, f'{prefix}{name}__')
+
+
+def defer_inactive_languages(queryset, language=None):
+    """Откладывает колонки неактивных языков у модели queryset и у моделей из select_related."""
+    if queryset._fields is not None:
+        return queryset  # values()/values_list() выбирают колонки сами
+
+    models = [('', queryset.model)]
+    if isinstance(queryset.query.select_related, dict):
+        models.extend(_select_related_models(queryset.model, queryset.query.select_related))
+    names = [f'{prefix}{name}' for prefix, model in models for name in inactive_translation_fields(model, language)]
+    # MultilingualQuerySet.defer('hotel_name') развернул бы имя во все языки — нужен defer() самого Django
+    return QuerySet.defer(queryset, *names) if names else queryset
+
+
+class ActiveLanguageMixin:
+    """Read-эндпоинты выбирают только колонки переводов активного языка (и его fallback-ов)."""
+
+    def filter_queryset(self, queryset):
+        return defer_inactive_languages(super().filter_queryset(queryset))
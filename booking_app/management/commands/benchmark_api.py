@@ -0,0 +1,227 @@
+import json
+import logging
+import math
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils import timezone, translation
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from booking_app import urls as booking_urls
+from booking_app.models import (
+    Country, UserProfile, City, Hotel, Room, Booking, Favorite, FavoriteItem
+)
+
+
+def iter_routes(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def route_specs(ctx):
+    """name -> (роль, метод, kwargs для reverse, тело/параметры). Маршрут без записи проверяется GET-ом."""
+    hotel, room, booking = ctx['hotel'], ctx['room'], ctx['booking']
+    client, favorite, favorite_item = ctx['client'], ctx['favorite'], ctx['favorite_item']
+    far = timezone.now() + timedelta(days=3650)
+    return {
+        'register': ('anon', 'post', {}, lambda: {
+            'username': 'benchmark_user', 'email': 'benchmark@example.com', 'password': 'benchmark-pass-123'
+        }),
+        'login': ('anon', 'post', {}, lambda: {'username': client.username, 'password': ctx['password']}),
+        'logout': ('client', 'post', {}, lambda: {'refresh': str(RefreshToken.for_user(client))}),
+        'user_profile': ('client', 'get', {}, None),
+        'country-list': ('owner', 'get', {}, None),
+        'country-detail': ('owner', 'get', {'pk': ctx['country'].pk}, None),
+        'city_list': ('client', 'get', {}, None),
+        'city_detail': ('client', 'get', {'pk': ctx['city'].pk}, None),
+        'hotel_list': ('client', 'get', {}, None),
+        'hotel_search': ('client', 'get', {}, lambda: {'q': hotel.hotel_name.split()[0]}),
+        'hotel_nearby': ('client', 'get', {}, lambda: {
+            'lat': hotel.latitude or 0, 'lon': hotel.longitude or 0, 'radius': 10,
+        }),
+        'hotel_detail': ('client', 'get', {'pk': hotel.pk}, None),
+        'hotel_create': ('owner', 'post', {}, lambda: {
+            'hotel_name': 'Benchmark', 'city': hotel.city_id, 'hotel_star': 3,
+            'description': 'benchmark', 'street': 'benchmark', 'owner': hotel.owner_id
+        }),
+        'hotel_update': ('owner', 'patch', {'pk': hotel.pk}, lambda: {'hotel_star': hotel.hotel_star}),
+        'hotel_analytics': ('owner', 'get', {'pk': hotel.pk}, lambda: {
+            'date_from': (timezone.now() - timedelta(days=30)).date().isoformat(),
+            'date_to': timezone.now().date().isoformat(),
+        }),
+        'room_create': ('owner', 'post', {}, lambda: {
+            'room_number': 32000, 'room_hotel': hotel.pk, 'room_price': 100, 'room_description': 'benchmark'
+        }),
+        'room_bulk_update': ('owner', 'patch', {}, lambda: [{'id': room.pk, 'room_price': room.room_price}]),
+        'room_quote': ('client', 'get', {}, lambda: {
+            'hotel': hotel.pk,
+            'check_in': timezone.now().date().isoformat(),
+            'check_out': (timezone.now() + timedelta(days=7)).date().isoformat(),
+        }),
+        'room_available': ('client', 'get', {}, lambda: {
+            'check_in': timezone.now().date().isoformat(),
+            'check_out': (timezone.now() + timedelta(days=3)).date().isoformat(),
+        }),
+        'review_create': ('client', 'post', {}, lambda: {
+            'user': client.pk, 'hotel': hotel.pk, 'stars': 5, 'description': 'benchmark'
+        }),
+        'review_export': ('owner', 'get', {}, None),
+        'booking_list': ('client', 'get', {}, None),
+        'booking_create': ('client', 'post', {}, lambda: {
+            'hotel': room.room_hotel_id, 'room': room.pk, 'status_book': 'подтверждено',
+            'check_in': far.isoformat(), 'check_out': (far + timedelta(days=2)).isoformat(),
+        }),
+        'booking_export': ('owner', 'get', {}, None),
+        'booking_detail': ('client', 'get', {'pk': booking.pk}, None),
+        'booking_update': ('client', 'patch', {'pk': booking.pk}, lambda: {'total_price': booking.total_price}),
+        'booking_delete': ('client', 'delete', {'pk': booking.pk}, None),
+        'favorite_list': ('client', 'get', {}, None),
+        'favorite_create': ('client', 'post', {}, lambda: {'user': client.pk}),
+        'favorite_update': ('client', 'patch', {'pk': favorite.pk}, lambda: {}),
+        'favorite_delete': ('client', 'delete', {'pk': favorite.pk}, None),
+        'favorite_hotels': ('client', 'post', {}, lambda: {'add': [hotel.pk], 'remove': []}),
+        'favorite_item_list': ('client', 'get', {}, None),
+        'favorite_item_create': ('client', 'post', {}, lambda: {'favorite': favorite.pk, 'hotel': hotel.pk}),
+        'favorite_item_update': ('client', 'patch', {'pk': favorite_item.pk}, lambda: {'quantity': 1}),
+        'favorite_item_delete': ('client', 'delete', {'pk': favorite_item.pk}, None),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Прогоняет все маршруты booking_app через тестовый клиент: p50/p95, число SQL-запросов, размер ответа'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--route', action='append', dest='routes', help='Только указанные маршруты')
+        parser.add_argument('--password', default='seed-password', help='Пароль клиента для маршрута login')
+        parser.add_argument('--output', help='Путь к JSON с результатами')
+        parser.add_argument('--compare', help='JSON предыдущего прогона для сравнения p50')
+
+    def handle(self, *args, **options):
+        ctx = self.context(options['password'])
+
+        # 4xx ожидаемы (например, 403 у CheckOwner) и не должны засорять вывод
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            # login/booking_create и др. повторяются десятки раз — троттлинг исказил бы замеры
+            with translation.override(settings.LANGUAGE_CODE.split('-')[0]), override_settings(
+                REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+            ):
+                results = self.run_routes(ctx, options)
+        finally:
+            request_logger.setLevel(previous_level)
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'iterations': options['iterations'],
+            'dataset': {model.__name__: model.objects.count() for model in (Hotel, Room, Booking, UserProfile)},
+            'results': results,
+        }
+        self.print_report(results, self.load(options['compare']) if options['compare'] else None)
+
+        output = Path(options['output'] or settings.BASE_DIR / 'benchmark_results' / f'api-{timezone.now():%Y%m%d-%H%M%S}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Результаты сохранены в {output}'))
+
+    def run_routes(self, ctx, options):
+        specs = route_specs(ctx)
+        users = {'anon': None, 'client': ctx['client'], 'owner': ctx['owner']}
+        results = {}
+        for pattern in iter_routes(booking_urls.urlpatterns):
+            if options['routes'] and pattern.name not in options['routes']:
+                continue
+            role, method, kwargs, payload = specs.get(pattern.name, ('client', 'get', {}, None))
+            client = APIClient()
+            if users[role] is not None:
+                client.force_authenticate(users[role])
+            results[pattern.name] = self.measure(client, method, reverse(pattern.name, kwargs=kwargs), payload, options)
+        return results
+
+    def context(self, password):
+        booking = (
+            Booking.objects.filter(user__user_role='client', user__favorite__isnull=False)
+            .select_related('user', 'room', 'hotel').order_by('id').first()
+        )
+        if booking is None:
+            raise CommandError('Нет данных для бенчмарка — сначала запустите seed_demo_data')
+        favorite = Favorite.objects.get(user=booking.user)
+        return {
+            'password': password,
+            'client': booking.user,
+            'owner': booking.hotel.owner,
+            'hotel': booking.hotel,
+            'room': booking.room,
+            'booking': booking,
+            'favorite': favorite,
+            'favorite_item': FavoriteItem.objects.filter(favorite=favorite).first()
+                             or FavoriteItem(pk=0, favorite=favorite),
+            'city': City.objects.order_by('id').first(),
+            'country': Country.objects.order_by('id').first(),
+        }
+
+    def measure(self, client, method, url, payload, options):
+        timings, queries, sizes, statuses = [], [], [], set()
+        for i in range(options['warmup'] + options['iterations']):
+            body = payload() if payload else None
+            # каждый запрос откатывается, поэтому данные не меняются между итерациями
+            with transaction.atomic(), CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                if method == 'get':
+                    response = client.get(url, body)
+                else:
+                    response = getattr(client, method)(url, body, format='json')
+                # выгрузки стримятся — время включает чтение всего потока
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            if i < options['warmup']:
+                continue
+            timings.append(elapsed * 1000)
+            queries.append(len(captured))
+            sizes.append(len(content))
+            statuses.add(response.status_code)
+
+        return {
+            'url': url,
+            'method': method.upper(),
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'queries': max(queries),
+            'bytes': max(sizes),
+        }
+
+    def load(self, path):
+        return json.loads(Path(path).read_text())['results']
+
+    def print_report(self, results, previous):
+        self.stdout.write(f"{'route':<24}{'method':<8}{'status':<12}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'bytes':>10}")
+        for name, row in results.items():
+            line = (
+                f"{name:<24}{row['method']:<8}{','.join(map(str, row['status'])):<12}"
+                f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['queries']:>9}{row['bytes']:>10}"
+            )
+            if previous and name in previous and previous[name]['p50_ms']:
+                change = (row['p50_ms'] / previous[name]['p50_ms'] - 1) * 100
+                line += f'  p50 {change:+.1f}%'
+            self.stdout.write(line)
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import ModuleType
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path, reverse
+from django.utils import timezone
+
+from booking_app.authentication import tokens_for_user
+from booking_app.management.commands.benchmark_api import percentile
+from booking_app.models import Booking
+from booking_app.views import ASYNC_READ_VIEWS, CityListView, HotelListView, HotelDetailAPIView, BookingListView
+
+ROUTES = {
+    'city_list': (CityListView, 'city/'),
+    'hotel_list': (HotelListView, 'hotel/'),
+    'hotel_detail': (HotelDetailAPIView, 'hotel/<int:pk>/'),
+    'booking_list': (BookingListView, 'booking/'),
+}
+# wsgi — sync-представления в пуле потоков (как gthread-воркер gunicorn);
+# asgi-sync / asgi-async — через ASGIHandler, как под uvicorn
+MODES = ('wsgi', 'asgi-sync', 'asgi-async')
+
+
+def benchmark_urlconf():
+    module = ModuleType('benchmark_async_urls')
+    module.urlpatterns = [
+        path(f'{variant}/{route}', view_class.as_view(), name=f'{name}_{variant}')
+        for name, (sync_class, route) in ROUTES.items()
+        for variant, view_class in (('sync', sync_class), ('async', ASYNC_READ_VIEWS[sync_class]))
+    ]
+    return module
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает пропускную способность sync- и async-версий read-эндпоинтов при ограниченной конкурентности'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на маршрут и уровень конкурентности')
+        parser.add_argument('--concurrency', type=int, action='append', help='По умолчанию 1, 8 и 32')
+        parser.add_argument('--mode', action='append', dest='modes', choices=MODES)
+        parser.add_argument('--route', action='append', dest='routes', choices=list(ROUTES))
+        parser.add_argument('--output', help='Путь к JSON с результатами')
+
+    def handle(self, *args, **options):
+        booking = Booking.objects.select_related('user').order_by('id').first()
+        if booking is None:
+            raise CommandError('Нет данных для бенчмарка — сначала запустите seed_demo_data')
+        headers = {'Authorization': f'Bearer {tokens_for_user(booking.user).access_token}'}
+
+        results = {}
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            with override_settings(ROOT_URLCONF=benchmark_urlconf()):
+                for name in options['routes'] or ROUTES:
+                    kwargs = {'pk': booking.hotel_id} if '<int:pk>' in ROUTES[name][1] else {}
+                    for mode in options['modes'] or MODES:
+                        variant = 'async' if mode == 'asgi-async' else 'sync'
+                        url = reverse(f'{name}_{variant}', kwargs=kwargs)
+                        for concurrency in options['concurrency'] or [1, 8, 32]:
+                            row = self.measure(mode, url, headers, options['requests'], concurrency)
+                            results.setdefault(name, []).append({'mode': mode, 'concurrency': concurrency, **row})
+        finally:
+            request_logger.setLevel(previous_level)
+
+        self.print_report(results)
+        output = Path(options['output'] or settings.BASE_DIR / 'benchmark_results' / f'async-{timezone.now():%Y%m%d-%H%M%S}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            'created_at': timezone.now().isoformat(),
+            'requests': options['requests'],
+            'results': results,
+        }, ensure_ascii=False, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Результаты сохранены в {output}'))
+
+    def measure(self, mode, url, headers, requests, concurrency):
+        started = time.perf_counter()
+        if mode == 'wsgi':
+            samples = self.run_threads(url, headers, requests, concurrency)
+        else:
+            samples = async_to_sync(self.run_async)(url, headers, requests, concurrency)
+        elapsed = time.perf_counter() - started
+
+        timings = [timing for timing, _ in samples]
+        return {
+            'status': sorted({status for _, status in samples}),
+            'rps': round(len(samples) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+        }
+
+    @staticmethod
+    def run_threads(url, headers, requests, concurrency):
+        def worker(count):
+            client = Client()
+            samples = []
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    response = client.get(url, headers=headers)
+                    samples.append(((time.perf_counter() - started) * 1000, response.status_code))
+            finally:
+                # у каждого потока своё соединение
+                connection.close()
+            return samples
+
+        counts = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return [sample for samples in pool.map(worker, counts) for sample in samples]
+
+    @staticmethod
+    async def run_async(url, headers, requests, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                return (time.perf_counter() - started) * 1000, response.status_code
+
+        return await asyncio.gather(*(one() for _ in range(requests)))
+
+    def print_report(self, results):
+        self.stdout.write(f"{'route':<16}{'mode':<12}{'conc':>6}{'status':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, rows in results.items():
+            for row in rows:
+                self.stdout.write(
+                    f"{name:<16}{row['mode']:<12}{row['concurrency']:>6}{','.join(map(str, row['status'])):>10}"
+                    f"{row['rps']:>10.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                )
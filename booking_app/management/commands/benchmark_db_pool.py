@@ -0,0 +1,122 @@
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from booking_app.authentication import tokens_for_user
+from booking_app.management.commands.benchmark_api import percentile
+from booking_app.models import Booking
+
+# connect — без пула и без постоянных соединений (CONN_MAX_AGE=0): соединение на каждый запрос;
+# persistent — CONN_MAX_AGE; pool — psycopg_pool с настройками из DATABASES
+MODES = ('connect', 'persistent', 'pool')
+DEFAULT_POOL = {'min_size': 1, 'max_size': 4}
+
+
+def backend_pid(wrapper):
+    raw = wrapper.connection
+    return raw.info.backend_pid if hasattr(raw, 'info') else raw.get_backend_pid()
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает стоимость запроса без пула, с постоянными соединениями и с пулом соединений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--mode', action='append', dest='modes', choices=MODES)
+        parser.add_argument('--route', action='append', dest='routes', choices=['city_list', 'hotel_list', 'hotel_detail'])
+        parser.add_argument('--output', help='Путь к JSON с результатами')
+
+    def handle(self, *args, **options):
+        booking = Booking.objects.select_related('user').order_by('id').first()
+        if booking is None:
+            raise CommandError('Нет данных для бенчмарка — сначала запустите seed_demo_data')
+        headers = {'Authorization': f'Bearer {tokens_for_user(booking.user).access_token}'}
+        kwargs = {'hotel_detail': {'pk': booking.hotel_id}}
+
+        original = {
+            'CONN_MAX_AGE': connection.settings_dict['CONN_MAX_AGE'],
+            'OPTIONS': dict(connection.settings_dict['OPTIONS']),
+        }
+        results = {}
+        try:
+            with translation.override(settings.LANGUAGE_CODE.split('-')[0]):
+                for name in options['routes'] or ['city_list', 'hotel_detail']:
+                    url = reverse(name, kwargs=kwargs.get(name))
+                    for mode in options['modes'] or MODES:
+                        self.configure(mode, original)
+                        results.setdefault(name, {})[mode] = self.measure(url, headers, options['requests'])
+        finally:
+            self.configure(None, original)
+
+        self.stdout.write(f"{'route':<16}{'mode':<12}{'p50 ms':>10}{'p95 ms':>10}{'connects':>10}{'backends':>10}")
+        for name, rows in results.items():
+            for mode, row in rows.items():
+                self.stdout.write(
+                    f"{name:<16}{mode:<12}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                    f"{row['connects']:>10}{row['backends']:>10}"
+                )
+
+        output = Path(options['output'] or settings.BASE_DIR / 'benchmark_results' / f'db-pool-{timezone.now():%Y%m%d-%H%M%S}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps({
+            'created_at': timezone.now().isoformat(),
+            'requests': options['requests'],
+            'results': results,
+        }, ensure_ascii=False, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Результаты сохранены в {output}'))
+
+    @staticmethod
+    def configure(mode, original):
+        connection.close()
+        if connection.settings_dict['OPTIONS'].get('pool'):
+            connection.close_pool()
+        options = dict(original['OPTIONS'])
+        options.pop('pool', None)
+        conn_max_age = 0
+        if mode is None:
+            options, conn_max_age = original['OPTIONS'], original['CONN_MAX_AGE']
+        elif mode == 'persistent':
+            conn_max_age = 600
+        elif mode == 'pool':
+            options['pool'] = original['OPTIONS'].get('pool') or DEFAULT_POOL
+        connection.settings_dict['OPTIONS'] = options
+        connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+
+    @staticmethod
+    def measure(url, headers, requests):
+        pids = set()
+        connects = []
+
+        def on_connect(sender, connection, **kwargs):
+            connects.append(1)
+            pids.add(backend_pid(connection))
+
+        client = Client()
+        timings, statuses = [], set()
+        connection_created.connect(on_connect)
+        try:
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = client.get(url, headers=headers)
+                # тестовый клиент не шлёт request_finished-обработку соединений — делаем её сами
+                close_old_connections()
+                timings.append((time.perf_counter() - started) * 1000)
+                statuses.add(response.status_code)
+        finally:
+            connection_created.disconnect(on_connect)
+
+        return {
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'connects': len(connects),
+            'backends': len(pids),
+        }
@@ -0,0 +1,49 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import translation
+
+from booking_app.exports import EXPORT_CHUNK_SIZE, EXPORTS, RENDERERS, export_stream
+from booking_app.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает брони или отзывы в CSV/NDJSON (по умолчанию в stdout)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(EXPORTS))
+        parser.add_argument('--output-format', dest='output', choices=list(RENDERERS), default='csv')
+        parser.add_argument('--owner', help='username владельца: только его отели')
+        parser.add_argument('--hotel', type=int)
+        parser.add_argument('--gzip', action='store_true', help='Сжимать вывод gzip')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument('--file', help='Путь к файлу; по умолчанию stdout')
+        parser.add_argument('--language', default=settings.MODELTRANSLATION_DEFAULT_LANGUAGE)
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            owner = UserProfile.objects.filter(username=options['owner'], user_role='owner').first()
+            if owner is None:
+                raise CommandError(f"Владелец {options['owner']} не найден")
+
+        with translation.override(options['language']):
+            stream = export_stream(
+                options['kind'], options['output'], gzip=options['gzip'],
+                owner=owner, hotel=options['hotel'], chunk_size=options['chunk_size'],
+            )
+            if options['file']:
+                with open(options['file'], 'wb') as target:
+                    written = self.write(stream, target)
+                self.stderr.write(self.style.SUCCESS(f"Записано {written} байт в {options['file']}"))
+            else:
+                self.write(stream, getattr(self.stdout, 'buffer', None) or sys.stdout.buffer)
+
+    @staticmethod
+    def write(stream, target):
+        written = 0
+        for part in stream:
+            target.write(part)
+            written += len(part)
+        return written
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from booking_app.images import IMAGE_FIELDS, generate_variants_safe, mark_variants_ready, variants_exist
+
+
+class Command(BaseCommand):
+    help = 'Создаёт thumb/medium/large и WebP варианты для уже загруженных изображений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--force', action='store_true', help='Пересоздать существующие варианты')
+
+    def handle(self, *args, **options):
+        names = set()
+        for model, field_name in IMAGE_FIELDS:
+            names.update(
+                model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                .values_list(field_name, flat=True).iterator()
+            )
+
+        def generate(name):
+            return generate_variants_safe(name, force=options['force']), variants_exist(name)
+
+        # Pillow отпускает GIL на декодировании/ресайзе/кодировании, потоков достаточно
+        with ThreadPoolExecutor(options['workers']) as pool:
+            results = dict(zip(sorted(names), pool.map(generate, sorted(names))))
+
+        ready = [name for name, (_, exists) in results.items() if exists]
+        for model, field_name in IMAGE_FIELDS:
+            mark_variants_ready(model, field_name, ready)
+
+        written = sum(count for count, _ in results.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Изображений: {len(names)}, записано вариантов: {written}, готово: {len(ready)}'
+        ))
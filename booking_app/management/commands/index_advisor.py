@@ -0,0 +1,118 @@
+import json
+from datetime import timedelta
+from itertools import combinations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+
+from booking_app.filters import HotelFilter, RoomFilter
+from booking_app.models import Hotel, Room, Booking
+
+
+def filter_dimensions(filterset_class):
+    # 'hotel_star__gt' и 'hotel_star__lt' — одно измерение: диапазон по hotel_star
+    dimensions = {}
+    for name, f in filterset_class.base_filters.items():
+        dimensions.setdefault(f.field_name, []).append((name, f.lookup_expr))
+    return dimensions
+
+
+def sample_params(model, dimensions):
+    params = {}
+    sample = model.objects.order_by('?').first()
+    for field_name, filters in dimensions.items():
+        bounds = model.objects.aggregate(low=Min(field_name), high=Max(field_name))
+        for name, lookup in filters:
+            if lookup == 'exact':
+                value = getattr(sample, model._meta.get_field(field_name).attname)
+            elif lookup == 'gt':
+                value = bounds['low'] + (bounds['high'] - bounds['low']) * 0.4
+            else:
+                value = bounds['low'] + (bounds['high'] - bounds['low']) * 0.6
+            params[name] = int(value) if isinstance(value, float) else value
+    return params
+
+
+def filterset_queries(filterset_class):
+    model = filterset_class._meta.model
+    dimensions = filter_dimensions(filterset_class)
+    params = sample_params(model, dimensions)
+    fields = list(dimensions)
+    for size in range(1, len(fields) + 1):
+        for combo in combinations(fields, size):
+            data = {name: params[name] for field in combo for name, _ in dimensions[field]}
+            yield f'{filterset_class.__name__}({", ".join(combo)})', filterset_class(data, model.objects.all()).qs
+
+
+def booking_queries():
+    booking = Booking.objects.order_by('?').first()
+    start, end = booking.check_in, booking.check_in + timedelta(days=7)
+    yield 'Booking(check_in range)', Booking.objects.filter(check_in__gte=start, check_in__lt=end)
+    yield 'Booking(hotel, check_in range)', Booking.objects.filter(
+        hotel=booking.hotel_id, check_in__gte=start, check_in__lt=end
+    )
+    yield 'Booking(room, period overlap)', Booking.objects.active().overlapping(start, end).filter(room=booking.room_id)
+    yield 'Room.available(city)', Room.objects.available(start, end).filter(room_hotel__city=booking.hotel.city_id)
+
+
+def walk(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from walk(child)
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN ANALYZE для всех комбинаций HotelFilter/RoomFilter и выборок Booking по датам; ищет Seq Scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-removed', type=int, default=1000,
+                            help='Seq Scan считается проблемой, если отбросил фильтром не меньше строк')
+        parser.add_argument('--json', dest='json_path', help='Сохранить отчёт в JSON')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stderr.write('index_advisor работает только с PostgreSQL')
+            return
+
+        # параметры берутся из существующих строк — на пустой базе подставить нечего
+        empty = [model.__name__ for model in (Hotel, Room, Booking) if not model.objects.exists()]
+        if empty:
+            raise CommandError(f"Нет данных в {', '.join(empty)} — сначала запустите seed_demo_data")
+
+        queries = [
+            *filterset_queries(HotelFilter),
+            *filterset_queries(RoomFilter),
+            *booking_queries(),
+        ]
+
+        report = []
+        for label, queryset in queries:
+            plan = json.loads(queryset.explain(analyze=True, format='json'))[0]
+            seq_scans = [
+                {
+                    'relation': node['Relation Name'],
+                    'rows': node.get('Actual Rows'),
+                    'removed': node.get('Rows Removed by Filter', 0),
+                }
+                for node in walk(plan['Plan']) if node['Node Type'] == 'Seq Scan'
+            ]
+            flagged = [scan for scan in seq_scans if scan['removed'] >= options['min_removed']]
+            report.append({
+                'query': label,
+                'execution_ms': plan['Execution Time'],
+                'indexes': sorted({node['Index Name'] for node in walk(plan['Plan']) if 'Index Name' in node}),
+                'seq_scans': seq_scans,
+                'flagged': bool(flagged),
+            })
+
+            style = self.style.WARNING if flagged else self.style.SUCCESS
+            scans = ', '.join(f"{s['relation']} (-{s['removed']})" for s in seq_scans) or '—'
+            self.stdout.write(style(
+                f"{'SEQ ' if flagged else 'ok  '}{label:<60}{plan['Execution Time']:>9.2f} ms  seq: {scans}"
+            ))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(f"Проблемных запросов: {sum(row['flagged'] for row in report)} из {len(report)}")
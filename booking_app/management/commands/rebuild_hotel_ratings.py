@@ -0,0 +1,56 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from booking_app.models import Hotel, Review
+
+RATING_FIELDS = ['review_count', 'avg_rating'] + [f'rating_{i}' for i in range(1, 6)]
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает avg_rating, review_count и гистограмму звёзд отелей по таблице отзывов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        stats = {
+            row.pop('hotel'): row
+            for row in Review.objects.values('hotel').annotate(
+                **{f'rating_{i}': Count('id', filter=Q(stars=i)) for i in range(1, 6)}
+            ).order_by()
+        }
+
+        fixed = []
+        checked = 0
+        now = timezone.now()
+        hotels = Hotel.objects.only('id', *RATING_FIELDS).order_by('id')
+        for hotel in hotels.iterator(chunk_size=options['batch_size']):
+            checked += 1
+            expected = self.expected_values(stats.get(hotel.id))
+            if all(getattr(hotel, field) == value for field, value in expected.items()):
+                continue
+            for field, value in expected.items():
+                setattr(hotel, field, value)
+            hotel.updated_at = now
+            fixed.append(hotel)
+
+        with transaction.atomic():
+            Hotel.objects.bulk_update(fixed, RATING_FIELDS + ['updated_at'], batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Проверено отелей: {checked}, исправлено: {len(fixed)}'))
+
+    @staticmethod
+    def expected_values(histogram):
+        histogram = histogram or {f'rating_{i}': 0 for i in range(1, 6)}
+        count = sum(histogram.values())
+        total = sum(i * histogram[f'rating_{i}'] for i in range(1, 6))
+        avg_rating = Decimal(total) / count if count else Decimal(0)
+        return {
+            'review_count': count,
+            'avg_rating': avg_rating.quantize(Decimal('0.1'), rounding=ROUND_HALF_UP),
+            **histogram,
+        }
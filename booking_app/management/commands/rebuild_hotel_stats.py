@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from booking_app.models import Booking, HotelDailyStats
+from booking_app.rollups import contributions
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает суточную статистику отелей (ночи, выручка, отмены) по таблице броней'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        totals = None
+        bookings = Booking.objects.values_list(
+            'hotel_id', 'room__room_type', 'check_in', 'check_out', 'status_book', 'total_price',
+        ).order_by()
+        for state in bookings.iterator(chunk_size=options['batch_size']):
+            totals = contributions(state, into=totals)
+
+        rows = [
+            HotelDailyStats(hotel_id=hotel_id, room_type=room_type, day=day,
+                            nights_sold=nights, revenue=revenue, cancellations=cancellations)
+            for (hotel_id, room_type, day), (nights, revenue, cancellations) in (totals or {}).items()
+        ]
+        with transaction.atomic():
+            HotelDailyStats.objects.all().delete()
+            HotelDailyStats.objects.bulk_create(rows, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Строк статистики: {len(rows)}'))
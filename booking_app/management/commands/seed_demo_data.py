@@ -0,0 +1,148 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from booking_app.geo import geo_cell
+from booking_app.models import (
+    Country, UserProfile, City, Hotel, HotelImage,
+    Room, RoomImage, Review, Booking, Favorite, FavoriteItem
+)
+
+ROOM_TYPES = [choice for choice, _ in Room.TYPE_CHOICES]
+WORDS = ['sunny', 'quiet', 'central', 'cozy', 'mountain', 'lake', 'river', 'garden', 'royal', 'silk road']
+
+
+class Command(BaseCommand):
+    help = 'Заполняет БД демонстрационными данными заданного объёма (для бенчмарков и нагрузочных тестов)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--countries', type=int, default=5)
+        parser.add_argument('--cities', type=int, default=20)
+        parser.add_argument('--owners', type=int, default=20)
+        parser.add_argument('--clients', type=int, default=200)
+        parser.add_argument('--hotels', type=int, default=200)
+        parser.add_argument('--rooms-per-hotel', type=int, default=10)
+        parser.add_argument('--images-per-hotel', type=int, default=3)
+        parser.add_argument('--reviews-per-hotel', type=int, default=20)
+        parser.add_argument('--bookings-per-room', type=int, default=5)
+        parser.add_argument('--favorites-per-client', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        self.rnd = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        # префикс делает повторный запуск безопасным для unique-полей
+        self.prefix = f'seed{timezone.now():%Y%m%d%H%M%S}'
+
+        with transaction.atomic():
+            countries = self.bulk(Country, [
+                Country(
+                    country_name_ru=f'{self.prefix} страна {i}', country_name_en=f'{self.prefix} country {i}',
+                    country_image='country_image/tesla.jpg'
+                )
+                for i in range(options['countries'])
+            ])
+            cities = self.bulk(City, [
+                City(
+                    city_name_ru=f'{self.prefix} город {i}', city_name_en=f'{self.prefix} city {i}',
+                    city_image='city_image/tesla.jpg'
+                )
+                for i in range(options['cities'])
+            ])
+            # отели города разбросаны вокруг его центра (~15 км) — для /hotel/nearby/
+            self.city_centers = {city.pk: (self.rnd.uniform(-60, 70), self.rnd.uniform(-180, 180)) for city in cities}
+
+            password = make_password('seed-password')
+            owners = self.users(options['owners'], 'owner', password, countries)
+            clients = self.users(options['clients'], 'client', password, countries)
+
+            hotels = self.bulk(Hotel, [self.hotel(i, cities, countries, owners) for i in range(options['hotels'])])
+            self.bulk(HotelImage, [
+                HotelImage(hotel=hotel, hotel_images='hotel_images/tesla.jpg')
+                for hotel in hotels for _ in range(options['images_per_hotel'])
+            ])
+            rooms = self.bulk(Room, [
+                self.room(hotel, number) for hotel in hotels for number in range(1, options['rooms_per_hotel'] + 1)
+            ])
+            self.bulk(RoomImage, [RoomImage(room=room, room_images='room_images/tesla.jpg') for room in rooms])
+            self.bulk(Review, [
+                Review(
+                    user=self.rnd.choice(clients), hotel=hotel, country=self.rnd.choice(countries),
+                    stars=self.rnd.choices(range(1, 6), weights=[1, 1, 3, 5, 4])[0],
+                    description=' '.join(self.rnd.sample(WORDS, 4))
+                )
+                for hotel in hotels for _ in range(options['reviews_per_hotel'])
+            ])
+            self.bulk(Booking, [
+                booking for room in rooms for booking in self.bookings(room, clients, options['bookings_per_room'])
+            ])
+            favorites = self.bulk(Favorite, [Favorite(user=client) for client in clients])
+            self.bulk(FavoriteItem, [
+                FavoriteItem(favorite=favorite, hotel=hotel)
+                for favorite in favorites
+                for hotel in self.rnd.sample(hotels, min(options['favorites_per_client'], len(hotels)))
+            ])
+
+            # bulk_create не вызывает сигналы — догоняем производные колонки
+            Hotel.objects.filter(pk__in=[hotel.pk for hotel in hotels]).update_search_vector()
+        call_command('rebuild_hotel_ratings', stdout=self.stdout)
+        call_command('rebuild_hotel_stats', stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: отелей {len(hotels)}, номеров {len(rooms)}, клиентов {len(clients)} (префикс {self.prefix})'
+        ))
+
+    def bulk(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def users(self, count, role, password, countries):
+        return self.bulk(UserProfile, [
+            UserProfile(
+                username=f'{self.prefix}_{role}_{i}', email=f'{self.prefix}_{role}_{i}@example.com',
+                password=password, user_role=role, country=self.rnd.choice(countries), age=self.rnd.randint(18, 70)
+            )
+            for i in range(count)
+        ])
+
+    def hotel(self, i, cities, countries, owners):
+        name = ' '.join(self.rnd.sample(WORDS, 2)).title()
+        city = self.rnd.choice(cities)
+        center_lat, center_lon = self.city_centers[city.pk]
+        latitude = center_lat + self.rnd.uniform(-0.15, 0.15)
+        longitude = (center_lon + self.rnd.uniform(-0.15, 0.15) + 180) % 360 - 180
+        return Hotel(
+            hotel_name_ru=f'Отель {name} {i}', hotel_name_en=f'{name} Hotel {i}',
+            description_ru=f'Описание: {name}', description_en=' '.join(self.rnd.sample(WORDS, 6)),
+            street_ru=f'ул. {self.rnd.choice(WORDS)} {i}', street_en=f'{self.rnd.choice(WORDS)} street {i}',
+            city=city, country=self.rnd.choice(countries),
+            hotel_star=self.rnd.randint(1, 5), owner=self.rnd.choice(owners),
+            # bulk_create не вызывает pre_save — ячейку считаем сами
+            latitude=latitude, longitude=longitude, geo_cell=geo_cell(latitude, longitude),
+        )
+
+    def room(self, hotel, number):
+        return Room(
+            room_number=number, room_hotel=hotel, room_type=self.rnd.choice(ROOM_TYPES),
+            room_price=self.rnd.randrange(20, 500, 5),
+            room_description_ru='Номер с видом', room_description_en='Room with a view'
+        )
+
+    def bookings(self, room, clients, count):
+        # брони одного номера идут подряд без пересечений (ExclusionConstraint)
+        check_in = timezone.now().replace(hour=14, minute=0, second=0, microsecond=0) - timedelta(days=60)
+        for _ in range(count):
+            check_in += timedelta(days=self.rnd.randint(0, 10))
+            nights = self.rnd.randint(1, 7)
+            yield Booking(
+                user=self.rnd.choice(clients), hotel_id=room.room_hotel_id, room=room,
+                check_in=check_in, check_out=check_in + timedelta(days=nights),
+                total_price=room.room_price * nights,
+                status_book=self.rnd.choices(['подтверждено', 'отменено'], weights=[9, 1])[0]
+            )
+            check_in += timedelta(days=nights)
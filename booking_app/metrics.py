@@ -0,0 +1,139 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.serializers import BaseSerializer
+
+# метрики текущего запроса; заполняются middleware, execute_wrapper и корневым serializer.data
+current_timing = ContextVar('current_timing', default=None)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class RequestTiming:
+    __slots__ = ('started', 'db_queries', 'db_seconds', 'serializer_seconds', 'serializer_depth')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            snapshot = {labels: (list(counts), total, count) for labels, (counts, total, count) in self.series.items()}
+        for labels, (counts, total, count) in sorted(snapshot.items()):
+            label_text = ','.join(f'{key}="{value}"' for key, value in labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram('booking_request_duration_seconds', 'Wall time per request', SECONDS_BUCKETS)
+DB_SECONDS = Histogram('booking_db_duration_seconds', 'SQL time per request', SECONDS_BUCKETS)
+DB_QUERIES = Histogram('booking_db_queries', 'SQL queries per request', QUERY_BUCKETS)
+SERIALIZER_SECONDS = Histogram('booking_serializer_duration_seconds', 'Serializer time per request', SECONDS_BUCKETS)
+RESPONSE_BYTES = Histogram('booking_response_size_bytes', 'Response body size', BYTES_BUCKETS)
+HISTOGRAMS = (REQUEST_SECONDS, DB_SECONDS, DB_QUERIES, SERIALIZER_SECONDS, RESPONSE_BYTES)
+
+# дополнительные источники (например, статистика пула соединений): функции, возвращающие строки в формате Prometheus
+COLLECTORS = []
+
+
+def observe_request(view, method, status, timing, elapsed, size):
+    labels = (('view', view), ('method', method), ('status', str(status)))
+    REQUEST_SECONDS.observe(labels, elapsed)
+    DB_SECONDS.observe(labels, timing.db_seconds)
+    DB_QUERIES.observe(labels, timing.db_queries)
+    SERIALIZER_SECONDS.observe(labels, timing.serializer_seconds)
+    RESPONSE_BYTES.observe(labels, size)
+
+
+def count_query(execute, sql, params, many, context):
+    timing = current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.db_seconds += time.perf_counter() - started
+        timing.db_queries += 1
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """connection_created: count_query ставится на соединение того потока, где идут запросы.
+
+    Соединения Django привязаны к потоку, и ORM async-стека работает в потоках sync_to_async —
+    обёртка, поставленная в event loop, их не видит. Вне запроса (current_timing пуст) она прозрачна.
+    """
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_query)
+
+
+def instrument_serializers():
+    """Оборачивает BaseSerializer.data: время считается только для корневого сериализатора."""
+    original = BaseSerializer.data
+    if getattr(original.fget, 'instrumented', False):
+        return
+
+    def data(self):
+        timing = current_timing.get()
+        if timing is None or timing.serializer_depth:
+            return original.fget(self)
+        timing.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            timing.serializer_seconds += time.perf_counter() - started
+            timing.serializer_depth -= 1
+
+    data.instrumented = True
+    BaseSerializer.data = property(data)
+
+
+def render_metrics():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+    for collector in COLLECTORS:
+        lines += collector()
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
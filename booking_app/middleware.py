@@ -0,0 +1,55 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import RequestTiming, current_timing, observe_request
+
+
+class PerformanceMiddleware:
+    """Время запроса, SQL (число и время), время сериализаторов и размер ответа: Server-Timing + /metrics."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        # SQL считает count_query на каждом соединении (metrics.instrument_connection)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        # current_timing — ContextVar: sync_to_async переносит его в поток, где выполняется ORM
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.finish(request, response, timing)
+
+    def finish(self, request, response, timing):
+        elapsed = time.perf_counter() - timing.started
+
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'unmatched'
+        size = 0 if response.streaming else len(response.content)
+        observe_request(view, request.method, response.status_code, timing, elapsed, size)
+
+        response['Server-Timing'] = (
+            f'db;dur={timing.db_seconds * 1000:.2f};desc="{timing.db_queries} queries", '
+            f'ser;dur={timing.serializer_seconds * 1000:.2f}, '
+            f'app;dur={elapsed * 1000:.2f}'
+        )
+        return response
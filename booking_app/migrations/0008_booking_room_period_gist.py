@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:08
+
+import booking_app.models
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0007_alter_review_hotel'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddIndex(
+            model_name='booking',
+            index=django.contrib.postgres.indexes.GistIndex(models.F('room'), booking_app.models.TsTzRange('check_in', 'check_out'), condition=models.Q(('status_book', 'отменено'), _negated=True), name='booking_room_period_gist'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:09
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+RATING_FIELDS = ['review_count', 'avg_rating'] + [f'rating_{i}' for i in range(1, 6)]
+
+
+def fill_ratings(apps, schema_editor):
+    # то же, что manage.py rebuild_hotel_ratings: один GROUP BY по отзывам и bulk_update отелей с отзывами
+    Hotel = apps.get_model('booking_app', 'Hotel')
+    Review = apps.get_model('booking_app', 'Review')
+    hotels = []
+    for row in Review.objects.values('hotel').annotate(
+        **{f'rating_{i}': Count('id', filter=Q(stars=i)) for i in range(1, 6)}
+    ).order_by():
+        hotel = Hotel(pk=row.pop('hotel'), **row)
+        hotel.review_count = sum(row.values())
+        total = sum(i * row[f'rating_{i}'] for i in range(1, 6))
+        hotel.avg_rating = (Decimal(total) / hotel.review_count).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
+        hotels.append(hotel)
+    Hotel.objects.bulk_update(hotels, RATING_FIELDS, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0008_booking_room_period_gist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='avg_rating',
+            field=models.DecimalField(decimal_places=1, default=0, max_digits=2),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0010_booking_room_period_excl'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['total_price', 'id'], name='booking_price_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['check_in', 'id'], name='booking_check_in_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['-avg_rating', '-id'], name='hotel_rating_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:13
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_search_vector(apps, schema_editor):
+    Hotel = apps.get_model('booking_app', 'Hotel')
+    City = apps.get_model('booking_app', 'City')
+    vector = None
+    for lang, config in (('ru', 'russian'), ('en', 'english')):
+        city_name = Subquery(City.objects.filter(pk=OuterRef('city_id')).values(f'city_name_{lang}'))
+        part = (
+            SearchVector(f'hotel_name_{lang}', config=config, weight='A')
+            + SearchVector(city_name, config=config, weight='B')
+            + SearchVector(f'street_{lang}', config=config, weight='C')
+            + SearchVector(f'description_{lang}', config=config, weight='D')
+        )
+        vector = part if vector is None else vector + part
+    Hotel.objects.update(search_vector=vector)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0011_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='hotel_search_vector_gin'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:23
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0013_filter_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_from', models.DateField()),
+                ('date_to', models.DateField()),
+                ('weekdays', models.PositiveSmallIntegerField(default=127, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(127)])),
+                ('price', models.PositiveIntegerField()),
+                ('priority', models.PositiveSmallIntegerField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rates', to='booking_app.room')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['room', 'date_to', 'date_from'], name='room_rate_period_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StayDiscount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_nights', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(2)])),
+                ('percent', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(90)])),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stay_discounts', to='booking_app.hotel')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('hotel', 'min_nights'), name='stay_discount_unique_nights')],
+            },
+        ),
+    ]
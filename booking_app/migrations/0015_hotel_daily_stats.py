@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0014_room_rates_stay_discounts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HotelDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('room_type', models.CharField(choices=[('люкс', 'люкс'), ('семейный', 'семейный'), ('одноместный', 'одноместный'), ('двухместный', 'двухместный')], max_length=16)),
+                ('day', models.DateField()),
+                ('nights_sold', models.IntegerField(default=0)),
+                ('revenue', models.BigIntegerField(default=0)),
+                ('cancellations', models.IntegerField(default=0)),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='booking_app.hotel')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hotel', 'day'], name='hotel_daily_stats_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('hotel', 'room_type', 'day'), name='hotel_daily_stats_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:58
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0016_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='geo_cell',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['geo_cell'], name='hotel_geo_cell_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='hotel',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('latitude__isnull', True), ('longitude__isnull', True)), models.Q(('latitude__isnull', False), ('longitude__isnull', False)), _connector='OR'), name='hotel_coordinates_pair'),
+        ),
+    ]
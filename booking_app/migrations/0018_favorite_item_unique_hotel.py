@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:01
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_items(apps, schema_editor):
+    # из повторов одного отеля в избранном остаётся самая ранняя запись
+    FavoriteItem = apps.get_model('booking_app', 'FavoriteItem')
+    duplicates = (
+        FavoriteItem.objects.values('favorite', 'hotel')
+        .annotate(first_id=Min('id'), items=Count('id'))
+        .filter(items__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        FavoriteItem.objects.filter(favorite=row['favorite'], hotel=row['hotel']).exclude(pk=row['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0017_hotel_geo'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favoriteitem',
+            constraint=models.UniqueConstraint(fields=('favorite', 'hotel'), name='favorite_item_unique_hotel'),
+        ),
+    ]
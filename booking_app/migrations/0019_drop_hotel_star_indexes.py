@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:36
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0018_favorite_item_unique_hotel'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='hotel',
+            name='hotel_city_star_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='hotel',
+            name='hotel_country_star_idx',
+        ),
+    ]
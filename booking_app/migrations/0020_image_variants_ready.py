@@ -0,0 +1,71 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:16
+
+import posixpath
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+IMAGE_FIELDS = [
+    ('Country', 'country_image'),
+    ('UserProfile', 'user_image'),
+    ('City', 'city_image'),
+    ('Service', 'service_logo'),
+    ('HotelImage', 'hotel_images'),
+    ('RoomImage', 'room_images'),
+]
+
+
+def fill_variants_ready(apps, schema_editor):
+    # до этой миграции готовность проверялась по файлу large .webp — один раз смотрим его для каждого имени
+    for model_name, field_name in IMAGE_FIELDS:
+        model = apps.get_model('booking_app', model_name)
+        names = (
+            model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            .values_list(field_name, flat=True).order_by().distinct()
+        )
+        ready = [
+            name for name in names
+            if default_storage.exists(f'variants/{posixpath.splitext(name)[0]}_large.webp')
+        ]
+        model.objects.filter(**{f'{field_name}__in': ready}).update(variants_ready=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking_app', '0019_drop_hotel_star_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='variants_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='country',
+            name='variants_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hotelimage',
+            name='variants_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='roomimage',
+            name='variants_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='variants_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='variants_ready',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(fill_variants_ready, migrations.RunPython.noop),
+    ]
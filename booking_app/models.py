@@ -1,12 +1,26 @@
 from django.db import models
+from django.db.models import Exists, F, Func, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Now, Round
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from phonenumber_field.modelfields import PhoneNumberField
 
+from .geo import cells_filter, distance_km
+
+
+class TsTzRange(Func):
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
 
 class Country(models.Model):
     country_name = models.CharField(max_length=64, unique=True)
     country_image = models.ImageField(upload_to='country_image/')
+    variants_ready = models.BooleanField(default=False, editable=False)
 
     def __str__(self):
         return self.country_name
@@ -31,6 +45,7 @@ class UserProfile(AbstractUser):
     )
     user_phone_number = PhoneNumberField(null=True, blank=True)
     user_image = models.ImageField(upload_to='user_image/', null=True, blank=True)
+    variants_ready = models.BooleanField(default=False, editable=False)
     user_role = models.CharField(max_length=16, choices=ROLE_CHOICES, default='client')
     created_date = models.DateTimeField(auto_now_add=True)
 
@@ -41,11 +56,76 @@ class UserProfile(AbstractUser):
 class City(models.Model):
     city_name = models.CharField(max_length=64, unique=True)
     city_image = models.ImageField(upload_to='city_image/')
+    variants_ready = models.BooleanField(default=False, editable=False)
 
     def __str__(self):
         return self.city_name
 
 
+SEARCH_CONFIGS = {
+    'ru': 'russian',
+    'en': 'english',
+}
+
+
+class HotelQuerySet(models.QuerySet):
+    def apply_review(self, hotel_id, stars, delta):
+        # один UPDATE: Postgres берёт блокировку строки и пересчитывает выражения на её актуальной версии
+        count = F('review_count') + delta
+        rating_sum = sum(F(f'rating_{i}') * i for i in range(1, 6)) + stars * delta
+        avg_rating = Round(
+            Cast(rating_sum, models.DecimalField(max_digits=12, decimal_places=4)) / NullIf(count, 0),
+            1,
+            output_field=models.DecimalField(max_digits=2, decimal_places=1),
+        )
+        return self.filter(pk=hotel_id).update(
+            review_count=count,
+            # update() не трогает auto_now, а рейтинг входит в ответ — сдвигаем валидатор ETag
+            updated_at=Now(),
+            avg_rating=Coalesce(avg_rating, Value(0), output_field=models.DecimalField(max_digits=2, decimal_places=1)),
+            **{f'rating_{stars}': F(f'rating_{stars}') + delta},
+        )
+
+    def update_search_vector(self):
+        city_name = lambda lang: Subquery(City.objects.filter(pk=OuterRef('city_id')).values(f'city_name_{lang}'))
+        vector = None
+        for lang, config in SEARCH_CONFIGS.items():
+            part = (
+                SearchVector(f'hotel_name_{lang}', config=config, weight='A')
+                + SearchVector(city_name(lang), config=config, weight='B')
+                + SearchVector(f'street_{lang}', config=config, weight='C')
+                + SearchVector(f'description_{lang}', config=config, weight='D')
+            )
+            vector = part if vector is None else vector + part
+        return self.update(search_vector=vector)
+
+    def nearby(self, lat, lon, radius_km):
+        # индекс по geo_cell отсекает кандидатов, точное расстояние считается только для них
+        return (
+            self.filter(cells_filter(lat, lon, radius_km))
+            .annotate(distance=distance_km(lat, lon))
+            .filter(distance__lte=radius_km)
+            .order_by('distance', 'id')
+        )
+
+    def search(self, text):
+        query = None
+        for config in SEARCH_CONFIGS.values():
+            part = SearchQuery(text, config=config, search_type='websearch')
+            query = part if query is None else query | part
+        return (
+            self.filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', 'id')
+        )
+
+
+class HotelManager(models.Manager.from_queryset(HotelQuerySet)):
+    def get_queryset(self):
+        # tsvector нужен только в WHERE/ORDER BY поиска, в выборку его не тянем
+        return super().get_queryset().defer('search_vector')
+
+
 class Hotel(models.Model):
     hotel_name = models.CharField(max_length=64)
     city = models.ForeignKey(City, on_delete=models.CASCADE)
@@ -59,24 +139,58 @@ class Hotel(models.Model):
         blank=True
     )
     owner = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
+    avg_rating = models.DecimalField(max_digits=2, decimal_places=1, default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+    search_vector = SearchVectorField(null=True, editable=False)
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    # ячейка сетки по координатам (booking_app/geo.py), заполняется сигналом pre_save
+    geo_cell = models.PositiveIntegerField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = HotelManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-avg_rating', '-id'], name='hotel_rating_keyset_idx'),
+            GinIndex(fields=['search_vector'], name='hotel_search_vector_gin'),
+            models.Index(fields=['geo_cell'], name='hotel_geo_cell_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(latitude__isnull=True, longitude__isnull=True)
+                | Q(latitude__isnull=False, longitude__isnull=False),
+                name='hotel_coordinates_pair',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.hotel_name} — {self.city} ★{self.hotel_star}'
 
     def get_avg_rating(self):
-        ratings = self.reviews.all()
-        if ratings.exists():
-            return round(sum([i.stars for i in ratings]) / ratings.count(), 1)
-        return 0
+        return float(self.avg_rating)
 
     def get_count_people(self):
-        return self.reviews.count()
+        return self.review_count
+
+    def get_rating_histogram(self):
+        return {i: getattr(self, f'rating_{i}') for i in range(1, 6)}
 
 
 class Service(models.Model):
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE)
     service_name = models.CharField(max_length=64, unique=True)
     service_logo = models.ImageField(upload_to='service_logo/')
+    variants_ready = models.BooleanField(default=False, editable=False)
 
     def __str__(self):
         return f'{self.service_name} ({self.hotel.hotel_name})'
@@ -85,12 +199,23 @@ class Service(models.Model):
 class HotelImage(models.Model):
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='hotel_images')
     hotel_images = models.ImageField(upload_to='hotel_images/')
+    variants_ready = models.BooleanField(default=False, editable=False)
     created_image = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f'{self.hotel.hotel_name} — {self.created_image}'
 
 
+class RoomQuerySet(models.QuerySet):
+    def available(self, check_in, check_out):
+        busy = Booking.objects.active().overlapping(check_in, check_out).filter(room=OuterRef('pk'))
+        return self.filter(~Exists(busy))
+
+    def for_guests(self, guests):
+        types = [room_type for room_type, capacity in Room.CAPACITY.items() if capacity >= guests]
+        return self.filter(room_type__in=types)
+
+
 class Room(models.Model):
     room_number = models.PositiveSmallIntegerField()
     room_hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE)
@@ -102,6 +227,12 @@ class Room(models.Model):
         ('двухместный', 'двухместный'),
     )
     room_type = models.CharField(max_length=16, choices=TYPE_CHOICES, default='люкс')
+    CAPACITY = {
+        'люкс': 2,
+        'семейный': 4,
+        'одноместный': 1,
+        'двухместный': 2,
+    }
 
     STATUS_CHOICES = (
         ('свободен', 'свободен'),
@@ -111,14 +242,60 @@ class Room(models.Model):
     room_status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='свободен')
     room_price = models.PositiveIntegerField()
     room_description = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RoomQuerySet.as_manager()
+
+    class Meta:
+        # RoomFilter: room_number, room_type/room_status + диапазон room_price (см. manage.py index_advisor)
+        indexes = [
+            models.Index(fields=['room_number'], name='room_number_idx'),
+            models.Index(fields=['room_price'], name='room_price_idx'),
+            models.Index(fields=['room_type', 'room_price'], name='room_type_price_idx'),
+            models.Index(fields=['room_status', 'room_price'], name='room_status_price_idx'),
+        ]
 
     def __str__(self):
         return f'{self.room_hotel.hotel_name} — №{self.room_number} ({self.room_type})'
 
 
+class RoomRate(models.Model):
+    # ночной тариф на период; weekdays — битовая маска (пн = 1, вт = 2, ... вс = 64)
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='rates')
+    date_from = models.DateField()
+    date_to = models.DateField()
+    weekdays = models.PositiveSmallIntegerField(default=127, validators=[MinValueValidator(1), MaxValueValidator(127)])
+    price = models.PositiveIntegerField()
+    # при пересечении тарифов побеждает больший priority, затем более новый
+    priority = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['room', 'date_to', 'date_from'], name='room_rate_period_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.room} {self.date_from}—{self.date_to}: {self.price}'
+
+
+class StayDiscount(models.Model):
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='stay_discounts')
+    min_nights = models.PositiveSmallIntegerField(validators=[MinValueValidator(2)])
+    percent = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(90)])
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hotel', 'min_nights'], name='stay_discount_unique_nights'),
+        ]
+
+    def __str__(self):
+        return f'{self.hotel.hotel_name}: от {self.min_nights} ночей −{self.percent}%'
+
+
 class RoomImage(models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE)
     room_images = models.ImageField(upload_to='room_images/')
+    variants_ready = models.BooleanField(default=False, editable=False)
     created_image = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -140,6 +317,17 @@ class Review(models.Model):
 
 
 
+class BookingQuerySet(models.QuerySet):
+    def active(self):
+        return self.exclude(status_book='отменено')
+
+    def overlapping(self, check_in, check_out):
+        # полуоткрытый интервал [check_in, check_out) — выезд и заезд в один день не конфликтуют
+        return self.annotate(period=TsTzRange('check_in', 'check_out')).filter(
+            period__overlap=(check_in, check_out)
+        )
+
+
 class Booking(models.Model):
     user = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE)
@@ -152,11 +340,57 @@ class Booking(models.Model):
         ('подтверждено', 'подтверждено'),
     )
     status_book = models.CharField(max_length=16, choices=STATUS_BOOK_CHOICES)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['total_price', 'id'], name='booking_price_keyset_idx'),
+            models.Index(fields=['check_in', 'id'], name='booking_check_in_keyset_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(check_out__gt=F('check_in')),
+                name='booking_check_out_after_check_in',
+            ),
+            # GiST-индекс ограничения обслуживает и поиск свободных номеров;
+            # конкурирующие вставки блокируют друг друга только в пределах одного номера
+            ExclusionConstraint(
+                name='booking_room_period_excl',
+                expressions=[
+                    (F('room'), RangeOperators.EQUAL),
+                    (TsTzRange('check_in', 'check_out'), RangeOperators.OVERLAPS),
+                ],
+                condition=~Q(status_book='отменено'),
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user.username} — {self.hotel.hotel_name} ({self.status_book})'
 
 
+class HotelDailyStats(models.Model):
+    # суточный rollup по броням; ведётся инкрементально сигналами Booking (booking_app/rollups.py)
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='daily_stats')
+    room_type = models.CharField(max_length=16, choices=Room.TYPE_CHOICES)
+    day = models.DateField()
+    nights_sold = models.IntegerField(default=0)
+    revenue = models.BigIntegerField(default=0)
+    cancellations = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hotel', 'room_type', 'day'], name='hotel_daily_stats_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['hotel', 'day'], name='hotel_daily_stats_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.hotel_id} {self.room_type} {self.day}: {self.nights_sold} ночей, {self.revenue}'
+
+
 class Favorite(models.Model):
     user = models.OneToOneField(UserProfile, on_delete=models.CASCADE)
 
@@ -169,5 +403,11 @@ class FavoriteItem(models.Model):
     hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        constraints = [
+            # отель в избранном один раз; на нём же bulk_create(ignore_conflicts=True) пакетного добавления
+            models.UniqueConstraint(fields=['favorite', 'hotel'], name='favorite_item_unique_hotel'),
+        ]
+
     def __str__(self):
         return f'{self.favorite.user.username} - {self.hotel.hotel_name}'
@@ -0,0 +1,144 @@
+import json
+from base64 import b64decode, b64encode
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import BooleanField, F, Func, Value
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.utils.urls import replace_query_param
+
+# position — значения колонок ключа у граничной строки; reverse — страница назад от неё
+KeysetCursor = namedtuple('KeysetCursor', ['position', 'reverse'])
+
+
+class Row(Func):
+    # (a, b) — row constructor для сравнения составного ключа
+    template = '(%(expressions)s)'
+
+
+class KeysetPagination(CursorPagination):
+    """Keyset по всему ключу сортировки: курсор хранит (ключ, ..., id) последней строки,
+    страница — WHERE (key, id) < (%s, %s) по составному индексу, без OFFSET по повторам ключа.
+
+    Колонки ключа — NOT NULL, последняя — уникальная (id), направление у всех колонок одно.
+    """
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        # view.cursor_orderings: {'id': ('-id',), 'price': ('total_price', 'id'), ...}
+        # ключ должен быть проиндексирован вместе с id
+        orderings = view.cursor_orderings
+        key = request.query_params.get('ordering', next(iter(orderings)))
+        if key not in orderings:
+            raise ValidationError({'ordering': f"Допустимые значения: {', '.join(orderings)}"})
+        return orderings[key]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.cursor = self.decode_cursor(request, queryset.model)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        descending = self.ordering[0].startswith('-')
+        ordering = [('-' if descending != reverse else '') + name for name in self.fields]
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            operator = '<' if descending != reverse else '>'
+            queryset = queryset.filter(Func(
+                Row(*map(F, self.fields)), Row(*map(Value, self.cursor.position)),
+                template='%(expressions)s', arg_joiner=f' {operator} ', output_field=BooleanField(),
+            ))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    def position(self, instance):
+        return [getattr(instance, name) for name in self.fields]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            return self.encode_cursor(KeysetCursor(self.position(self.page[-1]), False))
+        # назад дошли до пустой страницы — вперёд от той же позиции
+        return self.encode_cursor(KeysetCursor(self.cursor.position, False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            return self.encode_cursor(KeysetCursor(self.position(self.page[0]), True))
+        return self.encode_cursor(KeysetCursor(self.cursor.position, True))
+
+    def encode_cursor(self, cursor):
+        payload = json.dumps({'p': cursor.position, 'r': int(cursor.reverse)}, cls=DjangoJSONEncoder)
+        encoded = b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            payload = json.loads(b64decode(encoded.encode(), validate=True))
+            values = payload['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [model._meta.get_field(name).to_python(value) for name, value in zip(self.fields, values)]
+            return KeysetCursor(position, bool(payload['r']))
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class OptionalCursorPagination(LimitOffsetPagination):
+    """LimitOffset по умолчанию; ?pagination=cursor (или ?cursor=...) включает keyset-режим без COUNT(*)."""
+
+    def use_cursor(self, request):
+        return request.query_params.get('pagination') == 'cursor' or 'cursor' in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_cursor(request):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """То же для async-представлений: COUNT и страница — через async ORM."""
+        self.keyset = None
+        if self.use_cursor(request):
+            self.keyset = KeysetPagination()
+            return await sync_to_async(self.keyset.paginate_queryset)(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [obj async for obj in queryset[self.offset:self.offset + self.limit]]
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -13,8 +13,9 @@ class ReviewPermissions(permissions.BasePermission):
 
 class CheckOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        if hasattr(obj, 'owner'):
-            return request.user == obj.owner
-        if hasattr(obj, 'user'):
-            return request.user == obj.user
+        # по *_id: связанный объект может быть не загружен (?fields / ?expand)
+        if hasattr(obj, 'owner_id'):
+            return request.user.pk == obj.owner_id
+        if hasattr(obj, 'user_id'):
+            return request.user.pk == obj.user_id
         return False
@@ -0,0 +1,73 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import RoomRate, StayDiscount
+
+
+@dataclass
+class Quote:
+    room_id: int
+    nights: int
+    nightly: list = field(default_factory=list)
+    subtotal: int = 0
+    discount_percent: int = 0
+    total: int = 0
+
+
+def stay_dates(check_in, check_out):
+    """Даты заезда/выезда (date или aware datetime) -> (первая ночь, число ночей)."""
+    if hasattr(check_in, 'hour'):
+        check_in, check_out = timezone.localdate(check_in), timezone.localdate(check_out)
+    return check_in, max((check_out - check_in).days, 1)
+
+
+def quote_rooms(rooms, check_in, check_out):
+    """Цены за все ночи проживания для списка номеров: два запроса независимо от числа номеров и ночей."""
+    first_night, nights = stay_dates(check_in, check_out)
+    last_night = first_night + timedelta(days=nights - 1)
+    # бит дня недели для каждой ночи — тарифы накладываются на весь массив ночей сразу
+    night_bits = [1 << (first_night + timedelta(days=i)).weekday() for i in range(nights)]
+
+    rooms = list(rooms)
+    rates = defaultdict(list)
+    for rate in (
+        RoomRate.objects.filter(room__in=rooms, date_from__lte=last_night, date_to__gte=first_night)
+        .order_by('priority', 'id')
+    ):
+        rates[rate.room_id].append(rate)
+
+    hotel_ids = {room.room_hotel_id for room in rooms}
+    discounts = dict(
+        StayDiscount.objects.filter(hotel__in=hotel_ids, min_nights__lte=nights)
+        .values('hotel').annotate(best=Max('percent')).values_list('hotel', 'best')
+    ) if nights > 1 else {}
+
+    quotes = {}
+    for room in rooms:
+        nightly = [room.room_price] * nights
+        for rate in rates[room.id]:
+            start = max((rate.date_from - first_night).days, 0)
+            end = min((rate.date_to - first_night).days + 1, nights)
+            for i in range(start, end):
+                if rate.weekdays & night_bits[i]:
+                    nightly[i] = rate.price
+
+        subtotal = sum(nightly)
+        percent = discounts.get(room.room_hotel_id, 0)
+        quotes[room.id] = Quote(
+            room_id=room.id,
+            nights=nights,
+            nightly=nightly,
+            subtotal=subtotal,
+            discount_percent=percent,
+            total=subtotal - subtotal * percent // 100,
+        )
+    return quotes
+
+
+def quote_room(room, check_in, check_out):
+    return quote_rooms([room], check_in, check_out)[room.id]
@@ -0,0 +1,120 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import Booking, HotelDailyStats
+
+CANCELLED = 'отменено'
+
+
+def booking_state(booking, room_type):
+    return (
+        booking.hotel_id, room_type, booking.check_in, booking.check_out,
+        booking.status_book, booking.total_price,
+    )
+
+
+def contributions(state, sign=1, into=None):
+    """Вклад брони в суточные строки: {(hotel, room_type, day): [nights, revenue, cancellations]}."""
+    into = into if into is not None else defaultdict(lambda: [0, 0, 0])
+    if state is None:
+        return into
+    hotel_id, room_type, check_in, check_out, status, total_price = state
+    first_night = timezone.localdate(check_in)
+    nights = max((timezone.localdate(check_out) - first_night).days, 1)
+
+    if status == CANCELLED:
+        into[(hotel_id, room_type, first_night)][2] += sign
+        return into
+
+    # выручка делится по ночам целыми числами, остаток — на первые ночи
+    per_night, remainder = divmod(total_price, nights)
+    for i in range(nights):
+        row = into[(hotel_id, room_type, first_night + timedelta(days=i))]
+        row[0] += sign
+        row[1] += sign * (per_night + (1 if i < remainder else 0))
+    return into
+
+
+def apply_contributions(delta):
+    rows = sorted((key, value) for key, value in delta.items() if any(value))
+    if not rows:
+        return
+    # сортировка ключей — одинаковый порядок блокировок строк у параллельных транзакций
+    table = HotelDailyStats._meta.db_table
+    values = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(rows))
+    params = [param for (hotel_id, room_type, day), (nights, revenue, cancellations) in rows
+              for param in (hotel_id, room_type, day, nights, revenue, cancellations)]
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            INSERT INTO {table} (hotel_id, room_type, day, nights_sold, revenue, cancellations)
+            VALUES {values}
+            ON CONFLICT (hotel_id, room_type, day) DO UPDATE SET
+                nights_sold = {table}.nights_sold + EXCLUDED.nights_sold,
+                revenue = {table}.revenue + EXCLUDED.revenue,
+                cancellations = {table}.cancellations + EXCLUDED.cancellations
+        ''', params)
+
+
+def move_room_type(changes):
+    """Переносит вклад броней номеров в строки нового типа: changes — {room_id: (старый тип, новый тип)}."""
+    changes = {room_id: types for room_id, types in changes.items() if types[0] != types[1]}
+    if not changes:
+        return
+    delta = defaultdict(lambda: [0, 0, 0])
+    bookings = Booking.objects.filter(room_id__in=changes).values_list(
+        'room_id', 'hotel_id', 'check_in', 'check_out', 'status_book', 'total_price',
+    )
+    for room_id, hotel_id, *rest in bookings.iterator():
+        old_type, new_type = changes[room_id]
+        contributions((hotel_id, old_type, *rest), sign=-1, into=delta)
+        contributions((hotel_id, new_type, *rest), into=delta)
+    apply_contributions(delta)
+
+
+MOVING_WINDOW_DAYS = 7
+
+
+def hotel_series(hotel_id, date_from, date_to, room_type=None):
+    """Посуточный ряд по rollup-таблице: дни без броней заполняются нулями,
+    скользящие средние и накопленная выручка считаются оконными функциями."""
+    table = HotelDailyStats._meta.db_table
+    params = {
+        'hotel': hotel_id,
+        'room_type': room_type,
+        'date_from': date_from,
+        'date_to': date_to,
+        # дни до начала периода нужны только для первых окон скользящего среднего
+        'start': date_from - timedelta(days=MOVING_WINDOW_DAYS - 1),
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            WITH days AS (
+                SELECT generate_series(%(start)s::date, %(date_to)s::date, interval '1 day')::date AS day
+            ), stats AS (
+                SELECT day, SUM(nights_sold) AS nights_sold, SUM(revenue) AS revenue,
+                       SUM(cancellations) AS cancellations
+                FROM {table}
+                WHERE hotel_id = %(hotel)s AND day BETWEEN %(start)s AND %(date_to)s
+                  AND (%(room_type)s::text IS NULL OR room_type = %(room_type)s)
+                GROUP BY day
+            ), series AS (
+                SELECT days.day,
+                       COALESCE(stats.nights_sold, 0) AS nights_sold,
+                       COALESCE(stats.revenue, 0) AS revenue,
+                       COALESCE(stats.cancellations, 0) AS cancellations,
+                       AVG(COALESCE(stats.nights_sold, 0)) OVER moving AS nights_moving_avg,
+                       AVG(COALESCE(stats.revenue, 0)) OVER moving AS revenue_moving_avg
+                FROM days LEFT JOIN stats ON stats.day = days.day
+                WINDOW moving AS (ORDER BY days.day ROWS BETWEEN {MOVING_WINDOW_DAYS - 1} PRECEDING AND CURRENT ROW)
+            )
+            SELECT day, nights_sold, revenue, cancellations, nights_moving_avg, revenue_moving_avg,
+                   SUM(revenue) OVER (ORDER BY day) AS revenue_cumulative
+            FROM series
+            WHERE day >= %(date_from)s
+            ORDER BY day
+        ''', params)
+        columns = [column.name for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -3,8 +3,25 @@ from .models import (
     Country, UserProfile, City, Hotel, HotelImage,
     Service, Room, RoomImage, Review, Booking, Favorite, FavoriteItem
 )
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from django.conf import settings
+from django.utils.translation import get_language
+from django.utils import timezone
+from django.db import transaction
+from .images import variant_urls
+from .pricing import quote_room
+from .rollups import move_room_type
+from .cache import invalidate_namespace
+from .authentication import tokens_for_user
+from .fieldsets import SparseFieldsMixin
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    def to_representation(self, value):
+        request = self.context.get('request')
+        # готовность — колонка той же строки (FieldFile.instance), без запросов к хранилищу
+        ready = bool(value) and value.instance.variants_ready
+        return variant_urls(value.name if value else None, ready, request.build_absolute_uri if request else None)
 
 
 # ---------- AUTH ----------
@@ -23,7 +40,7 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
     def to_representation(self, instance):
-        refresh = RefreshToken.for_user(instance)
+        refresh = tokens_for_user(instance)
         return {
             'user': {
                 'id': instance.id,
@@ -47,7 +64,7 @@ class LoginSerializer(serializers.Serializer):
         if not user or not user.is_active:
             raise serializers.ValidationError("Неверные учетные данные")
 
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         return {
             'user': {
                 'id': user.id,
@@ -64,91 +81,281 @@ class LoginSerializer(serializers.Serializer):
 
 # ---------- BASE SERIALIZERS ----------
 class CountrySerializer(serializers.ModelSerializer):
+    country_image_variants = ImageVariantsField(source='country_image')
+
     class Meta:
         model = Country
-        fields = ('id', 'country_name', 'country_image')
+        fields = ('id', 'country_name', 'country_image', 'country_image_variants')
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     country = CountrySerializer(read_only=True)
+    user_image_variants = ImageVariantsField(source='user_image')
 
     class Meta:
         model = UserProfile
         fields = (
             'id', 'username', 'country', 'first_name', 'last_name',
-            'age', 'user_phone_number', 'user_image',
+            'age', 'user_phone_number', 'user_image', 'user_image_variants',
             'user_role', 'created_date'
         )
 
 
 class CityListSerializer(serializers.ModelSerializer):
+    city_image_variants = ImageVariantsField(source='city_image')
+
     class Meta:
         model = City
-        fields = ('id', 'city_name', 'city_image')
+        fields = ('id', 'city_name', 'city_image', 'city_image_variants')
 
 
 class CityDetailSerializer(serializers.ModelSerializer):
+    city_image_variants = ImageVariantsField(source='city_image')
+
     class Meta:
         model = City
-        fields = ('id', 'city_name', 'city_image')
+        fields = ('id', 'city_name', 'city_image', 'city_image_variants')
 
 
 class HotelImageSerializer(serializers.ModelSerializer):
+    hotel_images_variants = ImageVariantsField(source='hotel_images')
+
     class Meta:
         model = HotelImage
-        fields = ('hotel_images', 'created_image')
+        fields = ('hotel_images', 'hotel_images_variants', 'created_image')
+
 
+class FavoriteFlagMixin:
+    # is_favorite выводится, только если представление добавило аннотацию (booking_app.favorites.FavoriteHotelsMixin)
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('with_favorites'):
+            fields.pop('is_favorite', None)
+        return fields
 
-class HotelDetailSerializer(serializers.ModelSerializer):
+    def get_is_favorite(self, obj):
+        return obj.is_favorite
+
+
+class HotelDetailSerializer(SparseFieldsMixin, FavoriteFlagMixin, serializers.ModelSerializer):
     city = CityDetailSerializer(read_only=True)
     country = CountrySerializer(read_only=True)
     owner = UserProfileSerializer(read_only=True)
     hotel_images = HotelImageSerializer(many=True, read_only=True)
-    count_people = serializers.SerializerMethodField()
-    avg_rating = serializers.SerializerMethodField()
+    count_people = serializers.IntegerField(source='review_count', read_only=True)
+    avg_rating = serializers.FloatField(read_only=True)
+    rating_histogram = serializers.SerializerMethodField()
+    is_favorite = serializers.SerializerMethodField()
 
     class Meta:
         model = Hotel
         fields = (
             'id', 'hotel_name', 'city', 'hotel_star', 'description', 'street',
-            'country', 'owner', 'hotel_images', 'avg_rating', 'count_people'
+            'country', 'owner', 'hotel_images', 'avg_rating', 'count_people',
+            'rating_histogram', 'latitude', 'longitude', 'is_favorite'
         )
 
-    def get_avg_rating(self, obj):
-        return obj.get_avg_rating()
-
-    def get_count_people(self, obj):
-        return obj.get_count_people()
+    def get_rating_histogram(self, obj):
+        return obj.get_rating_histogram()
 
 
-class HotelListSerializer(serializers.ModelSerializer):
+class HotelListSerializer(SparseFieldsMixin, FavoriteFlagMixin, serializers.ModelSerializer):
     city = CityDetailSerializer(read_only=True)
     hotel_images = HotelImageSerializer(many=True, read_only=True)
+    is_favorite = serializers.SerializerMethodField()
 
     class Meta:
         model = Hotel
-        fields = ('id', 'hotel_name', 'city', 'hotel_star', 'street', 'hotel_images')
+        fields = ('id', 'hotel_name', 'city', 'hotel_star', 'street', 'hotel_images', 'is_favorite')
 
 
 class HotelHTTPSerializer(serializers.ModelSerializer):
     class Meta:
         model = Hotel
-        fields = '__all__'
+        exclude = ('search_vector',)
+        read_only_fields = (
+            'avg_rating', 'review_count',
+            'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5'
+        )
+
+    def validate(self, data):
+        latitude = data.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = data.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError("latitude и longitude задаются вместе")
+        return data
+
+
+HOTEL_NEARBY_MAX_RADIUS_KM = 50
+
+
+class HotelNearbySerializer(HotelListSerializer):
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta(HotelListSerializer.Meta):
+        fields = HotelListSerializer.Meta.fields + ('latitude', 'longitude', 'distance_km')
+
+    def get_distance_km(self, obj):
+        return round(obj.distance, 3)
+
+
+class HotelNearbyParamsSerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(min_value=0.01, max_value=HOTEL_NEARBY_MAX_RADIUS_KM, default=3)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
 
 
 class ServiceSerializer(serializers.ModelSerializer):
+    service_logo_variants = ImageVariantsField(source='service_logo')
+
     class Meta:
         model = Service
-        fields = '__all__'
+        exclude = ('variants_ready',)
+
+
+def _int_ids(items, key):
+    ids = set()
+    for item in items:
+        try:
+            ids.add(int(item.get(key)))
+        except (AttributeError, TypeError, ValueError):
+            pass
+    return ids
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    # при массовой загрузке объекты уже лежат в context[<context_key>] — без запроса на каждый элемент
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        objects = self.context.get(self.context_key)
+        if objects is None:
+            return super().to_internal_value(data)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in objects:
+            self.fail('does_not_exist', pk_value=data)
+        return objects[pk]
+
+
+class RoomBulkCreateSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            hotel_ids = _int_ids(data, 'room_hotel')
+            self._context['hotels'] = Hotel.objects.only('id', 'owner_id').in_bulk(hotel_ids)
+            self._context['taken_room_numbers'] = set(
+                Room.objects.filter(room_hotel__in=hotel_ids).values_list('room_hotel_id', 'room_number')
+            )
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        rooms = Room.objects.bulk_create([Room(**attrs) for attrs in validated_data], batch_size=500)
+        # bulk_create не вызывает post_save
+        transaction.on_commit(lambda: invalidate_namespace('pricing'))
+        transaction.on_commit(lambda: invalidate_namespace('room_facets'))
+        return rooms
 
 
 class RoomCreateSerializer(serializers.ModelSerializer):
+    room_hotel = PrefetchedPrimaryKeyRelatedField('hotels', queryset=Hotel.objects.all())
+
     class Meta:
         model = Room
         fields = '__all__'
+        list_serializer_class = RoomBulkCreateSerializer
 
+    def validate(self, data):
+        hotel = data['room_hotel']
+        request = self.context.get('request')
+        if request is not None and hotel.owner_id != request.user.id:
+            raise serializers.ValidationError({'room_hotel': "Можно добавлять номера только в свои отели"})
+
+        key = (hotel.id, data['room_number'])
+        taken = self.context.get('taken_room_numbers')
+        if taken is None:
+            is_taken = Room.objects.filter(room_hotel=hotel, room_number=data['room_number']).exists()
+        else:
+            is_taken = key in taken
+            taken.add(key)  # повтор номера внутри одного запроса
+        if is_taken:
+            raise serializers.ValidationError({'room_number': "Номер с таким номером уже есть в этом отеле"})
+
+        # room_description пишет в колонку активного языка; язык по умолчанию заполняем,
+        # чтобы fallback modeltranslation не отдавал пустое описание
+        description = data.get('room_description')
+        if description:
+            for lang in (get_language(), settings.MODELTRANSLATION_DEFAULT_LANGUAGE):
+                if not data.get(f'room_description_{lang}'):
+                    data[f'room_description_{lang}'] = description
+        return data
+
+
+class RoomBulkUpdateListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            request = self.context['request']
+            self._context['rooms'] = (
+                Room.objects.filter(pk__in=_int_ids(data, 'id'), room_hotel__owner=request.user)
+                .only('id', 'room_price', 'room_status', 'room_type')
+                .in_bulk()
+            )
+        return super().to_internal_value(data)
+
+    def save(self, **kwargs):
+        rooms, fields, type_changes = [], {'updated_at'}, {}
+        now = timezone.now()
+        for attrs in self.validated_data:
+            room = attrs.pop('id')
+            if attrs.get('room_type', room.room_type) != room.room_type:
+                type_changes[room.pk] = (room.room_type, attrs['room_type'])
+            for field, value in attrs.items():
+                setattr(room, field, value)
+            room.updated_at = now  # bulk_update не заполняет auto_now
+            rooms.append(room)
+            fields.update(attrs)
+        if type_changes:
+            # rollup-строки броней переезжают к новому типу вместе со сменой типа
+            with transaction.atomic():
+                Room.objects.bulk_update(rooms, sorted(fields), batch_size=500)
+                move_room_type(type_changes)
+        else:
+            Room.objects.bulk_update(rooms, sorted(fields), batch_size=500)
+        # bulk_update не вызывает post_save
+        transaction.on_commit(lambda: invalidate_namespace('pricing'))
+        transaction.on_commit(lambda: invalidate_namespace('room_facets'))
+        self.instance = rooms
+        return rooms
+
+
+class RoomBulkUpdateSerializer(serializers.Serializer):
+    id = PrefetchedPrimaryKeyRelatedField('rooms', queryset=Room.objects.all())
+    room_price = serializers.IntegerField(min_value=0, max_value=2147483647, required=False)
+    room_status = serializers.ChoiceField(choices=Room.STATUS_CHOICES, required=False)
+    room_type = serializers.ChoiceField(choices=Room.TYPE_CHOICES, required=False)
 
-class RoomListSerializer(serializers.ModelSerializer):
+    class Meta:
+        list_serializer_class = RoomBulkUpdateListSerializer
+
+    def validate(self, data):
+        if len(data) == 1:
+            raise serializers.ValidationError("Укажите room_price, room_status или room_type")
+        return data
+
+    def to_representation(self, instance):
+        return {
+            'id': instance.id,
+            'room_price': instance.room_price,
+            'room_status': instance.room_status,
+            'room_type': instance.room_type,
+        }
+
+
+class RoomListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     room_hotel = HotelListSerializer(read_only=True)
 
     class Meta:
@@ -160,9 +367,11 @@ class RoomListSerializer(serializers.ModelSerializer):
 
 
 class RoomImageSerializer(serializers.ModelSerializer):
+    room_images_variants = ImageVariantsField(source='room_images')
+
     class Meta:
         model = RoomImage
-        fields = '__all__'
+        exclude = ('variants_ready',)
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -171,7 +380,82 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class BookingListSerializer(serializers.ModelSerializer):
+class HotelSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+
+
+class RoomQuoteParamsSerializer(serializers.Serializer):
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    room = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=500)
+    hotel = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if not data.get('room') and not data.get('hotel'):
+            raise serializers.ValidationError("Укажите room или hotel")
+        if data['check_out'] <= data['check_in']:
+            raise serializers.ValidationError("Дата выезда должна быть позже даты заезда")
+        return data
+
+
+class RoomQuoteSerializer(serializers.ModelSerializer):
+    quote = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Room
+        fields = ('id', 'room_number', 'room_hotel', 'room_type', 'quote')
+
+    def get_quote(self, obj):
+        quote = self.context['quotes'][obj.id]
+        return {
+            'nights': quote.nights,
+            'nightly': quote.nightly,
+            'subtotal': quote.subtotal,
+            'discount_percent': quote.discount_percent,
+            'total': quote.total,
+        }
+
+
+class RoomAvailabilitySerializer(serializers.Serializer):
+    check_in = serializers.DateTimeField(input_formats=['iso-8601', '%Y-%m-%d'])
+    check_out = serializers.DateTimeField(input_formats=['iso-8601', '%Y-%m-%d'])
+
+    def validate(self, data):
+        if data['check_out'] <= data['check_in']:
+            raise serializers.ValidationError("Дата выезда должна быть позже даты заезда")
+        return data
+
+
+HOTEL_ANALYTICS_MAX_DAYS = 366
+
+
+class HotelAnalyticsParamsSerializer(serializers.Serializer):
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    room_type = serializers.ChoiceField(choices=Room.TYPE_CHOICES, required=False)
+
+    def validate(self, data):
+        days = (data['date_to'] - data['date_from']).days + 1
+        if days < 1:
+            raise serializers.ValidationError("date_to должна быть не раньше date_from")
+        if days > HOTEL_ANALYTICS_MAX_DAYS:
+            raise serializers.ValidationError(f"Период не длиннее {HOTEL_ANALYTICS_MAX_DAYS} дней")
+        return data
+
+
+class FacetsParamsSerializer(serializers.Serializer):
+    facets = serializers.BooleanField(default=False)
+
+
+class ExportParamsSerializer(serializers.Serializer):
+    output = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+    hotel = serializers.IntegerField(min_value=1, required=False)
+
+
+BOOKING_OVERLAP_ERROR = "Номер уже забронирован на эти даты"
+
+
+class BookingListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserProfileSerializer(read_only=True)
     hotel = HotelListSerializer(read_only=True)
     room = RoomListSerializer(read_only=True)
@@ -190,6 +474,33 @@ class BookingHTTPSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = '__all__'
+        # владелец брони — всегда текущий пользователь (BookingSaveMixin)
+        read_only_fields = ('user', 'total_price')
+
+    def validate(self, data):
+        room = data.get('room', getattr(self.instance, 'room', None))
+        hotel = data.get('hotel', getattr(self.instance, 'hotel', None))
+        check_in = data.get('check_in', getattr(self.instance, 'check_in', None))
+        check_out = data.get('check_out', getattr(self.instance, 'check_out', None))
+        status_book = data.get('status_book', getattr(self.instance, 'status_book', None))
+
+        if room.room_hotel_id != hotel.id:
+            raise serializers.ValidationError("Номер не принадлежит выбранному отелю")
+        if check_out <= check_in:
+            raise serializers.ValidationError("Дата выезда должна быть позже даты заезда")
+
+        # окончательную проверку делает ExclusionConstraint, здесь — понятная ошибка для обычного случая
+        if status_book != 'отменено':
+            overlapping = Booking.objects.active().overlapping(check_in, check_out).filter(room=room)
+            if self.instance is not None:
+                overlapping = overlapping.exclude(pk=self.instance.pk)
+            if overlapping.exists():
+                raise serializers.ValidationError(BOOKING_OVERLAP_ERROR)
+
+        # цену считает сервер по тарифам номера; клиентское total_price игнорируется
+        if self.instance is None or any(name in data for name in ('room', 'check_in', 'check_out')):
+            data['total_price'] = quote_room(room, check_in, check_out).total
+        return data
 
 
 class FavoriteListSerializer(serializers.ModelSerializer):
@@ -219,3 +530,20 @@ class FavoriteItemHTTPSerializer(serializers.ModelSerializer):
     class Meta:
         model = FavoriteItem
         fields = '__all__'
+
+
+FAVORITE_TOGGLE_LIMIT = 500
+
+
+class FavoriteToggleSerializer(serializers.Serializer):
+    add = serializers.ListField(child=serializers.IntegerField(min_value=1), max_length=FAVORITE_TOGGLE_LIMIT, default=list)
+    remove = serializers.ListField(child=serializers.IntegerField(min_value=1), max_length=FAVORITE_TOGGLE_LIMIT, default=list)
+
+    def validate(self, data):
+        add, remove = set(data['add']), set(data['remove'])
+        if add & remove:
+            raise serializers.ValidationError("Отель не может быть одновременно в add и remove")
+        missing = add - set(Hotel.objects.filter(pk__in=add).values_list('id', flat=True)) if add else set()
+        if missing:
+            raise serializers.ValidationError({'add': f"Отели не найдены: {', '.join(map(str, sorted(missing)))}"})
+        return {'add': add, 'remove': remove}
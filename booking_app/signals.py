@@ -0,0 +1,242 @@
+from django.db import transaction
+from django.db.models.functions import Now
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .cache import invalidate_namespace
+from .images import IMAGE_FIELDS, delete_variants, schedule_variants
+from .authentication import auth_state
+from .models import Country, City, Hotel, HotelImage, Room, RoomRate, StayDiscount, Review, Booking, UserProfile
+from .rollups import booking_state, contributions, apply_contributions, move_room_type
+from .geo import geo_cell
+
+
+# ---------- REVIEW → HOTEL RATING ----------
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    instance._old_rating = None
+    if instance.pk:
+        instance._old_rating = Review.objects.filter(pk=instance.pk).values_list('hotel_id', 'stars').first()
+
+
+@receiver(post_save, sender=Review)
+def apply_review_rating(sender, instance, created, **kwargs):
+    old_rating = getattr(instance, '_old_rating', None)
+    new_rating = (instance.hotel_id, instance.stars)
+    if old_rating == new_rating:
+        return
+
+    with transaction.atomic():
+        if old_rating:
+            Hotel.objects.apply_review(*old_rating, delta=-1)
+        Hotel.objects.apply_review(*new_rating, delta=1)
+
+
+@receiver(post_delete, sender=Review)
+def revert_review_rating(sender, instance, **kwargs):
+    Hotel.objects.apply_review(instance.hotel_id, instance.stars, delta=-1)
+
+
+# ---------- BOOKING → HOTEL DAILY STATS ----------
+@receiver(pre_save, sender=Booking)
+def remember_booking_state(sender, instance, **kwargs):
+    instance._old_state = None
+    if instance.pk:
+        instance._old_state = Booking.objects.filter(pk=instance.pk).values_list(
+            'hotel_id', 'room__room_type', 'check_in', 'check_out', 'status_book', 'total_price',
+        ).first()
+
+
+@receiver(post_save, sender=Booking)
+def apply_booking_stats(sender, instance, **kwargs):
+    old_state = getattr(instance, '_old_state', None)
+    new_state = booking_state(instance, instance.room.room_type)
+    if old_state == new_state:
+        return
+
+    delta = contributions(old_state, sign=-1)
+    apply_contributions(contributions(new_state, into=delta))
+
+
+@receiver(pre_delete, sender=Hotel)
+def remember_deleted_hotel(sender, instance, origin=None, **kwargs):
+    # pre_delete всех объектов каскада приходит до удаления броней; отмечаем отели на самом origin
+    if origin is not None:
+        if not hasattr(origin, '_deleted_hotel_ids'):
+            origin._deleted_hotel_ids = set()
+        origin._deleted_hotel_ids.add(instance.pk)
+
+
+@receiver(post_delete, sender=Booking)
+def revert_booking_stats(sender, instance, origin=None, **kwargs):
+    # отель удаляется в том же каскаде (сам, через город или владельца) — его rollup-строки уже удалены
+    if instance.hotel_id in getattr(origin, '_deleted_hotel_ids', ()):
+        return
+    apply_contributions(contributions(booking_state(instance, instance.room.room_type), sign=-1))
+
+
+@receiver(pre_save, sender=Room)
+def remember_room_type(sender, instance, **kwargs):
+    instance._old_room_type = None
+    if instance.pk:
+        instance._old_room_type = Room.objects.filter(pk=instance.pk).values_list('room_type', flat=True).first()
+
+
+@receiver(post_save, sender=Room)
+def move_room_stats(sender, instance, **kwargs):
+    old_type = getattr(instance, '_old_room_type', None)
+    if old_type is not None:
+        move_room_type({instance.pk: (old_type, instance.room_type)})
+
+
+# ---------- USER → JWT CLAIMS ----------
+AUTH_FIELDS = ('user_role', 'is_active')
+
+
+@receiver(pre_save, sender=UserProfile)
+def remember_auth_state(sender, instance, update_fields=None, **kwargs):
+    instance._old_auth_state = None
+    if instance.pk and (update_fields is None or set(AUTH_FIELDS) & set(update_fields)):
+        instance._old_auth_state = UserProfile.objects.filter(pk=instance.pk).values_list(*AUTH_FIELDS).first()
+
+
+@receiver(post_save, sender=UserProfile)
+def publish_auth_state(sender, instance, **kwargs):
+    # уже выданные токены несут старые claims — переопределяем их до истечения access-токена
+    old_state = getattr(instance, '_old_auth_state', None)
+    if old_state is not None and old_state != (instance.user_role, instance.is_active):
+        auth_state.changed(instance.pk, instance.user_role, instance.is_active)
+
+
+@receiver(post_delete, sender=UserProfile)
+def revoke_auth_state(sender, instance, **kwargs):
+    auth_state.changed(instance.pk, instance.user_role, False)
+
+
+# ---------- ETAG VALIDATORS ----------
+# вложенные объекты без своего updated_at сдвигают updated_at тех, в чьих ответах они выводятся
+@receiver(post_save, sender=HotelImage)
+@receiver(post_delete, sender=HotelImage)
+def touch_image_hotel(sender, instance, **kwargs):
+    Hotel.objects.filter(pk=instance.hotel_id).update(updated_at=Now())
+
+
+@receiver(post_save, sender=UserProfile)
+def touch_user_payloads(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and set(update_fields) <= {'last_login', 'password'}):
+        return
+    Hotel.objects.filter(owner=instance).update(updated_at=Now())
+    Booking.objects.filter(user=instance).update(updated_at=Now())
+
+
+# ---------- HOTEL GEO ----------
+@receiver(pre_save, sender=Hotel)
+def set_hotel_geo_cell(sender, instance, **kwargs):
+    instance.geo_cell = geo_cell(instance.latitude, instance.longitude)
+
+
+# ---------- HOTEL SEARCH ----------
+@receiver(post_save, sender=Hotel)
+def update_hotel_search_vector(sender, instance, **kwargs):
+    Hotel.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=City)
+def update_city_hotels_search_vector(sender, instance, created, **kwargs):
+    if not created:
+        Hotel.objects.filter(city=instance).update_search_vector()
+
+
+# ---------- REFERENCE CACHE ----------
+# версию сбрасываем после коммита: иначе параллельный запрос успеет закэшировать под новой версией
+# ещё не закоммиченные (или откатившиеся) данные
+@receiver(post_save, sender=Country)
+@receiver(post_delete, sender=Country)
+def invalidate_country_cache(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_namespace('country'))
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def invalidate_city_cache(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_namespace('city'))
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=RoomRate)
+@receiver(post_delete, sender=RoomRate)
+@receiver(post_save, sender=StayDiscount)
+@receiver(post_delete, sender=StayDiscount)
+def invalidate_pricing_cache(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_namespace('pricing'))
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+def invalidate_hotel_facets(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_namespace('hotel_facets'))
+    # город/страна отеля входят в фильтры номеров
+    transaction.on_commit(lambda: invalidate_namespace('room_facets'))
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_room_facets(sender, instance, **kwargs):
+    # брони меняют доступность номеров на даты
+    transaction.on_commit(lambda: invalidate_namespace('room_facets'))
+
+
+# ---------- IMAGE VARIANTS ----------
+def changed_image_fields(sender, update_fields):
+    return [name for name in IMAGE_FIELDS_BY_MODEL[sender] if update_fields is None or name in update_fields]
+
+
+def remember_image_names(sender, instance, update_fields=None, **kwargs):
+    instance._old_images = {}
+    fields = changed_image_fields(sender, update_fields)
+    if fields and not instance._state.adding:
+        instance._old_images = sender._default_manager.filter(pk=instance.pk).values(*fields).first() or {}
+
+
+def create_image_variants(sender, instance, created, update_fields=None, **kwargs):
+    old_images = getattr(instance, '_old_images', {})
+    for field_name in changed_image_fields(sender, update_fields):
+        image, old_name = getattr(instance, field_name), old_images.get(field_name)
+        if old_name == (image.name if image else ''):
+            continue
+        if not created:
+            # флаг относился к старому файлу (в памяти он может быть устаревшим, update_fields — не включать его)
+            sender._default_manager.filter(pk=instance.pk).update(variants_ready=False)
+            instance.variants_ready = False
+        if image:
+            # новые загрузки получают уникальное имя, поэтому существующие варианты не пересоздаются
+            schedule_variants(sender, field_name, image.name)
+        if old_name:
+            cleanup_variants(sender, field_name, old_name)
+
+
+def delete_image_variants(sender, instance, **kwargs):
+    for field_name in IMAGE_FIELDS_BY_MODEL[sender]:
+        image = getattr(instance, field_name)
+        if image:
+            cleanup_variants(sender, field_name, image.name)
+
+
+def cleanup_variants(model, field_name, name):
+    def delete_unused():
+        # один файл может быть у нескольких строк (seed-данные, копии)
+        if not model._default_manager.filter(**{field_name: name}).exists():
+            delete_variants(name)
+    transaction.on_commit(delete_unused)
+
+
+IMAGE_FIELDS_BY_MODEL = {}
+for model, field_name in IMAGE_FIELDS:
+    IMAGE_FIELDS_BY_MODEL.setdefault(model, []).append(field_name)
+for model in IMAGE_FIELDS_BY_MODEL:
+    pre_save.connect(remember_image_names, sender=model, dispatch_uid=f'image_names_{model.__name__}')
+    post_save.connect(create_image_variants, sender=model, dispatch_uid=f'image_variants_{model.__name__}')
+    post_delete.connect(delete_image_variants, sender=model, dispatch_uid=f'image_variants_delete_{model.__name__}')
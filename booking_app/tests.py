@@ -0,0 +1,1651 @@
+import csv
+import gzip
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import run_checks
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections, transaction
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.test import AsyncRequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern
+from django.utils import timezone, translation
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase, force_authenticate
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import db, geo
+from .authentication import auth_state
+from .cache import cache_stats, reference_cache
+from .throttling import local_store
+from .images import build_variants, variant_name, wait_for_variants
+from .pricing import quote_rooms
+from .serializers import CityDetailSerializer
+from .urls import urlpatterns
+from .views import ASYNC_READ_VIEWS, CityListView, HotelListView, HotelDetailAPIView, BookingListView
+from .models import (
+    Country, UserProfile, City, Hotel, HotelImage,
+    Room, RoomRate, StayDiscount, Review, Booking, HotelDailyStats, Favorite, FavoriteItem
+)
+
+
+def seed_hotels(owner, client, count=6):
+    country = Country.objects.create(country_name='Kyrgyzstan', country_image='country_image/seed.jpg')
+    city = City.objects.create(city_name='Bishkek', city_image='city_image/seed.jpg')
+    favorite = Favorite.objects.create(user=client)
+    check_in = timezone.now()
+
+    for i in range(count):
+        hotel = Hotel.objects.create(
+            hotel_name=f'Hotel {i}', city=city, country=country, hotel_star=i % 5 + 1,
+            description='description', street='street', owner=owner
+        )
+        HotelImage.objects.bulk_create(
+            HotelImage(hotel=hotel, hotel_images='hotel_images/seed.jpg') for _ in range(2)
+        )
+        room = Room.objects.create(
+            room_number=i, room_hotel=hotel, room_price=100 + i, room_description='room'
+        )
+        Booking.objects.create(
+            user=client, hotel=hotel, room=room, status_book='подтверждено',
+            check_in=check_in + timedelta(days=i), check_out=check_in + timedelta(days=i + 1)
+        )
+        FavoriteItem.objects.create(favorite=favorite, hotel=hotel)
+
+
+def without_throttling():
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}})
+
+
+# ---------- QUERY BUDGET ----------
+class QueryBudgetTests(APITestCase):
+    """Число запросов к БД на endpoint не должно зависеть от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.client_user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        seed_hotels(cls.owner, cls.client_user)
+
+    def setUp(self):
+        self.client.force_authenticate(self.client_user)
+
+    def assertQueryBudget(self, url, budget):
+        for limit in (1, 6):
+            with self.assertNumQueries(budget):
+                response = self.client.get(url, {'limit': limit})
+            self.assertEqual(response.status_code, 200)
+
+    def test_hotel_list(self):
+        # count + hotels/city + hotel_images
+        self.assertQueryBudget('/en/api/v1/hotel/', 3)
+
+    def test_hotel_detail(self):
+        hotel = Hotel.objects.first()
+        # hotel/city/country/owner/owner.country + hotel_images
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/en/api/v1/hotel/{hotel.pk}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_booking_list(self):
+        # count + bookings с join-ами + hotel_images для hotel и room.room_hotel
+        self.assertQueryBudget('/en/api/v1/booking/', 4)
+
+    def test_favorite_list(self):
+        self.assertQueryBudget('/en/api/v1/favorite/', 2)
+
+    def test_favorite_item_list(self):
+        # count + items с join-ами + hotel_images
+        self.assertQueryBudget('/en/api/v1/favorite_item/', 3)
+
+    def test_cursor_pages_skip_count(self):
+        # hotels/city + hotel_images, без COUNT(*)
+        with self.assertNumQueries(2):
+            response = self.client.get('/en/api/v1/hotel/', {'pagination': 'cursor', 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+
+
+# ---------- ASYNC READ PATH ----------
+class AsyncReadPathTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.client_user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        seed_hotels(cls.owner, cls.client_user)
+        cls.hotel = Hotel.objects.order_by('id').first()
+
+    def setUp(self):
+        reference_cache().clear()
+        self.client.force_authenticate(self.client_user)
+
+    def async_get(self, view_class, path, params=None, authenticate=True, **kwargs):
+        request = AsyncRequestFactory().get(f'/api/v1/{path}', params or {})
+        if authenticate:
+            force_authenticate(request, user=self.client_user)
+        view = ASYNC_READ_VIEWS[view_class].as_view()
+        self.assertTrue(iscoroutinefunction(view))
+        with translation.override('en'):
+            # ORM-вызовы из sync_to_async возвращаются в этот поток — в транзакцию теста
+            return async_to_sync(view)(request, **kwargs)
+
+    def assertSameAsSync(self, view_class, path, queries, params=None, **kwargs):
+        expected = self.client.get(f'/en/api/v1/{path}', params).data
+        with self.assertNumQueries(queries):
+            response = self.async_get(view_class, path, params, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        if 'results' in expected:
+            data, expected = data['results'], expected['results']
+        self.assertEqual(json.loads(json.dumps(data)), json.loads(json.dumps(expected)))
+
+    def test_hotel_list(self):
+        # count + hotels/city + hotel_images, как у sync-версии
+        self.assertSameAsSync(HotelListView, 'hotel/', 3, {'limit': 4})
+        self.assertSameAsSync(HotelListView, 'hotel/', 2, {'pagination': 'cursor', 'limit': 4})
+        # + проверка city формой django-filter
+        self.assertSameAsSync(HotelListView, 'hotel/', 4, {'city': self.hotel.city_id})
+        # ?fields без city/hotel_images — без join и prefetch
+        self.assertSameAsSync(HotelListView, 'hotel/', 2, {'fields': 'id,hotel_name', 'limit': 4})
+
+    def test_hotel_detail(self):
+        self.assertSameAsSync(HotelDetailAPIView, f'hotel/{self.hotel.pk}/', 2, pk=self.hotel.pk)
+        self.assertEqual(self.async_get(HotelDetailAPIView, 'hotel/0/', pk=0).status_code, 404)
+
+    def test_city_list_uses_reference_cache(self):
+        self.assertSameAsSync(CityListView, 'city/', 2)
+        with self.assertNumQueries(0):
+            response = self.async_get(CityListView, 'city/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_booking_list(self):
+        self.assertSameAsSync(BookingListView, 'booking/', 4, {'limit': 6})
+
+    def test_permissions_are_checked(self):
+        self.assertEqual(self.async_get(HotelListView, 'hotel/', authenticate=False).status_code, 401)
+
+
+# ---------- CONDITIONAL GET ----------
+class ConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.client_user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        seed_hotels(cls.owner, cls.client_user)
+        cls.hotel = Hotel.objects.order_by('id').first()
+        cls.booking = Booking.objects.filter(hotel=cls.hotel).get()
+
+    def setUp(self):
+        reference_cache().clear()
+        self.client.force_authenticate(self.client_user)
+
+    def etag(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag']
+
+    def assertNotModified(self, url, params=None, queries=None, **headers):
+        with mock.patch('rest_framework.serializers.Serializer.to_representation') as to_representation:
+            if queries is None:
+                response = self.client.get(url, params, headers=headers)
+            else:
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url, params, headers=headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(to_representation.called)
+        self.assertEqual(response.content, b'')
+        return response
+
+    def test_hotel_detail_not_modified(self):
+        url = f'/en/api/v1/hotel/{self.hotel.pk}/'
+        etag = self.etag(url)
+        self.assertTrue(etag.startswith('"'))  # strong
+        response = self.assertNotModified(url, queries=2, if_none_match=etag)
+        self.assertEqual(response['ETag'], etag)
+
+        self.assertEqual(self.client.get(url, headers={'if-none-match': '"other"'}).status_code, 200)
+
+    def test_hotel_detail_etag_follows_changes(self):
+        url = f'/en/api/v1/hotel/{self.hotel.pk}/'
+        etags = [self.etag(url)]
+
+        self.hotel.street = 'new street'
+        self.hotel.save()
+        etags.append(self.etag(url))
+        # рейтинг меняется через queryset.update()
+        Review.objects.create(user=self.client_user, hotel=self.hotel, stars=5, description='ok')
+        etags.append(self.etag(url))
+        HotelImage.objects.create(hotel=self.hotel, hotel_images='hotel_images/seed.jpg')
+        etags.append(self.etag(url))
+        self.owner.first_name = 'Owner'
+        self.owner.save()
+        etags.append(self.etag(url))
+        with self.captureOnCommitCallbacks(execute=True):
+            City.objects.filter(pk=self.hotel.city_id).get().save()
+        etags.append(self.etag(url))
+        self.assertEqual(len(set(etags)), len(etags))
+
+        with translation.override('ru'):
+            self.assertNotEqual(self.etag(f'/ru/api/v1/hotel/{self.hotel.pk}/'), etags[-1])
+
+    def test_hotel_list_not_modified(self):
+        url, params = '/en/api/v1/hotel/', {'limit': 2}
+        etag = self.etag(url, params)
+        # те же count + страница + hotel_images, но без сериализации
+        self.assertNotModified(url, params, queries=3, if_none_match=etag)
+        self.assertNotEqual(self.etag(url, {'limit': 3}), etag)
+
+        # новый отель меняет count (и ссылки пагинации), даже если страница та же
+        Hotel.objects.create(
+            hotel_name='New', city=self.hotel.city, hotel_star=3, description='d', street='s', owner=self.owner
+        )
+        self.assertNotEqual(self.etag(url, {**params, 'ordering': 'id'}), etag)
+
+        cursor_etag = self.etag(url, {'pagination': 'cursor', 'limit': 2})
+        self.assertNotModified(url, {'pagination': 'cursor', 'limit': 2}, if_none_match=cursor_etag)
+
+    def test_booking_etag_covers_nested_room(self):
+        url = f'/en/api/v1/booking/{self.booking.pk}/'
+        list_url = '/en/api/v1/booking/'
+        etag, list_etag = self.etag(url), self.etag(list_url)
+        self.assertNotModified(url, if_none_match=etag)
+
+        self.client.force_authenticate(self.owner)
+        response = self.client.patch(
+            '/en/api/v1/room/bulk_update/', [{'id': self.booking.room_id, 'room_price': 999}], format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.client.force_authenticate(self.client_user)
+        self.assertNotEqual(self.etag(url), etag)
+        self.assertNotEqual(self.etag(list_url), list_etag)
+
+    def test_async_hotel_detail_not_modified(self):
+        url = f'/en/api/v1/hotel/{self.hotel.pk}/'
+        etag = self.etag(url)
+        request = AsyncRequestFactory().get(url, headers={'if-none-match': etag})
+        force_authenticate(request, user=self.client_user)
+        with translation.override('en'):
+            response = async_to_sync(ASYNC_READ_VIEWS[HotelDetailAPIView].as_view())(request, pk=self.hotel.pk)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+
+# ---------- FAVORITES ----------
+class FavoriteHotelsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.client_user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        seed_hotels(cls.owner, cls.client_user)  # все 6 отелей уже в избранном клиента
+        cls.hotels = list(Hotel.objects.order_by('id').values_list('id', flat=True))
+        cls.other = UserProfile.objects.create_user('other', password='pass', user_role='client')
+
+    def setUp(self):
+        reference_cache().clear()
+        self.client.force_authenticate(self.other)
+
+    def toggle(self, **body):
+        response = self.client.post('/en/api/v1/favorite/hotels/', body, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['hotels']
+
+    def test_batch_add_and_remove(self):
+        self.assertEqual(self.client.get('/en/api/v1/favorite/hotels/').data, {'hotels': []})
+        self.assertEqual(self.toggle(add=self.hotels[:3]), self.hotels[:3])
+        # повторное добавление не дублирует записи
+        self.assertEqual(self.toggle(add=self.hotels[1:3] + [self.hotels[4]], remove=[self.hotels[0]]),
+                         [*self.hotels[1:3], self.hotels[4]])
+        self.assertEqual(FavoriteItem.objects.filter(favorite__user=self.other).count(), 3)
+        self.assertEqual(Favorite.objects.filter(user=self.other).count(), 1)
+
+    def test_toggle_is_validated(self):
+        for body in ({'add': [0]}, {'add': [999999]}, {'add': [self.hotels[0]], 'remove': [self.hotels[0]]}):
+            response = self.client.post('/en/api/v1/favorite/hotels/', body, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.client.post('/en/api/v1/favorite/hotels/', {}, format='json').status_code, 403)
+
+    def test_is_favorite_without_extra_queries(self):
+        self.toggle(add=[self.hotels[1], self.hotels[3]])
+        # те же count + hotels/city + hotel_images, is_favorite — EXISTS в выборке отелей
+        with self.assertNumQueries(3):
+            response = self.client.get('/en/api/v1/hotel/', {'limit': 6, 'ordering': 'id'})
+        flags = {row['id']: row['is_favorite'] for row in response.data['results']}
+        self.assertEqual({pk for pk, flag in flags.items() if flag}, {self.hotels[1], self.hotels[3]})
+
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/en/api/v1/hotel/{self.hotels[1]}/')
+        self.assertTrue(response.data['is_favorite'])
+
+        self.client.force_authenticate(self.client_user)
+        response = self.client.get(f'/en/api/v1/hotel/{self.hotels[1]}/', {'fields': 'id,is_favorite'})
+        self.assertEqual(response.data, {'id': self.hotels[1], 'is_favorite': True})
+        # вложенные отели (бронь) флаг не получают
+        self.assertNotIn('is_favorite', self.client.get('/en/api/v1/booking/').data['results'][0]['hotel'])
+
+    def test_toggle_changes_etag(self):
+        url = f'/en/api/v1/hotel/{self.hotels[0]}/'
+        etag = self.client.get(url)['ETag']
+        self.toggle(add=[self.hotels[0]])
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_favorite'])
+
+    def test_toggle_is_not_hidden_by_if_modified_since(self):
+        # updated_at отелей не меняется — валидатором может быть только ETag
+        url, params = '/en/api/v1/hotel/', {'limit': 6, 'ordering': 'id'}
+        for path in (url, f'/en/api/v1/hotel/{self.hotels[0]}/'):
+            self.assertNotIn('Last-Modified', self.client.get(path, params))
+        self.toggle(add=[self.hotels[0]])
+        response = self.client.get(url, params, headers={'if-modified-since': http_date(time.time() + 3600)})
+        self.assertEqual(response.status_code, 200)
+        flags = {row['id']: row['is_favorite'] for row in response.data['results']}
+        self.assertTrue(flags[self.hotels[0]])
+
+
+# ---------- FACETS ----------
+class FacetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.client_user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        seed_hotels(cls.owner, cls.client_user)  # Bishkek: звёзды 1, 2, 3, 4, 5, 1; номера 100..105
+        cls.bishkek, cls.country = City.objects.get(), Country.objects.get()
+        cls.osh = City.objects.create(city_name='Osh', city_image='city_image/seed.jpg')
+        for star in (4, 5, 5):
+            hotel = Hotel.objects.create(
+                hotel_name='Osh', city=cls.osh, hotel_star=star, description='d', street='s', owner=cls.owner
+            )
+            Room.objects.create(room_number=1, room_hotel=hotel, room_price=250, room_type='семейный', room_description='r')
+
+    def setUp(self):
+        reference_cache().clear()
+        self.client.force_authenticate(self.client_user)
+
+    def facets(self, url, params, status=200):
+        response = self.client.get(url, {**params, 'facets': 'true'})
+        self.assertEqual(response.status_code, status, response.data)
+        return response.data
+
+    @staticmethod
+    def counts(data, facet):
+        return {row['value']: row['count'] for row in data['facets'][facet]}
+
+    def test_each_facet_ignores_its_own_filter(self):
+        # проверка city фильтром + один агрегирующий запрос
+        with self.assertNumQueries(2):
+            data = self.facets('/en/api/v1/hotel/', {'city': self.bishkek.pk, 'hotel_star__gt': 3})
+        # звёзды — только по городу, города — только по звёздам
+        self.assertEqual(self.counts(data, 'hotel_star'), {1: 2, 2: 1, 3: 1, 4: 1, 5: 1})
+        self.assertEqual(data['facets']['city'], [
+            {'value': self.osh.pk, 'count': 3}, {'value': self.bishkek.pk, 'count': 2},
+        ])
+        self.assertEqual(self.counts(data, 'country'), {self.country.pk: 2})
+        self.assertEqual(data['count'], Hotel.objects.filter(city=self.bishkek, hotel_star__gt=3).count())
+
+    def test_cached_by_normalized_filters(self):
+        self.facets('/en/api/v1/hotel/', {'hotel_star__gt': 3, 'city': self.osh.pk})
+        # из кэша: остаётся только проверка city фильтром
+        with self.assertNumQueries(1):
+            data = self.facets('/en/api/v1/hotel/', {'city': f'0{self.osh.pk}', 'hotel_star__gt': '3'})
+        self.assertEqual(data['count'], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Hotel.objects.create(
+                hotel_name='New', city=self.osh, hotel_star=5, description='d', street='s', owner=self.owner
+            )
+        data = self.facets('/en/api/v1/hotel/', {'city': self.osh.pk, 'hotel_star__gt': 3})
+        self.assertEqual(data['count'], 4)
+
+    def test_room_facets_respect_availability(self):
+        booked = Booking.objects.order_by('id').first()
+        params = {'check_in': booked.check_in.isoformat(), 'check_out': booked.check_out.isoformat()}
+        data = self.facets('/en/api/v1/room/available/', {**params, 'room_price__lt': 200, 'city': self.osh.pk})
+        # price-фасет — без своего room_price__lt, room_type — с ним
+        self.assertEqual(self.counts(data, 'room_price'), {'0-100': 0, '100-200': 0, '200-300': 3, '300-500': 0, '500+': 0})
+        self.assertEqual(self.counts(data, 'room_type'), {'люкс': 0, 'семейный': 0, 'одноместный': 0, 'двухместный': 0})
+        self.assertEqual(data['count'], 0)
+
+        data = self.facets('/en/api/v1/room/available/', params)
+        self.assertEqual(self.counts(data, 'room_type'), {'люкс': 5, 'семейный': 3, 'одноместный': 0, 'двухместный': 0})
+        self.assertEqual(data['count'], 8)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booked.delete()
+        self.assertEqual(self.facets('/en/api/v1/room/available/', params)['count'], 9)
+
+    def test_async_hotel_list_facets(self):
+        request = AsyncRequestFactory().get('/en/api/v1/hotel/', {'facets': '1', 'hotel_star__lt': 2})
+        force_authenticate(request, user=self.client_user)
+        response = async_to_sync(ASYNC_READ_VIEWS[HotelListView].as_view())(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_params_are_validated(self):
+        self.facets('/en/api/v1/hotel/', {'hotel_star__gt': 'x'}, status=400)
+        response = self.client.get('/en/api/v1/hotel/', {'facets': 'maybe'})
+        self.assertEqual(response.status_code, 400)
+        self.facets('/en/api/v1/room/available/', {}, status=400)
+
+
+# ---------- TRANSLATED COLUMNS ----------
+class ActiveLanguageColumnsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.client_user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        seed_hotels(cls.owner, cls.client_user, count=3)
+        # английских переводов нет — ответ на en берётся из ru
+        Hotel.objects.update(hotel_name_ru='Отель', hotel_name_en='', street_ru='улица', street_en=None)
+
+    def setUp(self):
+        self.client.force_authenticate(self.client_user)
+
+    def select_sql(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, ' '.join(query['sql'].split(' FROM ')[0] for query in queries.captured_queries)
+
+    def test_inactive_language_columns_are_not_selected(self):
+        response, sql = self.select_sql('/ru/api/v1/hotel/', {'ordering': 'id'})
+        self.assertEqual(response.data['results'][0]['hotel_name'], 'Отель')
+        self.assertIn('"hotel_name_ru"', sql)
+        for column in ('"hotel_name_en"', '"description_en"', '"city_name_en"', '"booking_app_hotel"."hotel_name",'):
+            self.assertNotIn(column, sql)
+
+        _, sql = self.select_sql('/ru/api/v1/booking/')
+        self.assertNotIn('"room_description_en"', sql)
+        self.assertNotIn('"description_en"', sql)
+
+    def test_fallback_without_extra_queries(self):
+        # en + fallback ru; пустой перевод не догружает отложенные колонки по одному запросу на строку
+        with self.assertNumQueries(3):
+            response, sql = self.select_sql('/en/api/v1/hotel/', {'ordering': 'id'})
+        self.assertIn('"hotel_name_ru"', sql)
+        self.assertEqual({(row['hotel_name'], row['street']) for row in response.data['results']}, {('Отель', 'улица')})
+
+        url = f'/en/api/v1/hotel/{Hotel.objects.first().pk}/'
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.data['hotel_name'], 'Отель')
+
+
+# ---------- GEO ----------
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * geo.EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class HotelNearbyTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.client_user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        seed_hotels(cls.owner, cls.client_user, count=2)  # без координат
+        cls.city = City.objects.get()
+        rnd = random.Random(7)
+        # кластеры у антимеридиана, полюса и в обычном месте
+        cls.points = []
+        for center_lat, center_lon in ((42.87, 74.6), (10.0, 179.98), (89.95, 0.0), (-33.9, -179.99)):
+            for i in range(25):
+                lat = max(-90.0, min(90.0, center_lat + rnd.uniform(-0.2, 0.2)))
+                lon = (center_lon + rnd.uniform(-0.2, 0.2) + 180) % 360 - 180
+                hotel = Hotel.objects.create(
+                    hotel_name=f'Geo {i}', city=cls.city, hotel_star=3, description='d', street='s',
+                    owner=cls.owner, latitude=lat, longitude=lon,
+                )
+                cls.points.append((hotel.pk, lat, lon))
+
+    def setUp(self):
+        self.client.force_authenticate(self.client_user)
+
+    def expected(self, lat, lon, radius):
+        found = [(haversine_km(lat, lon, p_lat, p_lon), pk) for pk, p_lat, p_lon in self.points]
+        return [pk for distance, pk in sorted(found) if distance <= radius]
+
+    def test_geo_cell_is_maintained(self):
+        pk, lat, lon = self.points[0]
+        hotel = Hotel.objects.get(pk=pk)
+        self.assertEqual(hotel.geo_cell, geo.geo_cell(lat, lon))
+        hotel.latitude, hotel.longitude = None, None
+        hotel.save()
+        self.assertIsNone(Hotel.objects.get(pk=pk).geo_cell)
+
+    def test_matches_brute_force(self):
+        for lat, lon in ((42.87, 74.6), (10.0, -179.99), (89.99, 120.0), (-33.9, 179.95)):
+            for radius in (3, 10, 30):
+                with self.subTest(lat=lat, lon=lon, radius=radius):
+                    ids = list(Hotel.objects.nearby(lat, lon, radius).values_list('id', flat=True))
+                    self.assertEqual(ids, self.expected(lat, lon, radius))
+
+    def test_endpoint_sorted_by_distance(self):
+        # отели + hotel_images
+        with self.assertNumQueries(2):
+            response = self.client.get('/en/api/v1/hotel/nearby/', {'lat': 10.0, 'lon': 180.0, 'radius': 15, 'limit': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data], self.expected(10.0, 180.0, 15)[:5])
+        distances = [row['distance_km'] for row in response.data]
+        self.assertEqual(distances, sorted(distances))
+        self.assertIn('city', response.data[0])
+
+        response = self.client.get('/en/api/v1/hotel/nearby/', {'lat': 0, 'lon': 0, 'fields': 'id,distance_km'})
+        self.assertEqual(response.data, [])
+
+    def test_params_are_validated(self):
+        for params in ({'lat': 10}, {'lat': 91, 'lon': 0}, {'lat': 0, 'lon': 0, 'radius': 500}):
+            self.assertEqual(self.client.get('/en/api/v1/hotel/nearby/', params).status_code, 400)
+
+    def test_coordinates_come_in_pairs(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.post('/en/api/v1/hotel/create/', {
+            'hotel_name': 'Half', 'city': self.city.pk, 'hotel_star': 3, 'description': 'd', 'street': 's',
+            'owner': self.owner.pk, 'latitude': 42.8,
+        })
+        self.assertEqual(response.status_code, 400)
+
+
+# ---------- SPARSE FIELDSETS ----------
+class SparseFieldsetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.client_user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        seed_hotels(cls.owner, cls.client_user)
+        cls.hotel = Hotel.objects.order_by('id').first()
+        cls.booking = Booking.objects.filter(hotel=cls.hotel).get()
+
+    def setUp(self):
+        reference_cache().clear()
+        self.client.force_authenticate(self.client_user)
+
+    def get(self, url, params, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_hotel_list_fields_skip_joins_and_prefetch(self):
+        # count + hotels, без city и hotel_images
+        data = self.get('/en/api/v1/hotel/', {'fields': 'id,hotel_name', 'limit': 6}, 2)
+        self.assertEqual(set(data['results'][0]), {'id', 'hotel_name'})
+
+        # city раскрыт, hotel_images не раскрыты — не выводятся и не prefetch-атся
+        data = self.get('/en/api/v1/hotel/', {'fields': 'id,city,hotel_images', 'expand': 'city', 'limit': 6}, 2)
+        self.assertEqual(set(data['results'][0]), {'id', 'city'})
+        self.assertEqual(data['results'][0]['city']['city_name'], 'Bishkek')
+
+    def test_hotel_detail_unexpanded_relations_are_ids(self):
+        url = f'/en/api/v1/hotel/{self.hotel.pk}/'
+        full = self.get(url, {}, 2)
+
+        data = self.get(url, {'expand': 'owner'}, 1)
+        self.assertEqual(data['city'], self.hotel.city_id)
+        self.assertEqual(data['country'], self.hotel.country_id)
+        self.assertEqual(data['owner']['country'], None)
+        self.assertEqual(data['owner']['username'], 'owner')
+        self.assertNotIn('hotel_images', data)
+        self.assertEqual(data['rating_histogram'], full['rating_histogram'])
+
+        data = self.get(url, {'expand': 'owner.country', 'fields': 'owner'}, 1)
+        self.assertEqual(list(data), ['owner'])
+
+    def test_booking_list_and_detail(self):
+        data = self.get('/en/api/v1/booking/', {'expand': 'hotel', 'limit': 6}, 2)
+        row = data['results'][0]
+        self.assertEqual(row['room'], Booking.objects.get(pk=row['id']).room_id)
+        self.assertEqual(row['user'], self.client_user.pk)
+        self.assertEqual(set(row['hotel']), {'id', 'hotel_name', 'city', 'hotel_star', 'street'})
+
+        data = self.get('/en/api/v1/booking/', {'expand': 'room.room_hotel.city', 'fields': 'id,room', 'limit': 6}, 2)
+        self.assertEqual(data['results'][0]['room']['room_hotel']['city']['city_name'], 'Bishkek')
+
+        # права (CheckOwner) проверяются по user_id без загрузки пользователя
+        data = self.get(f'/en/api/v1/booking/{self.booking.pk}/', {'fields': 'id,total_price'}, 1)
+        self.assertEqual(data, {'id': self.booking.pk, 'total_price': self.booking.total_price})
+
+    def test_fieldset_changes_etag(self):
+        url = f'/en/api/v1/hotel/{self.hotel.pk}/'
+        etags = {self.client.get(url, params)['ETag'] for params in ({}, {'fields': 'id'}, {'expand': ''})}
+        self.assertEqual(len(etags), 3)
+
+    def test_unknown_names_are_rejected(self):
+        response = self.client.get('/en/api/v1/hotel/', {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', str(response.data['fields']))
+        response = self.client.get(f'/en/api/v1/booking/{self.booking.pk}/', {'expand': 'hotel.owner'})
+        self.assertEqual(response.status_code, 400)
+
+
+# ---------- EXPORT ----------
+class ExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.client_user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        seed_hotels(cls.owner, cls.client_user, count=4)
+        cls.hotel = Hotel.objects.order_by('id').first()
+        Review.objects.create(user=cls.client_user, hotel=cls.hotel, stars=4, description='тихо, "уютно"\nи чисто')
+
+        other = UserProfile.objects.create_user('other', password='pass', user_role='owner')
+        other_hotel = Hotel.objects.create(
+            hotel_name='Other', city=cls.hotel.city, hotel_star=2, description='d', street='s', owner=other
+        )
+        room = Room.objects.create(room_number=99, room_hotel=other_hotel, room_price=10, room_description='r')
+        Booking.objects.create(
+            user=cls.client_user, hotel=other_hotel, room=room, status_book='подтверждено',
+            check_in=timezone.now(), check_out=timezone.now() + timedelta(days=1)
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.owner)
+
+    def export(self, path, params=None, **headers):
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/en/api/v1/{path}', params, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.streaming)
+            content = b''.join(response.streaming_content)
+        return response, content
+
+    def test_bookings_csv_scoped_to_owner(self):
+        response, content = self.export('booking/export/')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('attachment', response['Content-Disposition'])
+        rows = list(csv.DictReader(content.decode().splitlines()))
+        expected = Booking.objects.filter(hotel__owner=self.owner).order_by('id')
+        self.assertEqual([int(row['id']) for row in rows], list(expected.values_list('id', flat=True)))
+        self.assertEqual(rows[0]['hotel_name'], 'Hotel 0')
+        self.assertEqual(rows[0]['username'], 'client')
+
+        _, content = self.export('booking/export/', {'hotel': self.hotel.pk})
+        self.assertEqual(len(content.decode().splitlines()), 2)
+
+    def test_reviews_ndjson_gzip(self):
+        response, content = self.export('review/export/', {'output': 'ndjson'}, accept_encoding='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        rows = [json.loads(line) for line in gzip.decompress(content).decode().splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['stars'], 4)
+        self.assertEqual(rows[0]['description'], 'тихо, "уютно"\nи чисто')
+
+    async def test_asgi_streams_without_buffering(self):
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.owner).access_token))()
+        response = await self.async_client.get('/en/api/v1/booking/export/', headers={'authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        # асинхронный итератор: StreamingHttpResponse не собирает выгрузку через list()
+        self.assertTrue(response.is_async)
+        content = b''.join([part async for part in response.streaming_content])
+        expected = await sync_to_async(Booking.objects.filter(hotel__owner=self.owner).count)()
+        self.assertEqual(len(list(csv.DictReader(content.decode().splitlines()))), expected)
+
+    def test_only_owners_can_export(self):
+        self.client.force_authenticate(self.client_user)
+        self.assertEqual(self.client.get('/en/api/v1/booking/export/').status_code, 403)
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.client.get('/en/api/v1/booking/export/', {'output': 'xml'}).status_code, 400)
+
+    def test_export_command(self):
+        path = os.path.join(tempfile.mkdtemp(), 'bookings.csv.gz')
+        call_command('export_data', 'bookings', gzip=True, file=path, chunk_size=2, stderr=StringIO())
+        with gzip.open(path, 'rt') as f:
+            rows = list(csv.DictReader(f))
+        shutil.rmtree(os.path.dirname(path))
+        self.assertEqual(len(rows), Booking.objects.count())
+
+        with self.assertRaises(CommandError):
+            call_command('export_data', 'reviews', owner='client')
+
+
+# ---------- METRICS ----------
+class PerformanceMetricsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.client_user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        seed_hotels(cls.owner, cls.client_user, count=2)
+
+    def test_server_timing_and_prometheus_histograms(self):
+        self.client.force_authenticate(self.client_user)
+        response = self.client.get('/en/api/v1/hotel/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+
+        metrics = self.client.get('/metrics').content.decode()
+        self.assertIn('booking_db_queries_bucket{view="hotel_list",method="GET",status="200",le="3"}', metrics)
+        self.assertRegex(metrics, r'booking_serializer_duration_seconds_count\{view="hotel_list".*\} [1-9]')
+
+    async def test_async_stack_counts_queries_from_worker_threads(self):
+        # ASGI: middleware в event loop, ORM — в потоках sync_to_async со своими соединениями
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.client_user).access_token))()
+        response = await self.async_client.get('/en/api/v1/hotel/', headers={'authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+
+# ---------- CONNECTION POOL ----------
+class ConnectionPoolTests(TransactionTestCase):
+    """Закрывают соединение/пул, поэтому вне транзакции TestCase."""
+
+    def test_pool_stats_are_exported(self):
+        UserProfile.objects.count()
+        metrics = self.client.get('/metrics').content.decode()
+        self.assertRegex(metrics, r'booking_db_connects_total [1-9]')
+        if connection.settings_dict['OPTIONS'].get('pool'):
+            self.assertRegex(metrics, r'booking_db_pool_size\{alias="default"\} [1-9]')
+            self.assertIn('# TYPE booking_db_pool_requests_num_total counter', metrics)
+
+    def test_pools_are_closed_before_fork(self):
+        UserProfile.objects.count()
+        db.close_before_fork()
+        self.assertEqual(list(db.existing_pools()), [])
+        self.assertIsNone(connection.connection)
+        # после fork воркер открывает собственный пул при первом запросе
+        self.assertEqual(UserProfile.objects.count(), 0)
+
+    def test_benchmark_reuses_connections(self):
+        call_command('seed_demo_data', hotels=2, rooms_per_hotel=1, clients=1, owners=1, stdout=StringIO())
+        options = dict(connection.settings_dict['OPTIONS'])
+        output = os.path.join(tempfile.mkdtemp(), 'pool.json')
+        call_command('benchmark_db_pool', requests=5, routes=['hotel_detail'], output=output, stdout=StringIO())
+        with open(output) as f:
+            results = json.load(f)['results']['hotel_detail']
+        shutil.rmtree(os.path.dirname(output))
+
+        self.assertEqual(connection.settings_dict['OPTIONS'], options)
+        self.assertEqual({row['status'][0] for row in results.values()}, {200})
+        self.assertEqual(results['connect']['backends'], 5)
+        self.assertEqual(results['persistent']['backends'], 1)
+        self.assertLessEqual(results['pool']['backends'], 4)
+
+
+# ---------- JWT CLAIMS ----------
+class ClaimsAuthenticationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.client_user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        seed_hotels(cls.owner, cls.client_user, count=2)
+
+    def setUp(self):
+        reference_cache().clear()
+        caches['throttle'].clear()
+        auth_state.clear()
+
+    def login(self, username):
+        response = self.client.post('/en/api/v1/auth/login/', {'username': username, 'password': 'pass'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_authenticated_get_runs_no_auth_queries(self):
+        self.login('client')
+        # count + hotels/city + hotel_images — как с force_authenticate
+        with self.assertNumQueries(3):
+            response = self.client.get('/en/api/v1/hotel/')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/en/api/v1/auth/user/')
+        self.assertEqual((response.data['username'], response.data['user_role']), ('client', 'client'))
+
+    def test_role_change_applies_to_issued_tokens(self):
+        self.login('owner')
+        payload = {'country_name': 'Kazakhstan', 'country_image': 'country_image/seed.jpg'}
+        self.assertEqual(self.client.get('/en/api/v1/country/').status_code, 200)
+        # ответ из кэша справочников, пользователь из токена
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/en/api/v1/country/').status_code, 200)
+
+        self.owner.user_role = 'client'
+        self.owner.save()
+        self.assertEqual(self.client.get('/en/api/v1/country/').status_code, 403)
+        self.assertEqual(self.client.post('/en/api/v1/country/', payload).status_code, 403)
+
+    def test_deactivated_user_is_rejected(self):
+        self.login('client')
+        self.client_user.is_active = False
+        self.client_user.save(update_fields=['is_active'])
+        self.assertEqual(self.client.get('/en/api/v1/hotel/').status_code, 401)
+
+    def test_other_processes_pick_up_changes_after_ttl(self):
+        self.login('client')
+        self.client.get('/en/api/v1/hotel/')
+        # как будто изменение сделал другой процесс с собственным кэшем: сюда дошла только запись в БД
+        UserProfile.objects.filter(pk=self.client_user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/en/api/v1/hotel/').status_code, 200)
+        with override_settings(AUTH_USER_CACHE_TTL=0):
+            auth_state.clear()
+            self.assertEqual(self.client.get('/en/api/v1/hotel/').status_code, 401)
+
+    def test_evicted_state_is_reloaded_from_database(self):
+        self.login('owner')
+        self.owner.user_role = 'client'
+        self.owner.save()
+        # запись вытеснена из кэша процесса и из reference-кэша
+        auth_state.clear()
+        reference_cache().clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(auth_state.get(self.owner.pk), ('client', True))
+        self.assertEqual(self.client.post('/en/api/v1/country/', {}).status_code, 403)
+
+    def test_tokens_without_claims_fall_back_to_database(self):
+        token = RefreshToken.for_user(self.client_user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with self.assertNumQueries(4):
+            self.assertEqual(self.client.get('/en/api/v1/hotel/').status_code, 200)
+
+
+# ---------- THROTTLING ----------
+def with_rates(**rates):
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+class ThrottlingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+
+    def setUp(self):
+        caches['throttle'].clear()
+        local_store.values.clear()
+
+    def login(self, **extra):
+        return self.client.post('/en/api/v1/auth/login/', {'username': 'client', 'password': 'wrong'}, **extra)
+
+    @with_rates(login='3/min')
+    def test_login_is_rejected_before_password_hashing(self):
+        self.assertEqual([self.login().status_code for _ in range(3)], [400] * 3)
+        with mock.patch('booking_app.serializers.authenticate') as authenticate, self.assertNumQueries(0):
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        # до конца окна и ещё 20 секунд, пока вес трёх запросов не опустится до двух
+        self.assertIn(int(response['Retry-After']), range(20, 81))
+        authenticate.assert_not_called()
+
+        # корзина своя у каждого IP
+        self.assertEqual(self.login(REMOTE_ADDR='10.0.0.2').status_code, 400)
+
+    @with_rates(login='3/min')
+    def test_limit_recovers_gradually(self):
+        now = 6000.0  # начало минутного окна
+        with mock.patch('booking_app.throttling.time.time', return_value=now):
+            self.assertEqual([self.login().status_code for _ in range(4)], [400, 400, 400, 429])
+        with mock.patch('booking_app.throttling.time.time', return_value=now + 59):
+            self.assertEqual(self.login().status_code, 429)
+        # в следующем окне вес прошлых трёх запросов падает на 1 каждые 20 секунд
+        with mock.patch('booking_app.throttling.time.time', return_value=now + 60 + 21):
+            self.assertEqual([self.login().status_code for _ in range(2)], [400, 429])
+
+    @with_rates(booking='1/min')
+    def test_authenticated_requests_are_limited_per_user(self):
+        other = UserProfile.objects.create_user('other', password='pass', user_role='client')
+        for user in (self.user, other):
+            self.client.force_authenticate(user)
+            self.assertEqual(self.client.post('/en/api/v1/booking/create/', {}, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/en/api/v1/booking/create/', {}, format='json').status_code, 429)
+        # другие маршруты не затронуты
+        self.assertEqual(self.client.get('/en/api/v1/hotel/').status_code, 200)
+
+    @with_rates(login='3/min')
+    def test_parallel_logins_do_not_exceed_capacity(self):
+        barrier = threading.Barrier(8)
+
+        def login(_):
+            try:
+                client = APIClient()
+                barrier.wait()
+                return client.post('/en/api/v1/auth/login/', {'username': 'client', 'password': 'wrong'}).status_code
+            finally:
+                connections.close_all()
+
+        backend = type(caches['throttle'])
+        original_get = backend.get
+
+        def slow_get(cache, *args, **kwargs):
+            # ответ общего кэша идёт по сети: пока он в пути, остальные потоки читают то же состояние
+            value = original_get(cache, *args, **kwargs)
+            time.sleep(0.05)
+            return value
+
+        # caches — у каждого потока свои объекты, поэтому патчим класс бэкенда
+        with mock.patch('booking_app.throttling.time.time', return_value=6000.0), \
+                mock.patch.object(backend, 'get', slow_get), ThreadPoolExecutor(8) as pool:
+            statuses = list(pool.map(login, range(8)))
+        self.assertEqual(statuses.count(400), 3)
+        self.assertEqual(statuses.count(429), 5)
+
+    @with_rates(login='1/min')
+    def test_falls_back_to_process_memory(self):
+        with mock.patch.object(type(caches['throttle']), 'get', side_effect=ConnectionError), \
+                mock.patch.object(type(caches['throttle']), 'set', side_effect=ConnectionError):
+            self.assertEqual([self.login().status_code for _ in range(2)], [400, 429])
+        self.assertEqual(len(local_store.values), 1)
+
+
+# ---------- CURSOR PAGINATION ----------
+class CursorPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.client_user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        seed_hotels(cls.owner, cls.client_user, count=5)
+
+    def setUp(self):
+        self.client.force_authenticate(self.client_user)
+
+    def walk(self, url, params):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_walks_every_row_once(self):
+        ids = self.walk('/en/api/v1/booking/', {'pagination': 'cursor', 'ordering': 'price', 'limit': 2})
+        expected = list(Booking.objects.order_by('total_price', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_ties_beyond_offset_cutoff(self):
+        # 1300 отелей с одинаковым avg_rating: курсор несёт (avg_rating, id), а не OFFSET по повторам
+        hotel = Hotel.objects.first()
+        Hotel.objects.bulk_create(
+            Hotel(hotel_name='Tie', city_id=hotel.city_id, hotel_star=3, description='d', street='s', owner=self.owner)
+            for _ in range(1300)
+        )
+        expected = list(Hotel.objects.order_by('-avg_rating', '-id').values_list('id', flat=True))
+        params = {'pagination': 'cursor', 'ordering': 'rating', 'limit': 100, 'fields': 'id'}
+        self.assertEqual(self.walk('/en/api/v1/hotel/', params), expected)
+
+        # последняя страница стоит столько же запросов, сколько первая, и ведёт назад без пропусков
+        url = self.client.get('/en/api/v1/hotel/', params).data['next']
+        for _ in range(9):
+            url = self.client.get(url).data['next']
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual([row['id'] for row in response.data['results']], expected[1000:1100])
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual([row['id'] for row in previous.data['results']], expected[900:1000])
+        self.assertEqual(self.client.get('/en/api/v1/hotel/', {**params, 'cursor': 'garbage'}).status_code, 404)
+
+    def test_unknown_ordering_is_rejected(self):
+        response = self.client.get('/en/api/v1/hotel/', {'pagination': 'cursor', 'ordering': 'hotel_name'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_limit_offset_stays_default(self):
+        response = self.client.get('/en/api/v1/hotel/')
+        self.assertEqual(response.data['count'], 5)
+
+
+# ---------- BULK ROOMS ----------
+class BulkRoomTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.other = UserProfile.objects.create_user('other', password='pass', user_role='owner')
+        city = City.objects.create(city_name='Bishkek', city_image='city_image/seed.jpg')
+        cls.hotel = Hotel.objects.create(
+            hotel_name='Hotel', city=city, hotel_star=3, description='d', street='s', owner=cls.owner
+        )
+        cls.foreign_hotel = Hotel.objects.create(
+            hotel_name='Foreign', city=city, hotel_star=3, description='d', street='s', owner=cls.other
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.owner)
+
+    def room(self, number, **extra):
+        return {
+            'room_number': number, 'room_hotel': self.hotel.pk, 'room_price': 100,
+            'room_description': 'room', **extra
+        }
+
+    def test_bulk_create_runs_constant_queries(self):
+        payload = [self.room(i) for i in range(300)]
+        # hotels + занятые номера + savepoint/INSERT/release
+        with self.assertNumQueries(5):
+            response = self.client.post('/en/api/v1/room/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 300)
+        self.assertTrue(all(row['id'] for row in response.data))
+
+        room = Room.objects.get(room_hotel=self.hotel, room_number=0)
+        self.assertEqual((room.room_description_en, room.room_description_ru), ('room', 'room'))
+
+    def test_bulk_create_reports_item_errors_and_saves_nothing(self):
+        Room.objects.create(room_number=1, room_hotel=self.hotel, room_price=1, room_description='x')
+        payload = [
+            self.room(2), self.room(1), self.room(2),
+            self.room(3, room_hotel=self.foreign_hotel.pk), self.room(4, room_type='дворец'),
+        ]
+        response = self.client.post('/en/api/v1/room/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('room_number', response.data[1])
+        self.assertIn('room_number', response.data[2])
+        self.assertIn('room_hotel', response.data[3])
+        self.assertIn('room_type', response.data[4])
+        self.assertEqual(Room.objects.count(), 1)
+
+    def test_bulk_create_invalidates_quotes(self):
+        reference_cache().clear()
+        params = {'hotel': self.hotel.pk, 'check_in': '2030-07-01', 'check_out': '2030-07-03'}
+        self.assertEqual(self.client.get('/en/api/v1/room/quote/', params).data, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/en/api/v1/room/', [self.room(1), self.room(2)], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.client.get('/en/api/v1/room/quote/', params).data), 2)
+
+    def test_single_create_still_works(self):
+        response = self.client.post('/en/api/v1/room/', self.room(7), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['room_number'], 7)
+
+    def test_bulk_update(self):
+        rooms = Room.objects.bulk_create(
+            Room(room_number=i, room_hotel=self.hotel, room_price=100, room_description='x') for i in range(50)
+        )
+        foreign = Room.objects.create(room_number=1, room_hotel=self.foreign_hotel, room_price=1, room_description='x')
+
+        payload = [{'id': room.pk, 'room_price': 200, 'room_status': 'занят'} for room in rooms]
+        # rooms + savepoint/UPDATE/release
+        with self.assertNumQueries(4):
+            response = self.client.patch('/en/api/v1/room/bulk_update/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Room.objects.filter(room_price=200, room_status='занят').count(), 50)
+
+        response = self.client.patch(
+            '/en/api/v1/room/bulk_update/', [{'id': rooms[0].pk, 'room_price': 1}, {'id': foreign.pk, 'room_price': 1}],
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('id', response.data[1])
+        self.assertEqual(Room.objects.filter(room_price=1).count(), 1)
+
+
+# ---------- PRICING ----------
+class PricingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        city = City.objects.create(city_name='Bishkek', city_image='city_image/seed.jpg')
+        cls.hotel = Hotel.objects.create(
+            hotel_name='Hotel', city=city, hotel_star=3, description='d', street='s', owner=cls.user
+        )
+        cls.rooms = Room.objects.bulk_create(
+            Room(room_number=i, room_hotel=cls.hotel, room_price=100, room_description='x') for i in range(300)
+        )
+        cls.room = cls.rooms[0]
+        # 2030-07-01 — понедельник
+        RoomRate.objects.create(room=cls.room, date_from=date(2030, 7, 1), date_to=date(2030, 7, 31), price=150)
+        RoomRate.objects.create(
+            room=cls.room, date_from=date(2030, 1, 1), date_to=date(2030, 12, 31), price=200,
+            weekdays=0b1100000, priority=1
+        )
+        StayDiscount.objects.create(hotel=cls.hotel, min_nights=7, percent=10)
+
+    def setUp(self):
+        reference_cache().clear()
+        self.client.force_authenticate(self.user)
+
+    def test_season_weekend_and_length_of_stay(self):
+        quote = quote_rooms([self.room], date(2030, 6, 29), date(2030, 7, 6))[self.room.id]
+        # сб, вс (выходной тариф), пн—пт (сезон)
+        self.assertEqual(quote.nightly, [200, 200, 150, 150, 150, 150, 150])
+        self.assertEqual((quote.subtotal, quote.discount_percent, quote.total), (1150, 10, 1035))
+
+    def test_quote_endpoint_prices_many_rooms_in_constant_queries(self):
+        params = {'hotel': self.hotel.pk, 'check_in': '2030-07-01', 'check_out': '2030-07-03'}
+        # rooms + rates + скидки, независимо от числа номеров
+        with self.assertNumQueries(3):
+            response = self.client.get('/en/api/v1/room/quote/', params)
+        self.assertEqual(len(response.data), 300)
+        self.assertEqual(response['Cache-Control'], 'private, max-age=60')
+
+        with self.assertNumQueries(0):
+            self.client.get('/en/api/v1/room/quote/', params)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RoomRate.objects.create(room=self.rooms[1], date_from=date(2030, 7, 1), date_to=date(2030, 7, 1), price=1)
+        response = self.client.get('/en/api/v1/room/quote/', params)
+        self.assertEqual({row['id']: row['quote']['total'] for row in response.data}[self.rooms[1].id], 101)
+
+    def test_quotes_expire_after_pricing_timeout(self):
+        # изменение цены в другом воркере сюда не дойдёт — спасает только короткий TTL
+        params = {'hotel': self.hotel.pk, 'check_in': '2030-07-01', 'check_out': '2030-07-03'}
+        with override_settings(PRICING_CACHE_TIMEOUT=1):
+            self.client.get('/en/api/v1/room/quote/', params)
+            with self.assertNumQueries(0):
+                self.client.get('/en/api/v1/room/quote/', params)
+            with mock.patch('time.time', return_value=time.time() + 2):
+                with self.assertNumQueries(3):
+                    self.client.get('/en/api/v1/room/quote/', params)
+
+    def test_booking_total_is_computed_on_server(self):
+        response = self.client.post('/en/api/v1/booking/create/', {
+            'hotel': self.hotel.pk, 'room': self.room.pk, 'status_book': 'подтверждено',
+            'check_in': '2030-07-01T14:00:00+06:00', 'check_out': '2030-07-03T12:00:00+06:00', 'total_price': 1,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total_price'], 300)
+
+    def test_booking_user_is_the_requester(self):
+        other = UserProfile.objects.create_user('other', password='pass', user_role='client')
+        response = self.client.post('/en/api/v1/booking/create/', {
+            'user': other.pk, 'hotel': self.hotel.pk, 'room': self.room.pk, 'status_book': 'подтверждено',
+            'check_in': '2030-08-01T14:00:00+06:00', 'check_out': '2030-08-02T12:00:00+06:00',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['user'], self.user.pk)
+        self.assertEqual(Booking.objects.get(pk=response.data['id']).user, self.user)
+        self.assertFalse(Booking.objects.filter(user=other).exists())
+
+
+# ---------- HOTEL ANALYTICS ----------
+class HotelAnalyticsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.client_user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        city = City.objects.create(city_name='Bishkek', city_image='city_image/seed.jpg')
+        cls.hotel = Hotel.objects.create(
+            hotel_name='Hotel', city=city, hotel_star=3, description='d', street='s', owner=cls.owner
+        )
+        cls.lux, cls.family = Room.objects.bulk_create([
+            Room(room_number=1, room_hotel=cls.hotel, room_type='люкс', room_price=100, room_description='x'),
+            Room(room_number=2, room_hotel=cls.hotel, room_type='семейный', room_price=100, room_description='x'),
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(self.owner)
+
+    def book(self, room, day, nights, total_price, status_book='подтверждено'):
+        check_in = timezone.make_aware(datetime(2030, 7, day, 14))
+        return Booking.objects.create(
+            user=self.client_user, hotel=self.hotel, room=room, status_book=status_book, total_price=total_price,
+            check_in=check_in, check_out=check_in + timedelta(days=nights, hours=-2),
+        )
+
+    def stats(self):
+        return sorted(HotelDailyStats.objects.values_list(
+            'room_type', 'day', 'nights_sold', 'revenue', 'cancellations'
+        ))
+
+    def test_rollups_follow_booking_changes_and_match_rebuild(self):
+        booking = self.book(self.lux, 1, 3, 301)
+        self.assertEqual(self.stats(), [
+            ('люкс', date(2030, 7, 1), 1, 101, 0),
+            ('люкс', date(2030, 7, 2), 1, 100, 0),
+            ('люкс', date(2030, 7, 3), 1, 100, 0),
+        ])
+
+        self.book(self.family, 2, 1, 50)
+        booking.status_book = 'отменено'
+        booking.save()
+        self.book(self.lux, 2, 2, 200).delete()
+        incremental = [row for row in self.stats() if any(row[2:])]
+        self.assertEqual(incremental, [
+            ('люкс', date(2030, 7, 1), 0, 0, 1),
+            ('семейный', date(2030, 7, 2), 1, 50, 0),
+        ])
+
+        call_command('rebuild_hotel_stats', stdout=StringIO())
+        self.assertEqual(self.stats(), incremental)
+
+    def test_cascade_deletes_keep_foreign_keys_valid(self):
+        other_owner = UserProfile.objects.create_user('other', password='pass', user_role='owner')
+        other_hotel = Hotel.objects.create(
+            hotel_name='Other', city=City.objects.create(city_name='Osh', city_image='city_image/seed.jpg'),
+            hotel_star=3, description='d', street='s', owner=other_owner,
+        )
+        other_room = Room.objects.create(room_number=1, room_hotel=other_hotel, room_price=100, room_description='x')
+        Booking.objects.create(
+            user=self.client_user, hotel=other_hotel, room=other_room, status_book='подтверждено', total_price=100,
+            check_in=timezone.make_aware(datetime(2030, 7, 1, 14)), check_out=timezone.make_aware(datetime(2030, 7, 2, 12)),
+        )
+        self.book(self.lux, 1, 2, 200)
+
+        # город и владелец удаляют отели каскадом; upsert по удалённому отелю нарушил бы FK при коммите
+        other_hotel.city.delete()
+        connection.check_constraints()
+        self.owner.delete()
+        connection.check_constraints()
+        self.assertFalse(HotelDailyStats.objects.exists())
+
+    def test_room_type_change_moves_rollups(self):
+        self.book(self.lux, 1, 2, 200)
+        self.book(self.family, 3, 1, 70)
+        self.lux.room_type = 'двухместный'
+        self.lux.save()
+        response = self.client.patch(
+            '/en/api/v1/room/bulk_update/', [{'id': self.family.pk, 'room_type': 'люкс'}], format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        incremental = [row for row in self.stats() if any(row[2:])]
+        self.assertEqual(incremental, [
+            ('двухместный', date(2030, 7, 1), 1, 100, 0),
+            ('двухместный', date(2030, 7, 2), 1, 100, 0),
+            ('люкс', date(2030, 7, 3), 1, 70, 0),
+        ])
+        call_command('rebuild_hotel_stats', stdout=StringIO())
+        self.assertEqual(self.stats(), incremental)
+
+    def test_series_with_window_aggregates(self):
+        self.book(self.lux, 1, 2, 200)
+        self.book(self.family, 2, 1, 70)
+        self.book(self.family, 3, 1, 70, status_book='отменено')
+
+        # отель + номера + ряд
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/en/api/v1/hotel/{self.hotel.pk}/analytics/', {
+                'date_from': '2030-07-01', 'date_to': '2030-07-07',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totals'], {
+            'nights_sold': 3, 'revenue': 270, 'cancellations': 1, 'occupancy': round(3 / 7 / 2, 3),
+        })
+        series = response.data['series']
+        self.assertEqual(len(series), 7)
+        self.assertEqual([row['nights_sold'] for row in series[:3]], [1, 2, 0])
+        self.assertEqual([row['occupancy'] for row in series[:3]], [0.5, 1.0, 0.0])
+        self.assertEqual([row['revenue_cumulative'] for row in series[:3]], [100, 270, 270])
+        self.assertEqual(series[6]['revenue_7d'], round(270 / 7, 2))
+
+        response = self.client.get(f'/en/api/v1/hotel/{self.hotel.pk}/analytics/', {
+            'date_from': '2030-07-01', 'date_to': '2030-07-02', 'room_type': 'семейный',
+        })
+        self.assertEqual(response.data['rooms'], 1)
+        self.assertEqual([row['revenue'] for row in response.data['series']], [0, 70])
+
+    def test_only_hotel_owner(self):
+        params = {'date_from': '2030-07-01', 'date_to': '2030-07-07'}
+        other = UserProfile.objects.create_user('other', password='pass', user_role='owner')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'/en/api/v1/hotel/{self.hotel.pk}/analytics/', params).status_code, 404)
+        self.client.force_authenticate(self.client_user)
+        self.assertEqual(self.client.get(f'/en/api/v1/hotel/{self.hotel.pk}/analytics/', params).status_code, 403)
+
+
+# ---------- HOTEL SEARCH ----------
+class HotelSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create_user('client', password='pass')
+        cls.city = City.objects.create(city_name_ru='Бишкек', city_name_en='Bishkek', city_image='city_image/seed.jpg')
+        cls.mountain = Hotel.objects.create(
+            hotel_name_ru='Горный отель', hotel_name_en='Mountain Lodge', city=cls.city, hotel_star=4,
+            description_ru='Вид на горы', description_en='Mountain views', street_ru='Чуй', street_en='Chui',
+            owner=cls.user
+        )
+        cls.lake = Hotel.objects.create(
+            hotel_name_ru='Озеро', hotel_name_en='Lake Resort', city=cls.city, hotel_star=5,
+            description_ru='Берег', description_en='Beach and mountains nearby', street_ru='Ленина', street_en='Lenina',
+            owner=cls.user
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def search(self, q, **params):
+        response = self.client.get('/en/api/v1/hotel/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_name_match_ranks_above_description_match(self):
+        self.assertEqual(self.search('mountain', limit=10), [self.mountain.pk, self.lake.pk])
+
+    def test_both_languages_and_city_are_searchable(self):
+        self.assertEqual(self.search('горы'), [self.mountain.pk])
+        self.assertEqual(len(self.search('Бишкек', limit=10)), 2)
+        self.assertEqual(len(self.search('Bishkek', limit=10)), 2)
+
+    def test_city_rename_updates_vector(self):
+        self.city.city_name_en = 'Frunze'
+        self.city.save()
+        self.assertEqual(len(self.search('Frunze', limit=10)), 2)
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get('/en/api/v1/hotel/search/').status_code, 400)
+
+
+# ---------- REFERENCE CACHE ----------
+class ReferenceCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create_user('owner', password='pass', user_role='owner')
+        cls.city = City.objects.create(city_name='Bishkek', city_image='city_image/seed.jpg')
+
+    def setUp(self):
+        reference_cache().clear()
+        self.client.force_authenticate(self.user)
+
+    def test_second_request_is_served_from_cache(self):
+        self.client.get('/en/api/v1/city/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/en/api/v1/city/')
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(cache_stats()['city'], {'hits': 1, 'misses': 1})
+
+        metrics = self.client.get('/metrics').content.decode()
+        self.assertIn('booking_reference_cache_hits_total{namespace="city"} 1', metrics)
+        self.assertIn('booking_reference_cache_misses_total{namespace="pricing"} 0', metrics)
+
+    def test_deploy_check_warns_about_process_local_cache(self):
+        self.assertIn('booking_app.W001', [message.id for message in run_checks(include_deployment_checks=True)])
+        shared = {**settings.CACHES, 'reference': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        with override_settings(CACHES=shared):
+            self.assertNotIn('booking_app.W001', [message.id for message in run_checks(include_deployment_checks=True)])
+
+    def test_language_and_params_are_part_of_the_key(self):
+        self.client.get('/en/api/v1/city/')
+        self.client.get('/ru/api/v1/city/')
+        self.client.get('/en/api/v1/city/', {'limit': 1})
+        self.assertEqual(cache_stats()['city'], {'hits': 0, 'misses': 3})
+
+    def test_save_invalidates(self):
+        self.client.get(f'/en/api/v1/city/{self.city.pk}/')
+        self.city.city_name = 'Osh'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.city.save()
+            # до коммита версия прежняя — в кэш не попадут незакоммиченные данные
+            self.assertNotEqual(self.client.get(f'/en/api/v1/city/{self.city.pk}/').data['city_name'], 'Osh')
+        response = self.client.get(f'/en/api/v1/city/{self.city.pk}/')
+        self.assertEqual(response.data['city_name'], 'Osh')
+
+    def test_permissions_are_checked_before_cache(self):
+        self.client.get('/en/api/v1/country/')
+        client_user = UserProfile.objects.create_user('client', password='pass')
+        self.client.force_authenticate(client_user)
+        self.assertEqual(self.client.get('/en/api/v1/country/').status_code, 403)
+
+
+# ---------- IMAGE VARIANTS ----------
+class ImageVariantTests(TransactionTestCase):
+    # фоновый поток отмечает variants_ready своим соединением — строки должны быть закоммичены
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload(self, name, size=(2000, 1000)):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'JPEG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def create_city(self, name, city_name='Bishkek'):
+        city = City.objects.create(city_name=city_name, city_image=self.upload(name))
+        wait_for_variants()
+        city.refresh_from_db()
+        return city
+
+    def test_variants_are_created_on_upload(self):
+        city = self.create_city('bishkek.jpg')
+        self.assertTrue(city.variants_ready)
+
+        with default_storage.open(variant_name(city.city_image.name, 'thumb', '.webp')) as thumb:
+            self.assertEqual(Image.open(thumb).size, (160, 80))
+        with default_storage.open(variant_name(city.city_image.name, 'large')) as large:
+            self.assertEqual(Image.open(large).format, 'JPEG')
+
+        variants = CityDetailSerializer(city).data['city_image_variants']
+        self.assertEqual(set(variants), {'thumb', 'medium', 'large'})
+        self.assertTrue(variants['medium']['webp'].endswith('bishkek_medium.webp'))
+
+    def test_original_is_served_until_variants_exist(self):
+        # генерация ставится в пул только после коммита
+        with transaction.atomic():
+            city = City.objects.create(city_name='Bishkek', city_image=self.upload('osh.jpg'))
+            self.assertFalse(default_storage.exists(variant_name(city.city_image.name, 'thumb')))
+            variants = CityDetailSerializer(city).data['city_image_variants']
+        self.assertEqual(variants['thumb'], {'src': city.city_image.url, 'webp': None})
+        wait_for_variants()
+
+    def test_serializing_does_not_touch_storage(self):
+        ready = self.create_city('bishkek.jpg')
+        pending = City.objects.create(city_name='Osh', city_image=ready.city_image.name.replace('bishkek', 'osh'))
+        with mock.patch.object(FileSystemStorage, 'exists', side_effect=AssertionError('storage probed')):
+            self.assertTrue(CityDetailSerializer(ready).data['city_image_variants']['thumb']['webp'])
+            self.assertIsNone(CityDetailSerializer(pending).data['city_image_variants']['thumb']['webp'])
+        wait_for_variants()
+
+    def test_replaced_image_waits_for_its_own_variants(self):
+        city = self.create_city('bishkek.jpg')
+        city.city_image = self.upload('new.jpg')
+        with mock.patch('booking_app.signals.schedule_variants') as schedule:
+            city.save()
+        self.assertFalse(city.variants_ready)
+        self.assertFalse(City.objects.get(pk=city.pk).variants_ready)
+        schedule.assert_called_once_with(City, 'city_image', city.city_image.name)
+        build_variants(*schedule.call_args.args)
+        self.assertTrue(City.objects.get(pk=city.pk).variants_ready)
+
+    def test_variants_are_removed_with_the_image(self):
+        city = self.create_city('bishkek.jpg')
+        old_name = city.city_image.name
+        twin = City.objects.create(city_name='Twin', city_image=old_name)
+
+        city.city_image = self.upload('new.jpg')
+        city.save()
+        wait_for_variants()
+        # старый файл ещё у twin — его варианты остаются
+        self.assertTrue(default_storage.exists(variant_name(old_name, 'large', '.webp')))
+        self.assertTrue(default_storage.exists(variant_name(city.city_image.name, 'large', '.webp')))
+        self.assertTrue(City.objects.get(pk=twin.pk).variants_ready)
+
+        twin.delete()
+        city.delete()
+        for name in (old_name, city.city_image.name):
+            self.assertFalse(any(default_storage.exists(variant_name(name, v)) for v in ('thumb', 'medium', 'large')))
+            self.assertFalse(default_storage.exists(variant_name(name, 'large', '.webp')))
+
+    def test_backfill_command_marks_existing_images(self):
+        city = self.create_city('bishkek.jpg')
+        City.objects.filter(pk=city.pk).update(variants_ready=False)
+        call_command('generate_image_variants', stdout=StringIO())
+        self.assertTrue(City.objects.get(pk=city.pk).variants_ready)
+
+
+# ---------- SEED + BENCHMARK ----------
+class BenchmarkCommandTests(APITestCase):
+    def test_seed_and_benchmark_every_route(self):
+        call_command(
+            'seed_demo_data', countries=2, cities=2, owners=2, clients=3, hotels=4,
+            rooms_per_hotel=2, reviews_per_hotel=3, bookings_per_room=2, favorites_per_client=2,
+            stdout=StringIO()
+        )
+        self.assertEqual(Hotel.objects.count(), 4)
+        self.assertEqual(Hotel.objects.filter(review_count=3).count(), 4)
+        # брони вставлены bulk_create — суточная статистика собрана отдельно
+        self.assertTrue(HotelDailyStats.objects.exists())
+        self.assertEqual(set(HotelDailyStats.objects.values_list('hotel', flat=True)),
+                         set(Booking.objects.values_list('hotel', flat=True)))
+
+        output = os.path.join(tempfile.mkdtemp(), 'bench.json')
+        call_command('benchmark_api', iterations=1, warmup=0, output=output, stdout=StringIO())
+        with open(output) as f:
+            results = json.load(f)['results']
+        shutil.rmtree(os.path.dirname(output))
+
+        routes = {p.name for p in urlpatterns if isinstance(p, URLPattern)} | {'country-list', 'country-detail'}
+        self.assertEqual(set(results), routes)
+        self.assertEqual(results['hotel_list']['status'], [200])
+        self.assertEqual(results['hotel_list']['queries'], 3)
+
+    def test_index_advisor_explains_every_combination(self):
+        call_command('seed_demo_data', hotels=3, rooms_per_hotel=2, clients=2, owners=1, stdout=StringIO())
+        out = StringIO()
+        call_command('index_advisor', stdout=out)
+        # 7 комбинаций HotelFilter + 15 RoomFilter + 4 выборки по датам
+        self.assertIn('из 26', out.getvalue())
+
+    def test_index_advisor_on_empty_database(self):
+        with self.assertRaisesMessage(CommandError, 'Hotel, Room, Booking'):
+            call_command('index_advisor', stdout=StringIO())
+
+    def test_async_benchmark_compares_sync_and_async_views(self):
+        call_command('seed_demo_data', hotels=3, rooms_per_hotel=2, clients=2, owners=1, stdout=StringIO())
+        output = os.path.join(tempfile.mkdtemp(), 'async.json')
+        # wsgi-режим ходит в БД из других потоков и не видит транзакцию теста
+        call_command(
+            'benchmark_async', requests=4, concurrency=[2], modes=['asgi-sync', 'asgi-async'],
+            output=output, stdout=StringIO()
+        )
+        with open(output) as f:
+            results = json.load(f)['results']
+        shutil.rmtree(os.path.dirname(output))
+
+        self.assertEqual(set(results), {'city_list', 'hotel_list', 'hotel_detail', 'booking_list'})
+        for rows in results.values():
+            self.assertEqual([(row['mode'], row['status']) for row in rows], [('asgi-sync', [200]), ('asgi-async', [200])])
+
+
+# ---------- ROOM AVAILABILITY ----------
+class RoomAvailabilityTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        city = City.objects.create(city_name='Bishkek', city_image='city_image/seed.jpg')
+        cls.hotel = Hotel.objects.create(
+            hotel_name='Hotel', city=city, hotel_star=3, description='d', street='s', owner=cls.user
+        )
+        cls.lux, cls.family, cls.single = Room.objects.bulk_create(
+            Room(room_number=i, room_hotel=cls.hotel, room_type=room_type, room_price=100, room_description='x')
+            for i, room_type in enumerate(('люкс', 'семейный', 'одноместный'))
+        )
+        cls.check_in = timezone.make_aware(datetime(2030, 7, 1, 14))
+        cls.check_out = timezone.make_aware(datetime(2030, 7, 3, 12))
+        for room, status_book in ((cls.lux, 'подтверждено'), (cls.family, 'отменено')):
+            Booking.objects.create(
+                user=cls.user, hotel=cls.hotel, room=room, status_book=status_book,
+                check_in=cls.check_in, check_out=cls.check_out
+            )
+
+    def setUp(self):
+        reference_cache().clear()
+        self.client.force_authenticate(self.user)
+
+    def available(self, check_in, check_out):
+        return set(Room.objects.available(check_in, check_out).values_list('id', flat=True))
+
+    def test_touching_periods_do_not_conflict(self):
+        # выезд в момент заезда следующего гостя — номер свободен с обеих сторон
+        self.assertIn(self.lux.pk, self.available(self.check_out, self.check_out + timedelta(days=2)))
+        self.assertIn(self.lux.pk, self.available(self.check_in - timedelta(days=2), self.check_in))
+        second = timedelta(seconds=1)
+        self.assertNotIn(self.lux.pk, self.available(self.check_out - second, self.check_out + timedelta(days=2)))
+        self.assertNotIn(self.lux.pk, self.available(self.check_in - timedelta(days=2), self.check_in + second))
+
+    def test_cancelled_bookings_do_not_block(self):
+        self.assertEqual(self.available(self.check_in, self.check_out), {self.family.pk, self.single.pk})
+
+    def test_endpoint_filters_by_guests(self):
+        params = {'check_in': self.check_in.isoformat(), 'check_out': self.check_out.isoformat(), 'limit': 10}
+
+        def ids(**extra):
+            response = self.client.get('/en/api/v1/room/available/', {**params, **extra})
+            self.assertEqual(response.status_code, 200)
+            return {row['id'] for row in response.data['results']}
+
+        self.assertEqual(ids(), {self.family.pk, self.single.pk})
+        self.assertEqual(ids(guests=1), {self.family.pk, self.single.pk})
+        self.assertEqual(ids(guests=3), {self.family.pk})
+        self.assertEqual(ids(guests=5), set())
+        # вплотную к брони люкс свободен, вместимость 2
+        self.assertEqual(ids(guests=2, check_in=self.check_out.isoformat(), check_out='2030-07-05'),
+                         {self.lux.pk, self.family.pk})
+
+        response = self.client.get('/en/api/v1/room/available/', {**params, 'check_out': params['check_in']})
+        self.assertEqual(response.status_code, 400)
+
+
+# ---------- BOOKING CONCURRENCY ----------
+@without_throttling()
+class BookingConcurrencyTests(TransactionTestCase):
+    """Сотни параллельных бронирований на несколько номеров не дают пересечений."""
+
+    workers = 16
+    attempts = 300
+
+    def setUp(self):
+        self.user = UserProfile.objects.create_user('client', password='pass', user_role='client')
+        city = City.objects.create(city_name='Bishkek', city_image='city_image/seed.jpg')
+        self.hotel = Hotel.objects.create(
+            hotel_name='Hotel', city=city, hotel_star=3,
+            description='description', street='street', owner=self.user
+        )
+        self.rooms = [
+            Room.objects.create(room_number=i, room_hotel=self.hotel, room_price=100, room_description='room')
+            for i in range(3)
+        ]
+
+    def book(self, payload):
+        try:
+            client = APIClient()
+            client.force_authenticate(self.user)
+            return client.post('/en/api/v1/booking/create/', payload, format='json').status_code
+        finally:
+            connections.close_all()
+
+    def test_parallel_bookings_never_overlap(self):
+        rnd = random.Random(42)
+        start = timezone.now().replace(hour=14, minute=0, second=0, microsecond=0)
+        payloads = []
+        for _ in range(self.attempts):
+            check_in = start + timedelta(days=rnd.randrange(30))
+            payloads.append({
+                'hotel': self.hotel.pk,
+                'room': rnd.choice(self.rooms).pk,
+                'check_in': check_in.isoformat(),
+                'check_out': (check_in + timedelta(days=rnd.randint(1, 4))).isoformat(),
+                'status_book': 'подтверждено',
+            })
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(self.workers) as pool:
+            statuses = list(pool.map(self.book, payloads))
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(set(statuses) - {201, 400}, set())
+        self.assertEqual(statuses.count(201), Booking.objects.count())
+        self.assertIn(400, statuses)
+
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT count(*) FROM booking_app_booking a
+                JOIN booking_app_booking b ON a.room_id = b.room_id AND a.id < b.id
+                WHERE tstzrange(a.check_in, a.check_out) && tstzrange(b.check_in, b.check_out)
+            """)
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+        # ограничение по номеру не сериализует все брони глобально
+        self.assertGreater(self.attempts / elapsed, 20)
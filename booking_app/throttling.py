@@ -0,0 +1,110 @@
+import threading
+import time
+
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+THROTTLE_CACHE = 'throttle'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60): ёмкость корзины и период, за который она наполняется целиком."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class LocalStore:
+    """Запасное хранилище процесса, если общий кэш недоступен: add/incr/decr, как у кэша Django."""
+
+    def __init__(self):
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        value, expires = self.values.get(key, (None, 0))
+        return value if expires > time.time() else None
+
+    def add(self, key, value, timeout):
+        with self.lock:
+            now = time.time()
+            if self.values.get(key, (None, 0))[1] > now:
+                return False
+            self.values[key] = (value, now + timeout)
+            if len(self.values) > 10000:
+                self.values = {k: v for k, v in self.values.items() if v[1] > now}
+            return True
+
+    def incr(self, key, delta=1):
+        with self.lock:
+            value, expires = self.values[key]
+            self.values[key] = (value + delta, expires)
+            return value + delta
+
+    def decr(self, key, delta=1):
+        return self.incr(key, -delta)
+
+
+local_store = LocalStore()
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Ограничение по view.throttle_scope на пользователя (или IP для анонимов), скользящее окно.
+
+    Ставка из REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'][scope]: '10/min' — не больше 10 запросов за
+    любую минуту; запросы прошлого окна учитываются с весом оставшейся доли окна, поэтому лимит
+    восстанавливается постепенно, как у token bucket. Счётчик окна меняется только атомарным
+    add/incr общего кэша: параллельные запросы из разных воркеров не пропускают лишних.
+    Проверка идёт в APIView.initial до обработчика — до хеширования пароля и запросов к БД.
+    """
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if not rate:
+            return True
+
+        capacity, period = parse_rate(rate)
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        key = f'throttle:{scope}:{ident}'
+
+        try:
+            return self.check(caches[THROTTLE_CACHE], key, capacity, period)
+        except Exception:
+            return self.check(local_store, key, capacity, period)
+
+    def check(self, store, key, capacity, period):
+        now = time.time()
+        window, elapsed = divmod(now, period)
+        current = f'{key}:{int(window)}'
+        previous = store.get(f'{key}:{int(window) - 1}') or 0
+        # прошлое окно нужно ещё один период
+        store.add(current, 0, 2 * period)
+        try:
+            count = store.incr(current)
+        except ValueError:
+            # ключ вытеснился между add и incr
+            store.add(current, 1, 2 * period)
+            count = 1
+        if previous * (period - elapsed) / period + count <= capacity:
+            return True
+
+        # отказ не занимает место в окне
+        count = store.decr(current)
+        self.retry_after = self.retry_in(capacity, period, previous, count, elapsed)
+        return False
+
+    @staticmethod
+    def retry_in(capacity, period, previous, count, elapsed):
+        # когда вес прошлого окна упадёт настолько, что поместится ещё один запрос
+        if count < capacity and previous:
+            return max(period * (1 - (capacity - count - 1) / previous) - elapsed, 1)
+        # в текущем окне места нет: ждём следующего, где текущее станет прошлым
+        return period - elapsed + max(period * (1 - (capacity - 1) / count), 0)
+
+    def wait(self):
+        return getattr(self, 'retry_after', None)
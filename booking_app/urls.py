@@ -1,16 +1,28 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework import routers
 from .views import (
-    RegisterView, CustomLoginView, LogoutView, UserProfileMeView,
+    RegisterView, CustomLoginView, LogoutView, UserProfileMeView, CountryView,
     CityListView, CityDetailAPIView,
-    HotelListView, HotelDetailAPIView, HotelCreateAPIView, HotelUpdateAPIView,
-    RoomCreateAPIView, ReviewCreateAPIView,
-    BookingListView, BookingDetailAPIView, BookingUpdateAPIView, BookingDeleteAPIView,
+    HotelListView, HotelSearchView, HotelNearbyView, HotelDetailAPIView, HotelCreateAPIView, HotelUpdateAPIView,
+    HotelAnalyticsView,
+    RoomCreateAPIView, RoomBulkUpdateAPIView, RoomQuoteView, RoomAvailabilityListView, ReviewCreateAPIView,
+    BookingListView, BookingCreateAPIView, BookingDetailAPIView, BookingUpdateAPIView, BookingDeleteAPIView,
     FavoriteListView, FavoriteCreateAPIView, FavoriteUpdateAPIView, FavoriteDeleteView,
-    FavoriteItemListView, FavoriteItemCreateAPIView, FavoriteItemUpdateAPIView, FavoriteItemDeleteAPIView
+    FavoriteItemListView, FavoriteItemCreateAPIView, FavoriteItemUpdateAPIView, FavoriteItemDeleteAPIView,
+    BookingExportView, ReviewExportView, FavoriteHotelsView, ASYNC_READ_VIEWS
 )
 
+
+def read_view(view_class):
+    # ASYNC_READ_VIEWS=1 (ASGI-воркер, см. Procfile) — async-версии read-эндпоинтов
+    if settings.ASYNC_READ_VIEWS:
+        view_class = ASYNC_READ_VIEWS.get(view_class, view_class)
+    return view_class.as_view()
+
+
 router = routers.SimpleRouter()
+router.register('country', CountryView)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -20,19 +32,28 @@ urlpatterns = [
     path('auth/logout/', LogoutView.as_view(), name='logout'),
     path('auth/user/', UserProfileMeView.as_view(), name='user_profile'),
 
-    path('city/', CityListView.as_view(), name='city_list'),
+    path('city/', read_view(CityListView), name='city_list'),
     path('city/<int:pk>/', CityDetailAPIView.as_view(), name='city_detail'),
 
-    path('hotel/', HotelListView.as_view(), name='hotel_list'),
-    path('hotel/<int:pk>/', HotelDetailAPIView.as_view(), name='hotel_detail'),
+    path('hotel/', read_view(HotelListView), name='hotel_list'),
+    path('hotel/search/', HotelSearchView.as_view(), name='hotel_search'),
+    path('hotel/nearby/', HotelNearbyView.as_view(), name='hotel_nearby'),
+    path('hotel/<int:pk>/', read_view(HotelDetailAPIView), name='hotel_detail'),
     path('hotel/create/', HotelCreateAPIView.as_view(), name='hotel_create'),
     path('hotel/update/<int:pk>/', HotelUpdateAPIView.as_view(), name='hotel_update'),
+    path('hotel/<int:pk>/analytics/', HotelAnalyticsView.as_view(), name='hotel_analytics'),
 
     path('room/', RoomCreateAPIView.as_view(), name='room_create'),
+    path('room/bulk_update/', RoomBulkUpdateAPIView.as_view(), name='room_bulk_update'),
+    path('room/quote/', RoomQuoteView.as_view(), name='room_quote'),
+    path('room/available/', RoomAvailabilityListView.as_view(), name='room_available'),
 
     path('review/', ReviewCreateAPIView.as_view(), name='review_create'),
+    path('review/export/', ReviewExportView.as_view(), name='review_export'),
 
-    path('booking/', BookingListView.as_view(), name='booking_list'),
+    path('booking/', read_view(BookingListView), name='booking_list'),
+    path('booking/create/', BookingCreateAPIView.as_view(), name='booking_create'),
+    path('booking/export/', BookingExportView.as_view(), name='booking_export'),
     path('booking/<int:pk>/', BookingDetailAPIView.as_view(), name='booking_detail'),
     path('booking/update/<int:pk>/', BookingUpdateAPIView.as_view(), name='booking_update'),
     path('booking/delete/<int:pk>/', BookingDeleteAPIView.as_view(), name='booking_delete'),
@@ -42,6 +63,8 @@ urlpatterns = [
     path('favorite/update/<int:pk>/', FavoriteUpdateAPIView.as_view(), name='favorite_update'),
     path('favorite/delete/<int:pk>/', FavoriteDeleteView.as_view(), name='favorite_delete'),
 
+    path('favorite/hotels/', FavoriteHotelsView.as_view(), name='favorite_hotels'),
+
     path('favorite_item/', FavoriteItemListView.as_view(), name='favorite_item_list'),
     path('favorite_item/create/', FavoriteItemCreateAPIView.as_view(), name='favorite_item_create'),
     path('favorite_item/update/<int:pk>/', FavoriteItemUpdateAPIView.as_view(), name='favorite_item_update'),
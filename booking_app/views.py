@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from django.urls import path, include
 from rest_framework import generics, viewsets, status, permissions
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -17,16 +24,34 @@ from .serializers import (
     HotelHTTPSerializer, CityListSerializer, CityDetailSerializer, RoomCreateSerializer,
     ReviewSerializer, BookingListSerializer, BookingHTTPSerializer,
     FavoriteListSerializer, FavoriteHTTPSerializer, FavoriteItemListSerializer,
-    FavoriteItemHTTPSerializer, UserSerializer, LoginSerializer
+    FavoriteItemHTTPSerializer, UserSerializer, LoginSerializer,
+    RoomListSerializer, RoomAvailabilitySerializer, HotelSearchSerializer, RoomBulkUpdateSerializer,
+    RoomQuoteParamsSerializer, RoomQuoteSerializer, HotelAnalyticsParamsSerializer, ExportParamsSerializer,
+    HotelNearbySerializer, HotelNearbyParamsSerializer, FavoriteToggleSerializer,
+    BOOKING_OVERLAP_ERROR
 )
 from .permissions import CheckStatus, ReviewPermissions, CheckOwner
-from .filters import HotelFilter, RoomFilter
+from .async_views import AsyncListModelMixin, AsyncRetrieveModelMixin
+from .cache import CachedReferenceMixin
+from .conditional import ConditionalGetMixin
+from .fieldsets import FieldsetMixin
+from .languages import ActiveLanguageMixin
+from .favorites import FavoriteHotelsMixin, favorite_hotel_ids, toggle_favorites
+from .facets import FacetsMixin, HOTEL_FACETS, ROOM_FACETS
+from .exports import EXPORT_FORMATS, aiter_sync, export_stream
+from .pagination import OptionalCursorPagination
+from .pricing import quote_rooms
+from .rollups import hotel_series
+from .throttling import SlidingWindowThrottle
+from .filters import HotelFilter, RoomFilter, RoomAvailabilityFilter
 
 
 # ---------- AUTH ----------
 class RegisterView(generics.CreateAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'register'
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -38,6 +63,8 @@ class RegisterView(generics.CreateAPIView):
 class CustomLoginView(generics.GenericAPIView):
     serializer_class = LoginSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'login'
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -66,7 +93,9 @@ class UserProfileMeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        serializer = UserProfileSerializer(request.user)
+        # request.user собран из claims токена — профиль целиком читаем одним запросом
+        user = UserProfile.objects.select_related('country').get(pk=request.user.pk)
+        serializer = UserProfileSerializer(user)
         return Response(serializer.data)
 
 
@@ -78,36 +107,100 @@ class UserProfileViewSets(viewsets.ModelViewSet):
 
 
 # ---------- COUNTRY ----------
-class CountryView(viewsets.ModelViewSet):
+class CountryView(CachedReferenceMixin, viewsets.ModelViewSet):
     queryset = Country.objects.all()
     serializer_class = CountrySerializer
     permission_classes = [permissions.IsAuthenticated, CheckStatus]
+    cache_namespace = 'country'
 
 
 # ---------- CITY ----------
-class CityListView(generics.ListAPIView):
+class CityListView(ActiveLanguageMixin, CachedReferenceMixin, generics.ListAPIView):
     queryset = City.objects.all()
     serializer_class = CityListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_namespace = 'city'
 
 
-class CityDetailAPIView(generics.RetrieveAPIView):
+class CityDetailAPIView(ActiveLanguageMixin, CachedReferenceMixin, generics.RetrieveAPIView):
     queryset = City.objects.all()
     serializer_class = CityDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_namespace = 'city'
 
 
 # ---------- HOTEL ----------
-class HotelListView(generics.ListAPIView):
+HOTEL_LIST_SELECT = {'city': 'city'}
+HOTEL_LIST_PREFETCH = {'hotel_images': 'hotel_images'}
+
+
+class HotelListView(
+    ActiveLanguageMixin, FieldsetMixin, FavoriteHotelsMixin, FacetsMixin, ConditionalGetMixin, generics.ListAPIView
+):
     queryset = Hotel.objects.all()
+    facets = HOTEL_FACETS
+    facet_namespace = 'hotel_facets'
+    select_relations = HOTEL_LIST_SELECT
+    prefetch_relations = HOTEL_LIST_PREFETCH
+    serializer_class = HotelListSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = HotelFilter
+    pagination_class = OptionalCursorPagination
+    cursor_orderings = {
+        'id': ('-id',),
+        'rating': ('-avg_rating', '-id'),
+    }
+
+    def get_facet_queryset(self):
+        # без select_related/prefetch и is_favorite: нужны только колонки фильтров
+        return Hotel.objects.all()
+
+
+class HotelSearchView(
+    ActiveLanguageMixin, FieldsetMixin, FavoriteHotelsMixin, ConditionalGetMixin, generics.ListAPIView
+):
+    select_relations = HOTEL_LIST_SELECT
+    prefetch_relations = HOTEL_LIST_PREFETCH
     serializer_class = HotelListSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_class = HotelFilter
 
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Hotel.objects.none()
+
+        params = HotelSearchSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return self.with_favorites(self.with_relations(Hotel.objects.search(params.validated_data['q'])))
+
+
+class HotelNearbyView(ActiveLanguageMixin, FieldsetMixin, FavoriteHotelsMixin, generics.ListAPIView):
+    # ?lat=&lon=&radius=(км)&limit= — ближайшие отели по возрастанию расстояния
+    select_relations = HOTEL_LIST_SELECT
+    prefetch_relations = HOTEL_LIST_PREFETCH
+    serializer_class = HotelNearbySerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Hotel.objects.none()
+
+        params = HotelNearbyParamsSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        queryset = Hotel.objects.nearby(data['lat'], data['lon'], data['radius'])
+        return self.with_favorites(self.with_relations(queryset))[:data['limit']]
+
 
-class HotelDetailAPIView(generics.RetrieveAPIView):
+class HotelDetailAPIView(
+    ActiveLanguageMixin, FieldsetMixin, FavoriteHotelsMixin, ConditionalGetMixin, generics.RetrieveAPIView
+):
     queryset = Hotel.objects.all()
+    select_relations = {'city': 'city', 'country': 'country', 'owner': 'owner', 'owner.country': 'owner__country'}
+    prefetch_relations = HOTEL_LIST_PREFETCH
     serializer_class = HotelDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -124,7 +217,59 @@ class HotelUpdateAPIView(generics.UpdateAPIView):
     permission_classes = [permissions.IsAuthenticated, CheckStatus]
 
 
+class HotelAnalyticsView(APIView):
+    # загрузка и выручка отеля владельца по суточной статистике (HotelDailyStats), без чтения броней
+    permission_classes = [permissions.IsAuthenticated, CheckStatus]
+
+    def get(self, request, pk):
+        hotel = generics.get_object_or_404(Hotel.objects.only('id', 'owner_id'), pk=pk, owner=request.user)
+        params = HotelAnalyticsParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        date_from, date_to = params.validated_data['date_from'], params.validated_data['date_to']
+        room_type = params.validated_data.get('room_type')
+
+        rooms = Room.objects.filter(room_hotel=hotel)
+        if room_type:
+            rooms = rooms.filter(room_type=room_type)
+        rooms = rooms.count()
+
+        def occupancy(nights):
+            return round(float(nights) / rooms, 3) if rooms else None
+
+        series = [
+            {
+                'day': row['day'],
+                'nights_sold': row['nights_sold'],
+                'revenue': row['revenue'],
+                'cancellations': row['cancellations'],
+                'occupancy': occupancy(row['nights_sold']),
+                'occupancy_7d': occupancy(row['nights_moving_avg']),
+                'revenue_7d': round(float(row['revenue_moving_avg']), 2),
+                'revenue_cumulative': row['revenue_cumulative'],
+            }
+            for row in hotel_series(hotel.id, date_from, date_to, room_type)
+        ]
+        nights_sold = sum(row['nights_sold'] for row in series)
+        return Response({
+            'hotel': hotel.id,
+            'room_type': room_type,
+            'date_from': date_from,
+            'date_to': date_to,
+            'rooms': rooms,
+            'totals': {
+                'nights_sold': nights_sold,
+                'revenue': sum(row['revenue'] for row in series),
+                'cancellations': sum(row['cancellations'] for row in series),
+                'occupancy': occupancy(nights_sold / len(series)),
+            },
+            'series': series,
+        })
+
+
 # ---------- ROOM ----------
+ROOM_BULK_LIMIT = 1000
+
+
 class RoomCreateAPIView(generics.CreateAPIView):
     queryset = Room.objects.all()
     serializer_class = RoomCreateSerializer
@@ -132,28 +277,182 @@ class RoomCreateAPIView(generics.CreateAPIView):
     filter_backends = [DjangoFilterBackend]
     filterset_class = RoomFilter
 
+    def get_serializer(self, *args, **kwargs):
+        # список номеров создаётся одним bulk_create; ошибки возвращаются по индексам элементов
+        if isinstance(kwargs.get('data'), list):
+            kwargs.update(many=True, allow_empty=False, max_length=ROOM_BULK_LIMIT)
+        return super().get_serializer(*args, **kwargs)
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+
+class RoomBulkUpdateAPIView(generics.GenericAPIView):
+    serializer_class = RoomBulkUpdateSerializer
+    permission_classes = [permissions.IsAuthenticated, CheckStatus]
+
+    def patch(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True, allow_empty=False, max_length=ROOM_BULK_LIMIT)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data)
+
+
+class RoomQuoteView(CachedReferenceMixin, generics.ListAPIView):
+    serializer_class = RoomQuoteSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+    cache_namespace = 'pricing'
+
+    def get_cache_timeout(self):
+        # сигналы сбрасывают версию только в своём процессе — TTL ограничивает устаревшую цену в остальных
+        return settings.PRICING_CACHE_TIMEOUT
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Room.objects.none()
+
+        params = RoomQuoteParamsSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        self.stay = params.validated_data
+
+        rooms = Room.objects.only('id', 'room_number', 'room_hotel_id', 'room_type', 'room_price')
+        if self.stay.get('room'):
+            rooms = rooms.filter(pk__in=self.stay['room'])
+        if self.stay.get('hotel'):
+            rooms = rooms.filter(room_hotel=self.stay['hotel'])
+        return rooms.order_by('room_price', 'id')[:500]
+
+    def filter_queryset(self, queryset):
+        rooms = list(super().filter_queryset(queryset))
+        self.quotes = quote_rooms(rooms, self.stay['check_in'], self.stay['check_out']) if rooms else {}
+        return rooms
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'quotes': getattr(self, 'quotes', {})}
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if response.status_code == 200:
+            response['Cache-Control'] = 'private, max-age=60'
+        return response
+
+
+class RoomAvailabilityListView(ActiveLanguageMixin, FacetsMixin, generics.ListAPIView):
+    serializer_class = RoomListSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = RoomAvailabilityFilter
+    facets = ROOM_FACETS
+    facet_namespace = 'room_facets'
+
+    def get_dates(self):
+        if not hasattr(self, '_dates'):
+            dates = RoomAvailabilitySerializer(data=self.request.query_params)
+            dates.is_valid(raise_exception=True)
+            self._dates = dates.validated_data
+        return self._dates
+
+    def get_facet_queryset(self):
+        dates = self.get_dates()
+        return Room.objects.available(dates['check_in'], dates['check_out'])
+
+    def facet_key_extra(self):
+        return [value.isoformat() for value in self.get_dates().values()]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Room.objects.none()
+
+        return (
+            self.get_facet_queryset()
+            .select_related('room_hotel__city')
+            .prefetch_related('room_hotel__hotel_images')
+            .order_by('room_price', 'id')
+        )
+
 
 # ---------- REVIEW ----------
 class ReviewCreateAPIView(generics.CreateAPIView):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated, ReviewPermissions]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'review'
+
+    def perform_create(self, serializer):
+        # отзыв и агрегаты рейтинга отеля сохраняются в одной транзакции
+        with transaction.atomic():
+            serializer.save()
 
 
 # ---------- BOOKING ----------
-class BookingListView(generics.ListAPIView):
+BOOKING_SELECT = {
+    'user': 'user', 'user.country': 'user__country',
+    'hotel': 'hotel', 'hotel.city': 'hotel__city',
+    'room': 'room', 'room.room_hotel': 'room__room_hotel', 'room.room_hotel.city': 'room__room_hotel__city',
+}
+BOOKING_PREFETCH = {
+    'hotel.hotel_images': 'hotel__hotel_images',
+    'room.room_hotel.hotel_images': 'room__room_hotel__hotel_images',
+}
+# вложенные отель и номер входят в ответ — их updated_at тоже часть ETag
+BOOKING_ETAG_FIELDS = ('updated_at', 'hotel.updated_at', 'room.updated_at', 'room.room_hotel.updated_at')
+
+
+class BookingListView(ActiveLanguageMixin, FieldsetMixin, ConditionalGetMixin, generics.ListAPIView):
     queryset = Booking.objects.all()
+    select_relations = BOOKING_SELECT
+    prefetch_relations = BOOKING_PREFETCH
     serializer_class = BookingListSerializer
     permission_classes = [permissions.IsAuthenticated, CheckOwner]
+    etag_fields = BOOKING_ETAG_FIELDS
+    pagination_class = OptionalCursorPagination
+    cursor_orderings = {
+        'id': ('-id',),
+        'price': ('total_price', 'id'),
+        'check_in': ('check_in', 'id'),
+    }
+
+
+class BookingSaveMixin:
+    # две параллельные брони могут обе пройти validate(); вторую отсекает ExclusionConstraint
+    def save_booking(self, serializer, **kwargs):
+        try:
+            with transaction.atomic():
+                serializer.save(**kwargs)
+        except IntegrityError as e:
+            if 'booking_room_period_excl' in str(e):
+                raise ValidationError(BOOKING_OVERLAP_ERROR)
+            raise
+
+    def perform_create(self, serializer):
+        self.save_booking(serializer, user=self.request.user)
+
+    def perform_update(self, serializer):
+        self.save_booking(serializer)
+
 
+class BookingCreateAPIView(BookingSaveMixin, generics.CreateAPIView):
+    queryset = Booking.objects.all()
+    serializer_class = BookingHTTPSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'booking'
 
-class BookingDetailAPIView(generics.RetrieveAPIView):
+
+class BookingDetailAPIView(ActiveLanguageMixin, FieldsetMixin, ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = Booking.objects.all()
+    select_relations = BOOKING_SELECT
+    prefetch_relations = BOOKING_PREFETCH
     serializer_class = BookingListSerializer
     permission_classes = [permissions.IsAuthenticated, CheckOwner]
+    etag_fields = BOOKING_ETAG_FIELDS
 
 
-class BookingUpdateAPIView(generics.UpdateAPIView):
+class BookingUpdateAPIView(BookingSaveMixin, generics.UpdateAPIView):
     queryset = Booking.objects.all()
     serializer_class = BookingHTTPSerializer
     permission_classes = [permissions.IsAuthenticated, CheckOwner]
@@ -166,10 +465,12 @@ class BookingDeleteAPIView(generics.DestroyAPIView):
 
 
 # ---------- FAVORITE ----------
-class FavoriteListView(generics.ListAPIView):
-    queryset = Favorite.objects.all()
+class FavoriteListView(ActiveLanguageMixin, generics.ListAPIView):
+    queryset = Favorite.objects.select_related('user__country')
     serializer_class = FavoriteListSerializer
     permission_classes = [permissions.IsAuthenticated, CheckOwner]
+    pagination_class = OptionalCursorPagination
+    cursor_orderings = {'id': ('-id',)}
 
 
 class FavoriteCreateAPIView(generics.CreateAPIView):
@@ -191,10 +492,30 @@ class FavoriteDeleteView(generics.DestroyAPIView):
 
 
 # ---------- FAVORITE ITEM ----------
-class FavoriteItemListView(generics.ListAPIView):
-    queryset = FavoriteItem.objects.all()
+class FavoriteHotelsView(APIView):
+    # GET — id избранных отелей; POST {"add": [...], "remove": [...]} — пакетное изменение
+    permission_classes = [permissions.IsAuthenticated, ReviewPermissions]
+
+    def get(self, request):
+        return Response({'hotels': sorted(favorite_hotel_ids(request.user))})
+
+    def post(self, request):
+        serializer = FavoriteToggleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        hotel_ids = toggle_favorites(request.user, **serializer.validated_data)
+        return Response({'hotels': sorted(hotel_ids)})
+
+
+class FavoriteItemListView(ActiveLanguageMixin, generics.ListAPIView):
+    queryset = (
+        FavoriteItem.objects
+        .select_related('favorite__user__country', 'hotel__city')
+        .prefetch_related('hotel__hotel_images')
+    )
     serializer_class = FavoriteItemListSerializer
     permission_classes = [permissions.IsAuthenticated, CheckOwner]
+    pagination_class = OptionalCursorPagination
+    cursor_orderings = {'id': ('-id',)}
 
 
 class FavoriteItemCreateAPIView(generics.CreateAPIView):
@@ -213,3 +534,76 @@ class FavoriteItemDeleteAPIView(generics.DestroyAPIView):
     queryset = FavoriteItem.objects.all()
     serializer_class = FavoriteItemHTTPSerializer
     permission_classes = [permissions.IsAuthenticated, CheckOwner]
+
+
+# ---------- EXPORT ----------
+class ExportView(APIView):
+    """Потоковая выгрузка броней/отзывов по отелям владельца: ?output=csv|ndjson, ?hotel=<id>.
+
+    Строки читаются серверным курсором и отдаются пачками, поэтому память не растёт с объёмом;
+    при Accept-Encoding: gzip поток сжимается на лету. Под ASGI поток отдаётся асинхронным итератором.
+    """
+    permission_classes = [permissions.IsAuthenticated, CheckStatus]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = 'export'
+    export = None
+
+    def perform_content_negotiation(self, request, force=False):
+        # формат задаёт ?output=; Accept: text/csv не должен давать 406
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        params = ExportParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        output = params.validated_data['output']
+        hotel = params.validated_data.get('hotel')
+        gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+        content = export_stream(self.export, output, gzip=gzip, owner=request.user, hotel=hotel)
+        if isinstance(request._request, ASGIRequest):
+            content = aiter_sync(content)
+        response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[output])
+        filename = f'{self.export}-{timezone.now():%Y%m%d-%H%M%S}.{output}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class BookingExportView(ExportView):
+    export = 'bookings'
+
+
+class ReviewExportView(ExportView):
+    export = 'reviews'
+
+
+# ---------- ASYNC READ PATH ----------
+# те же queryset/права/сериализаторы, выборки через async ORM; включаются ASYNC_READ_VIEWS (ASGI-воркер)
+class AsyncCityListView(AsyncListModelMixin, CityListView):
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(super().alist, request, *args, **kwargs)
+
+
+class AsyncHotelListView(AsyncListModelMixin, HotelListView):
+    async def alist(self, request, *args, **kwargs):
+        if self.wants_facets(request):
+            return Response(await self.aget_facets())
+        return await super().alist(request, *args, **kwargs)
+
+
+class AsyncHotelDetailAPIView(AsyncRetrieveModelMixin, HotelDetailAPIView):
+    pass
+
+
+class AsyncBookingListView(AsyncListModelMixin, BookingListView):
+    pass
+
+
+ASYNC_READ_VIEWS = {
+    CityListView: AsyncCityListView,
+    HotelListView: AsyncHotelListView,
+    HotelDetailAPIView: AsyncHotelDetailAPIView,
+    BookingListView: AsyncBookingListView,
+}
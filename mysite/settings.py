@@ -28,6 +28,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'booking_app',
     'phonenumber_field',
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'booking_app.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,6 +94,45 @@ DATABASES = {
     }
 }
 
+# пул соединений psycopg 3: соединение берётся из пула на запрос и возвращается после него,
+# без TCP/auth/fork backend-процесса на каждый запрос. Пулы закрываются перед fork (booking_app.db)
+DB_POOL = os.getenv('DB_POOL', '1') == '1'
+# проверка соединения перед использованием (один round-trip); в режиме пула — при выдаче из пула
+DATABASES['default']['CONN_HEALTH_CHECKS'] = os.getenv('DB_HEALTH_CHECKS', '1') == '1'
+if DB_POOL:
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            # не меньше числа потоков воркера, иначе запросы ждут до DB_POOL_TIMEOUT
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+            'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 30 * 60)),
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 10 * 60)),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 0))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # справочники (страны, города); для общего кэша между воркерами — redis/memcached через .env.
+    # По умолчанию кэш у каждого процесса свой и сигналы сбрасывают только его: TTL ограничивает,
+    # сколько остальные воркеры отдают устаревшие данные (manage.py check --deploy предупредит)
+    'reference': {
+        'BACKEND': os.getenv('REFERENCE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('REFERENCE_CACHE_LOCATION', 'reference'),
+        'TIMEOUT': int(os.getenv('REFERENCE_CACHE_TIMEOUT', 60)),
+    },
+    # счётчики SlidingWindowThrottle; общий для всех воркеров (redis/memcached через .env),
+    # при недоступности — память процесса
+    'throttle': {
+        'BACKEND': os.getenv('THROTTLE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('THROTTLE_CACHE_LOCATION', 'throttle'),
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -126,13 +167,21 @@ USE_L10N = True
 USE_TZ = True
 
 REST_FRAMEWORK = {
+    # JWT с ролью и статусом в claims: аутентификация без запроса к БД (booking_app.authentication)
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'booking_app.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # ставки booking_app.throttling.SlidingWindowThrottle по view.throttle_scope; пустое значение — без ограничения
+    'DEFAULT_THROTTLE_RATES': {
+        'login': os.getenv('THROTTLE_LOGIN', '10/min'),
+        'register': os.getenv('THROTTLE_REGISTER', '5/hour'),
+        'booking': os.getenv('THROTTLE_BOOKING', '30/min'),
+        'review': os.getenv('THROTTLE_REVIEW', '10/min'),
+        'export': os.getenv('THROTTLE_EXPORT', '20/hour'),
+    },
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 2,
 }
@@ -149,6 +198,18 @@ REST_FRAMEWORK = {
 #     'USE_SESSION_AUTH': False,
 # }
 
+# сколько процесс доверяет своему знанию о смене роли/блокировке пользователя (см. AuthStateCache)
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 30))
+
+# счётчики фасетов (?facets=1) сбрасываются сигналами; TTL ограничивает расхождение между воркерами
+FACETS_CACHE_TIMEOUT = int(os.getenv('FACETS_CACHE_TIMEOUT', 60))
+
+# расчёты цен (room/quote/) в reference-кэше: не дольше, чем клиенту разрешено кэшировать ответ (max-age=60)
+PRICING_CACHE_TIMEOUT = int(os.getenv('PRICING_CACHE_TIMEOUT', 60))
+
+# потоки фоновой генерации thumb/medium/large и WebP после загрузки изображения
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', 2))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=120),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -183,6 +244,12 @@ AUTH_USER_MODEL = 'booking_app.UserProfile'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# async-версии read-эндпоинтов (hotel, city, booking list) для запуска под ASGI
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS') == '1'
+
+# /metrics (Prometheus); если задан — нужен заголовок Authorization: Bearer <token>
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
 CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOWED_ORIGINS = [
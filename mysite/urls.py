@@ -6,6 +6,7 @@ from drf_yasg import openapi
 from rest_framework import permissions
 from django.conf import settings
 from django.conf.urls.i18n import i18n_patterns
+from booking_app.metrics import metrics_view
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -20,4 +21,6 @@ urlpatterns = i18n_patterns(
     path('api/v1/', include('booking_app.urls')),
     path('accounts/', include('allauth.urls')),
     path('docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-) + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+) + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) + [
+    path('metrics', metrics_view, name='metrics'),
+]